@@ -0,0 +1,113 @@
+"""IVF-Flat 与精确检索的召回率-延迟对比
+
+ipcc_eval_qr_dataset.json 只包含 queries 和 responses（没有原始语料），这里以 responses
+切块后的文本为语料，再用 --pad 条随机噪声向量把库扩充到大语料规模。
+以精确检索(nprobe = nlist)的 top-k 作为基准，统计不同 nprobe 下的 recall@k 和延迟。
+
+用法：
+    python ann_benchmark.py                      # 语料 + 100k 条填充向量
+    python ann_benchmark.py --pad 0 --top-k 5
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+import numpy as np
+from llama_index.core import Document, StorageContext, VectorStoreIndex
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import QueryBundle, TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+from ann_vector_store import IVFFlatVectorStore
+
+os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
+
+DATASET = "../../data/复杂PDF/ipcc_eval_qr_dataset.json"
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embed-model", default="BAAI/bge-small-en-v1.5")
+    parser.add_argument("--pad", type=int, default=100_000, help="额外填充的随机向量数")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32,64")
+    parser.add_argument("--simple-queries", type=int, default=5,
+                        help="默认 SimpleVectorStore 只测前几条查询（逐条 Python 打分很慢）")
+    args = parser.parse_args()
+
+    with open(DATASET, "r", encoding="utf-8") as f:
+        dataset = json.load(f)
+    queries = list(dataset["queries"].values())
+    documents = [Document(text=text, id_=qid) for qid, text in dataset["responses"].items()]
+
+    embed_model = HuggingFaceEmbedding(model_name=args.embed_model)
+    nodes = SentenceSplitter(chunk_size=128, chunk_overlap=16).get_nodes_from_documents(documents)
+    embeddings = embed_model.get_text_embedding_batch([n.get_content() for n in nodes])
+    for node, embedding in zip(nodes, embeddings):
+        node.embedding = embedding
+    query_embeddings = [embed_model.get_query_embedding(q) for q in queries]
+
+    dim = len(embeddings[0])
+    rng = np.random.default_rng(0)
+    padding = rng.standard_normal((args.pad, dim), dtype=np.float32)
+    nodes += [TextNode(id_=f"pad-{i}", text="", embedding=padding[i].tolist())
+              for i in range(args.pad)]
+    print(f"语料 {len(nodes)} 个向量 ({len(nodes) - args.pad} 个真实切块), {len(queries)} 条查询")
+
+    # 1. IVF-Flat 索引
+    store = IVFFlatVectorStore(train_threshold=0)
+    start = time.perf_counter()
+    store.add(nodes)
+    print(f"IVF 构建(含 k-means, nlist={store.nlist}): {time.perf_counter() - start:.2f}s")
+
+    def run(**kwargs):
+        ids, timings = [], []
+        for q in query_embeddings:
+            t = time.perf_counter()
+            result = store.query(VectorStoreQuery(query_embedding=q, similarity_top_k=args.top_k), **kwargs)
+            timings.append(time.perf_counter() - t)
+            ids.append(result.ids)
+        return ids, timings
+
+    exact_ids, exact_timings = run(exact=True)
+    print(f"{'方式':<18}{'recall@' + str(args.top_k):>10}{'p50 ms':>10}{'p95 ms':>10}")
+    print(f"{'exact(flat)':<18}{1.0:>10.3f}{percentile(exact_timings, 50):>10.2f}"
+          f"{percentile(exact_timings, 95):>10.2f}")
+    for nprobe in [int(x) for x in args.nprobe.split(",")]:
+        ann_ids, timings = run(nprobe=nprobe)
+        recall = statistics.mean(len(set(a) & set(e)) / max(len(e), 1)
+                                 for a, e in zip(ann_ids, exact_ids))
+        print(f"{'ivf nprobe=' + str(nprobe):<18}{recall:>10.3f}{percentile(timings, 50):>10.2f}"
+              f"{percentile(timings, 95):>10.2f}")
+
+    # 重复写入同一批真实切块（相当于重新导入文档）应原地更新，不能产生重复的结果
+    store.add(nodes[:len(nodes) - args.pad])
+    assert store.num_vectors == len(nodes), store.num_vectors
+    readd_ids, _ = run(exact=True)
+    assert all(len(set(ids)) == len(ids) and set(ids) == set(e)
+               for ids, e in zip(readd_ids, exact_ids)), "重复写入后出现重复或丢失的结果"
+    print(f"重复写入 {len(nodes) - args.pad} 个切块后向量数仍为 {store.num_vectors}")
+
+    # 2. 默认 VectorStoreIndex(SimpleVectorStore) 的精确检索延迟
+    if args.simple_queries > 0:
+        index = VectorStoreIndex(nodes, embed_model=embed_model,
+                                 storage_context=StorageContext.from_defaults())
+        retriever = index.as_retriever(similarity_top_k=args.top_k)
+        timings = []
+        for q, q_embedding in zip(queries[:args.simple_queries], query_embeddings):
+            t = time.perf_counter()
+            retriever.retrieve(QueryBundle(query_str=q, embedding=q_embedding))
+            timings.append(time.perf_counter() - t)
+        print(f"{'SimpleVectorStore':<18}{1.0:>10.3f}{percentile(timings, 50):>10.2f}"
+              f"{percentile(timings, 95):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""IVF-Flat 近似最近邻向量存储（纯 NumPy，进程内运行，无需外部服务）
+
+- 训练：对向量做 k-means 得到 nlist 个聚类中心，每个向量归入最近的中心（倒排列表）
+- 查询：先找与查询最相似的 nprobe 个中心，只在这些列表里做精确打分
+- 增量插入：训练后新向量直接归入最近的中心；训练前（数量不足 train_threshold）退化为精确扫描
+- 持久化：向量/中心/归属以 .npy 保存（向量 mmap 打开），节点存 jsonl，参数存 json
+
+nprobe 越大召回越高、延迟越高；nprobe == nlist 时等价于精确检索。
+"""
+import json
+import os
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.storage.storage_context import DEFAULT_PERSIST_DIR
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import (
+    metadata_dict_to_node,
+    node_to_metadata_dict,
+)
+
+VECTORS_FNAME = "ivf_vectors.npy"
+CENTROIDS_FNAME = "ivf_centroids.npy"
+ASSIGN_FNAME = "ivf_assign.npy"
+NODES_FNAME = "ivf_nodes.jsonl"
+META_FNAME = "ivf_meta.json"
+
+
+def kmeans(vectors: np.ndarray, k: int, iters: int = 20, seed: int = 0) -> np.ndarray:
+    """球面 k-means（向量已归一化，用内积作相似度），返回归一化的中心"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        # 空簇重新随机取一个样本点作为中心
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+class IVFFlatVectorStore(BasePydanticVectorStore):
+    """倒排文件 + 精确打分的近似检索"""
+
+    stores_text: bool = True
+
+    nlist: int = Field(default=0, description="聚类中心数，0 表示训练时取 4*sqrt(n)")
+    nprobe: int = Field(default=8, description="每次查询探查的列表数")
+    train_threshold: int = Field(default=10000, description="向量数达到该值时自动训练")
+    train_sample: int = Field(default=100000, description="k-means 最多使用的样本数")
+
+    _vectors: Optional[np.ndarray] = PrivateAttr(default=None)
+    _size: int = PrivateAttr(default=0)
+    _assign: Optional[np.ndarray] = PrivateAttr(default=None)
+    _centroids: Optional[np.ndarray] = PrivateAttr(default=None)
+    _lists: List[List[int]] = PrivateAttr(default_factory=list)
+    _list_cache: dict = PrivateAttr(default_factory=dict)
+    _deleted: Optional[np.ndarray] = PrivateAttr(default=None)
+    _raw_nodes: List[str] = PrivateAttr(default_factory=list)
+    _node_ids: List[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: List[str] = PrivateAttr(default_factory=list)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "IVFFlatVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def num_vectors(self) -> int:
+        return self._size - int(self._deleted[:self._size].sum()) if self._size else 0
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        """已存在的 node_id 视为更新：旧行打墓碑，新行追加并归入最近的列表"""
+        if not nodes:
+            return []
+        live = {node_id: row for row, node_id in enumerate(self._node_ids)
+                if not self._deleted[row]}
+        vectors = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        start = self._size
+        self._reserve(start + len(nodes), vectors.shape[1])
+        self._vectors[start:start + len(nodes)] = vectors
+        self._deleted[start:start + len(nodes)] = False
+        self._size += len(nodes)
+
+        for row, node in enumerate(nodes, start):
+            # 旧行留在倒排列表里，查询时按墓碑跳过；同一批里重复的 id 以最后一个为准
+            old_row = live.get(node.node_id)
+            if old_row is not None:
+                self._deleted[old_row] = True
+            live[node.node_id] = row
+            metadata = node_to_metadata_dict(node, remove_text=False, flat_metadata=False)
+            self._raw_nodes.append(json.dumps(metadata))
+            self._node_ids.append(node.node_id)
+            self._ref_doc_ids.append(node.ref_doc_id or "None")
+
+        if self.is_trained:
+            self._assign_rows(np.arange(start, self._size))
+        elif self._size >= self.train_threshold:
+            self.train()
+        return [node.node_id for node in nodes]
+
+    def train(self, nlist: Optional[int] = None) -> None:
+        """（重新）训练聚类中心并重建倒排列表"""
+        live = np.flatnonzero(~self._deleted[:self._size])
+        if len(live) == 0:
+            return
+        k = nlist or self.nlist or int(4 * np.sqrt(len(live)))
+        k = max(1, min(k, len(live)))
+        rng = np.random.default_rng(0)
+        sample = live if len(live) <= self.train_sample else rng.choice(
+            live, size=self.train_sample, replace=False)
+        self._centroids = kmeans(np.asarray(self._vectors[np.sort(sample)]), k)
+        self.nlist = k
+        self._lists = [[] for _ in range(k)]
+        self._list_cache = {}
+        self._assign_rows(live)
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        """删除采用墓碑标记，查询时跳过；重新 train() 时从倒排列表中清除"""
+        for row, doc_id in enumerate(self._ref_doc_ids):
+            if doc_id == ref_doc_id:
+                self._deleted[row] = True
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            raise NotImplementedError("IVFFlatVectorStore 不支持元数据过滤")
+        if self._size == 0:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+        q = np.asarray(query.query_embedding, dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+
+        nprobe = kwargs.get("nprobe", self.nprobe)
+        if not self.is_trained or kwargs.get("exact", False):
+            rows = np.flatnonzero(~self._deleted[:self._size])
+        else:
+            probe_scores = self._centroids @ q
+            nprobe = min(nprobe, len(self._lists))
+            probes = np.argpartition(-probe_scores, nprobe - 1)[:nprobe]
+            rows = np.concatenate([self._list_rows(int(p)) for p in probes])
+            rows = rows[~self._deleted[rows]]
+        # as_retriever() 对存文本的向量存储会传入空列表，按"不限制"处理
+        if query.node_ids:
+            wanted = set(query.node_ids)
+            rows = rows[[self._node_ids[i] in wanted for i in rows.tolist()]]
+        if rows.size == 0:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+        scores = self._vectors[rows] @ q
+        top_k = min(query.similarity_top_k, rows.size)
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        hit_rows = rows[top]
+        return VectorStoreQueryResult(
+            nodes=[metadata_dict_to_node(json.loads(self._raw_nodes[i])) for i in hit_rows],
+            similarities=scores[top].tolist(),
+            ids=[self._node_ids[i] for i in hit_rows],
+        )
+
+    def persist(
+        self,
+        persist_path: str = os.path.join(DEFAULT_PERSIST_DIR, VECTORS_FNAME),
+        fs: Optional[Any] = None,
+    ) -> None:
+        """persist_path 所在目录即持久化目录；持久化时会丢弃已删除的向量"""
+        persist_dir = os.path.dirname(persist_path) or "."
+        os.makedirs(persist_dir, exist_ok=True)
+        live = np.flatnonzero(~self._deleted[:self._size]) if self._size else np.array([], dtype=np.int64)
+
+        vectors = self._vectors[live] if self._size else np.zeros((0, 0), dtype=np.float32)
+        np.save(os.path.join(persist_dir, VECTORS_FNAME), np.ascontiguousarray(vectors))
+        if self.is_trained:
+            np.save(os.path.join(persist_dir, CENTROIDS_FNAME), self._centroids)
+            np.save(os.path.join(persist_dir, ASSIGN_FNAME), self._assign[live])
+        with open(os.path.join(persist_dir, NODES_FNAME), "w", encoding="utf-8") as f:
+            for row in live:
+                f.write(json.dumps([self._node_ids[row], self._ref_doc_ids[row],
+                                    self._raw_nodes[row]]) + "\n")
+        with open(os.path.join(persist_dir, META_FNAME), "w", encoding="utf-8") as f:
+            json.dump({"nlist": self.nlist, "nprobe": self.nprobe,
+                       "train_threshold": self.train_threshold,
+                       "train_sample": self.train_sample,
+                       "trained": self.is_trained}, f)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str = DEFAULT_PERSIST_DIR) -> "IVFFlatVectorStore":
+        with open(os.path.join(persist_dir, META_FNAME), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        trained = meta.pop("trained")
+        store = cls(**meta)
+
+        vectors = np.load(os.path.join(persist_dir, VECTORS_FNAME), mmap_mode="r")
+        with open(os.path.join(persist_dir, NODES_FNAME), "r", encoding="utf-8") as f:
+            for line in f:
+                node_id, ref_doc_id, raw = json.loads(line)
+                store._node_ids.append(node_id)
+                store._ref_doc_ids.append(ref_doc_id)
+                store._raw_nodes.append(raw)
+        store._size = len(store._node_ids)
+        if store._size == 0:
+            return store
+        store._vectors = vectors
+        store._deleted = np.zeros(store._size, dtype=bool)
+        if trained:
+            store._centroids = np.load(os.path.join(persist_dir, CENTROIDS_FNAME))
+            store._assign = np.load(os.path.join(persist_dir, ASSIGN_FNAME))
+            store._lists = [[] for _ in range(len(store._centroids))]
+            for row, list_id in enumerate(store._assign):
+                store._lists[list_id].append(row)
+        return store
+
+    def _assign_rows(self, rows: np.ndarray) -> None:
+        # 分批计算，避免一次性生成 n * nlist 的大矩阵
+        for start in range(0, len(rows), 8192):
+            batch = rows[start:start + 8192]
+            assign = np.argmax(self._vectors[batch] @ self._centroids.T, axis=1)
+            self._assign[batch] = assign
+            for row, list_id in zip(batch.tolist(), assign.tolist()):
+                self._lists[list_id].append(row)
+                self._list_cache.pop(list_id, None)
+
+    def _list_rows(self, list_id: int) -> np.ndarray:
+        rows = self._list_cache.get(list_id)
+        if rows is None:
+            rows = np.asarray(self._lists[list_id], dtype=np.int64)
+            self._list_cache[list_id] = rows
+        return rows
+
+    def _reserve(self, capacity: int, dim: int) -> None:
+        """按倍数扩容；从磁盘 mmap 加载的只读矩阵在第一次插入时复制到内存"""
+        if self._vectors is None:
+            size = max(capacity, 1024)
+            self._vectors = np.empty((size, dim), dtype=np.float32)
+            self._assign = np.full(size, -1, dtype=np.int32)
+            self._deleted = np.zeros(size, dtype=bool)
+            return
+        writable = isinstance(self._vectors, np.ndarray) and self._vectors.flags.writeable \
+            and not isinstance(self._vectors, np.memmap)
+        if capacity <= self._vectors.shape[0] and writable:
+            return
+        size = max(capacity, self._vectors.shape[0] * 2, 1024)
+        vectors = np.empty((size, dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        assign = np.full(size, -1, dtype=np.int32)
+        deleted = np.zeros(size, dtype=bool)
+        if self._assign is not None:
+            assign[:self._size] = self._assign[:self._size]
+        deleted[:self._size] = self._deleted[:self._size]
+        self._vectors, self._assign, self._deleted = vectors, assign, deleted
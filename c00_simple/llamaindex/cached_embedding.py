@@ -0,0 +1,164 @@
+"""带磁盘缓存的嵌入模型包装器
+
+缓存键为 (模型名, 归一化等影响向量的设置, 查询/文本, sha256(文本))：
+    - 前置一层进程内 LRU（OrderedDict），命中时不访问磁盘
+    - 后端为 SQLite，向量以 float32 BLOB 存储，可跨进程、跨运行复用
+只有两层都未命中的文本才会真正调用底层模型做前向计算。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+
+# 这些属性会改变同一段文本的向量结果，需要纳入缓存键
+_SETTING_ATTRS = ("normalize", "query_instruction", "text_instruction",
+                  "pooling", "max_length", "dimensions")
+
+
+class CachedEmbedding(BaseEmbedding):
+    """包装任意 BaseEmbedding，按内容寻址缓存嵌入结果"""
+
+    embed_model: BaseEmbedding = Field(description="被包装的嵌入模型")
+    cache_path: str = Field(default="./storage/embedding_cache.sqlite3")
+    lru_size: int = Field(default=10000, description="内存 LRU 最多保留的向量数")
+
+    _conn: sqlite3.Connection = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr()
+    _lru: "OrderedDict[Tuple[str, str], Embedding]" = PrivateAttr()
+    _settings_key: str = PrivateAttr()
+    _stats: Dict[str, int] = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, **kwargs: Any) -> None:
+        kwargs.setdefault("model_name", embed_model.model_name)
+        kwargs.setdefault("embed_batch_size", embed_model.embed_batch_size)
+        super().__init__(embed_model=embed_model, **kwargs)
+
+        settings = {attr: getattr(embed_model, attr) for attr in _SETTING_ATTRS
+                    if getattr(embed_model, attr, None) is not None}
+        settings_json = json.dumps(
+            {"class": embed_model.class_name(), "model": embed_model.model_name, **settings},
+            ensure_ascii=False, sort_keys=True, default=str)
+        self._settings_key = hashlib.sha256(settings_json.encode("utf-8")).hexdigest()[:16]
+
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " settings TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (settings, text_hash))")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """命中统计：内存命中、磁盘命中、未命中及总命中率"""
+        hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+        total = hits + self._stats["misses"]
+        return {**self._stats, "hit_ratio": hits / total if total else 0.0}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._get_cached(
+            "query", [query], self.embed_model.get_query_embedding)[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._get_cached("text", texts, None)
+
+    def _get_cached(self, kind: str, texts: List[str], single_fn: Optional[Any]) -> List[Embedding]:
+        settings = f"{self._settings_key}|{kind}"
+        keys = [(settings, hashlib.sha256(text.encode("utf-8")).hexdigest())
+                for text in texts]
+        results: List[Optional[Embedding]] = [None] * len(texts)
+
+        # 1. 内存 LRU
+        disk_lookup = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    results[i] = self._lru[key]
+                    self._stats["memory_hits"] += 1
+                else:
+                    disk_lookup.append(i)
+
+        # 2. SQLite
+        missing = []
+        for i in disk_lookup:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT vector FROM embeddings WHERE settings = ? AND text_hash = ?",
+                    keys[i]).fetchone()
+                if row is not None:
+                    self._stats["disk_hits"] += 1
+            if row is None:
+                missing.append(i)
+                continue
+            results[i] = np.frombuffer(row[0], dtype=np.float32).tolist()
+            self._remember(keys[i], results[i])
+
+        # 3. 未命中的文本一次性交给底层模型（同一批内重复文本只算一次）
+        if missing:
+            unique: Dict[Tuple[str, str], int] = {}
+            for i in missing:
+                unique.setdefault(keys[i], i)
+            to_embed = [texts[i] for i in unique.values()]
+            if single_fn is not None:
+                embeddings = [single_fn(text) for text in to_embed]
+            else:
+                embeddings = self.embed_model.get_text_embedding_batch(to_embed)
+            # 统一转成 float32，保证命中与未命中返回的数值完全一致
+            computed = {key: np.asarray(vec, dtype=np.float32).tolist()
+                        for key, vec in zip(unique.keys(), embeddings)}
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (settings, text_hash, vector) VALUES (?, ?, ?)",
+                    [(key[0], key[1], np.asarray(vec, dtype=np.float32).tobytes())
+                     for key, vec in computed.items()])
+                self._stats["misses"] += len(missing)
+            for key, vec in computed.items():
+                self._remember(key, vec)
+            for i in missing:
+                results[i] = computed[keys[i]]
+
+        return results
+
+    def _remember(self, key: Tuple[str, str], embedding: Embedding) -> None:
+        with self._lock:
+            self._lru[key] = embedding
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
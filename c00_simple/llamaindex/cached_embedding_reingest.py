@@ -0,0 +1,36 @@
+"""重复摄取基本不变的语料，观察嵌入缓存命中率
+
+第二轮使用新的 CachedEmbedding 实例（内存 LRU 为空），模拟重新启动进程后的再次摄取，
+此时命中全部来自 SQLite 磁盘缓存。
+"""
+import os
+import time
+
+from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+from cached_embedding import CachedEmbedding
+
+os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
+
+CACHE_PATH = "./storage/embedding_cache.sqlite3"
+DATA_DIRS = ["../../data/黑悟空", "../../data/山西文旅"]
+
+model = HuggingFaceEmbedding(model_name="BAAI/bge-small-zh")
+
+docs = []
+for data_dir in DATA_DIRS:
+    docs.extend(SimpleDirectoryReader(
+        data_dir, required_exts=[".txt", ".md", ".pdf"]).load_data())
+print(f"共加载 {len(docs)} 个文档")
+
+for round_no in (1, 2):
+    embedding = CachedEmbedding(model, cache_path=CACHE_PATH)
+    start = time.perf_counter()
+    VectorStoreIndex.from_documents(docs, embed_model=embedding)
+    elapsed = time.perf_counter() - start
+    stats = embedding.stats
+    print(f"第{round_no}轮: 耗时 {elapsed:.2f}s, 内存命中 {stats['memory_hits']}, "
+          f"磁盘命中 {stats['disk_hits']}, 未命中 {stats['misses']}, "
+          f"命中率 {stats['hit_ratio']:.1%}")
+    embedding.close()
@@ -0,0 +1,126 @@
+"""冷启动(切分+嵌入+持久化) vs 热启动(mmap 加载) 的启动耗时对比
+
+用法：
+    python mmap_startup_benchmark.py                 # 使用 Settings 默认的嵌入模型
+    python mmap_startup_benchmark.py --mock-embed    # 离线，用 MockEmbedding 代替
+    python mmap_startup_benchmark.py --workers 4     # 同时启动 4 个进程热加载，观察共享内存
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import statistics
+import time
+
+from llama_index.core import (
+    Settings,
+    SimpleDirectoryReader,
+    StorageContext,
+    VectorStoreIndex,
+)
+from llama_index.core.embeddings import MockEmbedding
+
+from mmap_vector_store import MmapVectorStore
+
+INPUT_FILES = ["../../data/黑悟空/黑悟空wiki.txt"]
+QUERY = "黑神话悟空的主要内容是什么？"
+
+
+def cold_build(persist_dir: str) -> float:
+    """从原始文档构建索引并持久化，返回耗时(秒)"""
+    start = time.perf_counter()
+    docs = SimpleDirectoryReader(input_files=INPUT_FILES).load_data()
+    vector_store = MmapVectorStore()
+    storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    VectorStoreIndex.from_documents(docs, storage_context=storage_context)
+    storage_context.persist(persist_dir=persist_dir)
+    return time.perf_counter() - start
+
+
+def warm_load(persist_dir: str) -> float:
+    """mmap 打开持久化索引并完成一次检索，返回耗时(秒)"""
+    start = time.perf_counter()
+    vector_store = MmapVectorStore.from_persist_dir(persist_dir)
+    index = VectorStoreIndex.from_vector_store(vector_store)
+    index.as_retriever(similarity_top_k=3).retrieve(QUERY)
+    return time.perf_counter() - start
+
+
+def _memory_kb() -> dict:
+    """读取 /proc/self/smaps_rollup 中的 Rss/Pss(仅 Linux)；Pss 会按共享进程数分摊共享页"""
+    result = {}
+    path = "/proc/self/smaps_rollup"
+    if not os.path.exists(path):
+        return result
+    with open(path) as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                result[key] = int(value.split()[0])
+    return result
+
+
+def _worker(persist_dir: str, mock_embed: bool, barrier, queue) -> None:
+    if mock_embed:
+        Settings.embed_model = MockEmbedding(embed_dim=512)
+    barrier.wait()
+    elapsed = warm_load(persist_dir)
+    before = _memory_kb()
+    vector_store = MmapVectorStore.from_persist_dir(persist_dir)
+    # 触碰整个矩阵，让所有页都映射进来
+    float(vector_store._embeddings.sum())
+    after = _memory_kb()
+    # 所有进程都映射完之后再统计，Pss 才能体现共享
+    barrier.wait()
+    shared = _memory_kb()
+    queue.put((elapsed, after.get("Rss", 0) - before.get("Rss", 0),
+               shared.get("Pss", 0) - before.get("Pss", 0)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--persist-dir", default="./storage/mmap_benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--mock-embed", action="store_true")
+    args = parser.parse_args()
+
+    if args.mock_embed:
+        Settings.embed_model = MockEmbedding(embed_dim=512)
+
+    # 1. 冷启动
+    if os.path.exists(args.persist_dir):
+        shutil.rmtree(args.persist_dir)
+    cold = cold_build(args.persist_dir)
+    vector_store = MmapVectorStore.from_persist_dir(args.persist_dir)
+    print(f"索引规模: {vector_store.num_vectors} 个节点, "
+          f"向量文件 {os.path.getsize(os.path.join(args.persist_dir, 'mmap_vectors.npy')) / 1024:.1f} KB")
+    print(f"冷启动(切分+嵌入+持久化): {cold * 1000:.1f} ms")
+
+    # 2. 热启动
+    warm = [warm_load(args.persist_dir) for _ in range(args.repeat)]
+    print(f"热启动(mmap 加载+首次检索): 中位数 {statistics.median(warm) * 1000:.2f} ms, "
+          f"最小 {min(warm) * 1000:.2f} ms")
+    print(f"加速比: {cold / statistics.median(warm):.0f}x")
+
+    # 3. 多进程同时热加载
+    if args.workers > 1:
+        ctx = mp.get_context("spawn")
+        barrier = ctx.Barrier(args.workers)
+        queue = ctx.Queue()
+        procs = [ctx.Process(target=_worker,
+                             args=(args.persist_dir, args.mock_embed, barrier, queue))
+                 for _ in range(args.workers)]
+        for p in procs:
+            p.start()
+        results = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+        print(f"{args.workers} 个进程并发热加载: "
+              f"中位数 {statistics.median(r[0] for r in results) * 1000:.2f} ms")
+        print(f"每进程新增 Rss(含共享页): {statistics.mean(r[1] for r in results):.0f} KB, "
+              f"新增 Pss(共享页按进程分摊): {statistics.mean(r[2] for r in results):.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
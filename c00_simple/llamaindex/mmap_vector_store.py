@@ -0,0 +1,215 @@
+"""基于内存映射(mmap)的持久化向量存储
+
+持久化格式（同一目录下两个文件）：
+    mmap_vectors.npy  - 归一化后的 float32 向量矩阵（行连续，shape=[n, dim]）
+    mmap_nodes.tsv    - 节点 sidecar，每行 "node_id\tref_doc_id\t节点json"
+
+热启动时通过 np.load(mmap_mode="r") 打开向量矩阵，不做任何拷贝，
+多个工作进程打开同一个文件时共享操作系统的 page cache。
+"""
+import json
+import os
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.storage.storage_context import DEFAULT_PERSIST_DIR
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import (
+    metadata_dict_to_node,
+    node_to_metadata_dict,
+)
+
+VECTORS_FNAME = "mmap_vectors.npy"
+NODES_FNAME = "mmap_nodes.tsv"
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """向量矩阵常驻 mmap 文件、节点按需反序列化的向量存储"""
+
+    stores_text: bool = True
+
+    _embeddings: np.ndarray = PrivateAttr()
+    _node_ids: List[str] = PrivateAttr()
+    _ref_doc_ids: List[str] = PrivateAttr()
+    # sidecar 原始行，查询命中时才解析 json，避免热启动时反序列化全部节点
+    _raw_nodes: List[str] = PrivateAttr()
+
+    def __init__(
+        self,
+        embeddings: Optional[np.ndarray] = None,
+        raw_nodes: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self._raw_nodes = raw_nodes or []
+        self._embeddings = embeddings
+        self._node_ids = []
+        self._ref_doc_ids = []
+        for line in self._raw_nodes:
+            # id 与 ref_doc_id 写在每行开头，这里只切分出这两个字段
+            node_id, ref_doc_id, _ = line.split("\t", 2)
+            self._node_ids.append(node_id)
+            self._ref_doc_ids.append(ref_doc_id)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str = DEFAULT_PERSIST_DIR) -> "MmapVectorStore":
+        """以只读 mmap 方式打开持久化目录"""
+        vectors_path = os.path.join(persist_dir, VECTORS_FNAME)
+        nodes_path = os.path.join(persist_dir, NODES_FNAME)
+        if not os.path.exists(vectors_path) or not os.path.exists(nodes_path):
+            raise ValueError(f"未找到持久化的向量索引: {persist_dir}")
+
+        embeddings = np.load(vectors_path, mmap_mode="r")
+        with open(nodes_path, "r", encoding="utf-8") as f:
+            # 不用 splitlines()：它会把 U+2028 等字符也当作换行
+            content = f.read()
+            raw_nodes = content.split("\n") if content else []
+        if len(raw_nodes) != embeddings.shape[0]:
+            raise ValueError(
+                f"向量数({embeddings.shape[0]})与节点数({len(raw_nodes)})不一致: {persist_dir}")
+        return cls(embeddings=embeddings, raw_nodes=raw_nodes)
+
+    @property
+    def client(self) -> None:
+        return None
+
+    @property
+    def num_vectors(self) -> int:
+        return len(self._node_ids)
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        """已有的 node_id 原地覆盖（同一批里重复出现时以最后一个为准），新的追加到末尾；
+        若当前矩阵是只读 mmap，会在内存中生成新的矩阵"""
+        if not nodes:
+            return []
+
+        new_embeddings = np.asarray(
+            [node.get_embedding() for node in nodes], dtype=np.float32)
+        norms = np.linalg.norm(new_embeddings, axis=1, keepdims=True)
+        new_embeddings /= np.maximum(norms, 1e-12)
+
+        id_to_row = {node_id: i for i, node_id in enumerate(self._node_ids)}
+        last = {}  # 矩阵行 -> nodes 下标
+        appended = 0
+        for i, node in enumerate(nodes):
+            metadata = node_to_metadata_dict(
+                node, remove_text=False, flat_metadata=False)
+            ref_doc_id = node.ref_doc_id or "None"
+            # json.dumps 会把换行、制表符转义，保证一行一个节点
+            raw = "\t".join([node.node_id, ref_doc_id, json.dumps(metadata, ensure_ascii=False)])
+            row = id_to_row.get(node.node_id)
+            if row is None:
+                row = id_to_row[node.node_id] = len(self._node_ids)
+                appended += 1
+                self._raw_nodes.append(raw)
+                self._node_ids.append(node.node_id)
+                self._ref_doc_ids.append(ref_doc_id)
+            else:
+                self._raw_nodes[row] = raw
+                self._ref_doc_ids[row] = ref_doc_id
+            last[row] = i
+
+        if self._embeddings is None or self._embeddings.shape[0] == 0:
+            embeddings = np.empty((appended, new_embeddings.shape[1]), dtype=np.float32)
+        else:
+            # concatenate 总会生成新的可写矩阵，只读 mmap 也不受影响
+            embeddings = np.concatenate(
+                [self._embeddings, np.empty((appended, new_embeddings.shape[1]), dtype=np.float32)], axis=0)
+        embeddings[list(last)] = new_embeddings[list(last.values())]
+        self._embeddings = embeddings
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        """删除 ref_doc_id 对应的所有节点"""
+        keep = [i for i, doc_id in enumerate(self._ref_doc_ids)
+                if doc_id != ref_doc_id]
+        if len(keep) == len(self._ref_doc_ids):
+            return
+        self._embeddings = np.ascontiguousarray(self._embeddings[keep])
+        self._raw_nodes = [self._raw_nodes[i] for i in keep]
+        self._node_ids = [self._node_ids[i] for i in keep]
+        self._ref_doc_ids = [self._ref_doc_ids[i] for i in keep]
+
+    def get_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[Any] = None,
+    ) -> List[BaseNode]:
+        if filters is not None:
+            raise NotImplementedError("MmapVectorStore 不支持元数据过滤")
+        if node_ids is None:
+            return [self._load_node(i) for i in range(self.num_vectors)]
+        wanted = set(node_ids)
+        return [self._load_node(i) for i, node_id in enumerate(self._node_ids)
+                if node_id in wanted]
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            raise NotImplementedError("MmapVectorStore 不支持元数据过滤")
+        if self.num_vectors == 0:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+        query_embedding = np.asarray(query.query_embedding, dtype=np.float32)
+        query_embedding /= max(float(np.linalg.norm(query_embedding)), 1e-12)
+
+        # 存文本的向量存储不登记 index_struct，as_retriever() 会传入空列表，按"不限制"处理
+        if query.node_ids:
+            wanted = set(query.node_ids)
+            candidates = np.array(
+                [i for i, node_id in enumerate(self._node_ids) if node_id in wanted],
+                dtype=np.int64)
+            scores = self._embeddings[candidates] @ query_embedding
+        else:
+            candidates = None
+            scores = self._embeddings @ query_embedding
+
+        top_k = min(query.similarity_top_k, scores.shape[0])
+        if top_k <= 0:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        rows = candidates[top] if candidates is not None else top
+
+        return VectorStoreQueryResult(
+            nodes=[self._load_node(int(i)) for i in rows],
+            similarities=[float(s) for s in scores[top]],
+            ids=[self._node_ids[int(i)] for i in rows],
+        )
+
+    def persist(
+        self,
+        persist_path: str = os.path.join(DEFAULT_PERSIST_DIR, VECTORS_FNAME),
+        fs: Optional[Any] = None,
+    ) -> None:
+        """写出向量矩阵与节点 sidecar；persist_path 所在目录即持久化目录"""
+        persist_dir = os.path.dirname(persist_path) or "."
+        os.makedirs(persist_dir, exist_ok=True)
+        vectors_path = os.path.join(persist_dir, VECTORS_FNAME)
+        nodes_path = os.path.join(persist_dir, NODES_FNAME)
+
+        embeddings = self._embeddings
+        if embeddings is None:
+            embeddings = np.zeros((0, 0), dtype=np.float32)
+        # 先写临时文件再替换，避免其它进程正在 mmap 的文件被截断
+        tmp_vectors_path = vectors_path + ".tmp"
+        with open(tmp_vectors_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(embeddings, dtype=np.float32))
+        tmp_nodes_path = nodes_path + ".tmp"
+        with open(tmp_nodes_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self._raw_nodes))
+        os.replace(tmp_vectors_path, vectors_path)
+        os.replace(tmp_nodes_path, nodes_path)
+
+    def _load_node(self, i: int) -> BaseNode:
+        metadata = json.loads(self._raw_nodes[i].split("\t", 2)[2])
+        return metadata_dict_to_node(metadata)
@@ -0,0 +1,31 @@
+import os
+
+from llama_index.core import SimpleDirectoryReader, StorageContext, VectorStoreIndex
+
+from ann_vector_store import IVFFlatVectorStore
+
+PERSIST_DIR = "./storage/ivf_黑悟空"
+
+if os.path.exists(PERSIST_DIR):
+    # 1. 加载已持久化的 IVF 索引
+    vector_store = IVFFlatVectorStore.from_persist_dir(PERSIST_DIR)
+    index = VectorStoreIndex.from_vector_store(vector_store)
+else:
+    # 1. 读取数据
+    docs = SimpleDirectoryReader(
+        "../../data/黑悟空", required_exts=[".txt", ".md"]).load_data()
+
+    # 2. 创建索引；向量数达到 train_threshold 后自动训练聚类中心，之后的插入直接归入最近的列表
+    vector_store = IVFFlatVectorStore(nprobe=8, train_threshold=10000)
+    storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    index = VectorStoreIndex.from_documents(docs, storage_context=storage_context)
+    storage_context.persist(persist_dir=PERSIST_DIR)
+
+# 3. 创建查询引擎，nprobe 可按查询调整召回与延迟的平衡
+query_engine = index.as_query_engine(vector_store_kwargs={"nprobe": 16})
+
+# 4. 查询
+response = query_engine.query("黑神话悟空的主要内容是什么？")
+
+# 5. 输出结果
+print(response)
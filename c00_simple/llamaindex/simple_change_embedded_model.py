@@ -3,24 +3,26 @@ from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 import os
 
-from openai import files
+from cached_embedding import CachedEmbedding
 
 
 os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
 
-# 1. 加载嵌入模型(local)
-embedding = HuggingFaceEmbedding(
-    model_name="BAAI/bge-small-zh"
+# 1. 加载嵌入模型(local)，外面包一层磁盘缓存，文本不变就不再重复编码
+embedding = CachedEmbedding(
+    HuggingFaceEmbedding(model_name="BAAI/bge-small-zh"),
+    cache_path="./storage/embedding_cache.sqlite3"
 )
 
 # 2. 加载文档
-docs = SimpleDirectoryReader(files=["../../data/黑悟空/黑悟空wiki.txt"]).load_data()
+docs = SimpleDirectoryReader(input_files=["../../data/黑悟空/黑悟空wiki.txt"]).load_data()
 
 # 3. 创建索引
 index = VectorStoreIndex.from_documents(
     documents=docs,
-    embedding=embedding
+    embed_model=embedding
 )
+print(f"嵌入缓存命中率: {embedding.stats['hit_ratio']:.1%}")
 
 # 4. 创建查询引擎
 query_engine = index.as_query_engine()
@@ -1,11 +1,26 @@
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
+import os
 
-# 1. 读取数据
-docs = SimpleDirectoryReader(
-    input_files=['../../data/黑悟空/黑悟空wiki.txt']).load_data()
+from llama_index.core import SimpleDirectoryReader, StorageContext, VectorStoreIndex
 
-# 2. 创建索引
-index = VectorStoreIndex.from_documents(docs)
+from mmap_vector_store import MmapVectorStore
+
+PERSIST_DIR = "./storage/黑悟空wiki"
+
+if os.path.exists(PERSIST_DIR):
+    # 1. 热启动：mmap 打开已持久化的向量矩阵，无需重新切分和嵌入
+    vector_store = MmapVectorStore.from_persist_dir(PERSIST_DIR)
+    index = VectorStoreIndex.from_vector_store(vector_store)
+else:
+    # 1. 读取数据
+    docs = SimpleDirectoryReader(
+        input_files=['../../data/黑悟空/黑悟空wiki.txt']).load_data()
+
+    # 2. 创建索引，并持久化向量矩阵与节点 sidecar
+    vector_store = MmapVectorStore()
+    storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    index = VectorStoreIndex.from_documents(
+        docs, storage_context=storage_context)
+    storage_context.persist(persist_dir=PERSIST_DIR)
 
 # 3. 创建查询引擎
 query_engine = index.as_query_engine()
@@ -0,0 +1,246 @@
+"""并发网页加载器：连接池 + 按主机限流 + 磁盘缓存（ETag / Last-Modified 条件请求）
+
+- aiohttp 单个 ClientSession 复用连接；总并发和每个主机的并发用信号量放行，拿到名额才开始计时，
+  排队时间不算进 timeout（全部 URL 一次性建好任务，只靠 TCPConnector 限流时排队也会算进 total 超时）
+- 响应缓存：url 的哈希 -> 元数据（ETag、Last-Modified、内容哈希），正文按内容哈希存放；
+  再次抓取时带 If-None-Match / If-Modified-Since，服务端返回 304 就直接用缓存正文
+- 解析缓存：按 (内容哈希, 解析器) 缓存解析结果，内容没变就不再跑 BeautifulSoup
+- 文档元数据与 WebBaseLoader 相同（source / title / description / language）
+
+用法：
+    loader = AsyncWebLoader(["https://zh.wikipedia.org/wiki/黑神话：悟空"])
+    docs = loader.load()
+与 WebBaseLoader 的对比见 async_web_loader_benchmark.py
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from bs4 import BeautifulSoup
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+PARSER_VERSION = "bs4-text-v1"
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_html(html: str, url: str) -> Dict:
+    """与 WebBaseLoader 一致：正文取 get_text()，元数据取 title / description / language"""
+    soup = BeautifulSoup(html, "html.parser")
+    metadata = {"source": url}
+    if soup.find("title"):
+        metadata["title"] = soup.find("title").get_text()
+    description = soup.find("meta", attrs={"name": "description"})
+    if description:
+        metadata["description"] = description.get("content", "No description found.")
+    if soup.find("html"):
+        metadata["language"] = soup.find("html").get("lang", "No language found.")
+    return {"page_content": soup.get_text(), "metadata": metadata}
+
+
+def _retryable(error: BaseException) -> bool:
+    """只重试 429、5xx 和连接 / 超时错误；404、410 等重试也不会变"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    return True
+
+
+class ResponseCache:
+    """磁盘缓存：meta/<url 哈希>.json，body/<内容哈希>，parsed/<内容哈希>.<解析器>.json"""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        for sub in ("meta", "body", "parsed"):
+            os.makedirs(os.path.join(cache_dir, sub), exist_ok=True)
+
+    def _meta_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, "meta", _sha256(url.encode("utf-8")) + ".json")
+
+    def get_meta(self, url: str) -> Optional[Dict]:
+        path = self._meta_path(url)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if not os.path.exists(self.body_path(meta["content_hash"])):
+            return None
+        return meta
+
+    def put(self, url: str, body: bytes, headers, encoding: str) -> Dict:
+        content_hash = _sha256(body)
+        body_path = self.body_path(content_hash)
+        if not os.path.exists(body_path):
+            self._atomic_write(body_path, body)
+        meta = {"url": url, "content_hash": content_hash, "encoding": encoding,
+                "etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified"),
+                "fetched_at": time.time()}
+        self._atomic_write(self._meta_path(url), json.dumps(meta).encode("utf-8"))
+        return meta
+
+    def body_path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, "body", content_hash)
+
+    def read_body(self, content_hash: str) -> bytes:
+        with open(self.body_path(content_hash), "rb") as f:
+            return f.read()
+
+    def get_parsed(self, content_hash: str, url: str) -> Optional[Dict]:
+        path = os.path.join(self.cache_dir, "parsed", f"{content_hash}.{PARSER_VERSION}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            parsed = json.load(f)
+        # 同样内容可能来自不同 url
+        parsed["metadata"]["source"] = url
+        return parsed
+
+    def put_parsed(self, content_hash: str, parsed: Dict) -> None:
+        path = os.path.join(self.cache_dir, "parsed", f"{content_hash}.{PARSER_VERSION}.json")
+        self._atomic_write(path, json.dumps(parsed, ensure_ascii=False).encode("utf-8"))
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+class _Admission:
+    """总并发 + 每个主机的并发：拿到两个名额才发请求"""
+
+    def __init__(self, max_connections: int, max_per_host: int):
+        self.max_per_host = max_per_host
+        self.total = asyncio.Semaphore(max_connections)
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    def host(self, url: str) -> asyncio.Semaphore:
+        netloc = urlsplit(url).netloc
+        if netloc not in self._hosts:
+            self._hosts[netloc] = asyncio.Semaphore(self.max_per_host)
+        return self._hosts[netloc]
+
+
+class AsyncWebLoader(BaseLoader):
+    def __init__(
+        self,
+        web_paths: List[str],
+        cache_dir: str = "./storage/web_cache",
+        max_connections: int = 64,
+        max_per_host: int = 4,
+        timeout: float = 30,
+        max_retries: int = 2,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self.web_paths = web_paths
+        self.cache = ResponseCache(cache_dir)
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.headers = headers or {"User-Agent": "Mozilla/5.0 (compatible; AsyncWebLoader)"}
+        self.stats = {"fetched": 0, "not_modified": 0, "parse_cache_hits": 0, "parsed": 0}
+
+    async def alazy_load(self) -> AsyncIterator[Document]:
+        """按完成顺序产出文档"""
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_per_host)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        admission = _Admission(self.max_connections, self.max_per_host)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers=self.headers) as session:
+            tasks = [asyncio.create_task(self._load_one(session, admission, url)) for url in self.web_paths]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    yield await task
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def aload_all(self) -> List[Document]:
+        """按 web_paths 的顺序返回"""
+        docs = {doc.metadata["source"]: doc async for doc in self.alazy_load()}
+        return [docs[url] for url in self.web_paths]
+
+    def lazy_load(self) -> Iterator[Document]:
+        """同步接口：事件循环跑在单独的线程里，调用方已有运行中的事件循环（如 Jupyter）也能用；
+        每次 next() 只等下一个完成的页面，按完成顺序产出"""
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        documents = self.alazy_load()
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(documents.__anext__(), loop).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            # 调用方提前退出时取消未完成的请求，关闭 session 和线程池
+            asyncio.run_coroutine_threadsafe(documents.aclose(), loop).result()
+            asyncio.run_coroutine_threadsafe(loop.shutdown_default_executor(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def load(self) -> List[Document]:
+        """按 web_paths 的顺序返回"""
+        docs = {doc.metadata["source"]: doc for doc in self.lazy_load()}
+        return [docs[url] for url in self.web_paths]
+
+    async def _load_one(self, session: aiohttp.ClientSession, admission: _Admission, url: str) -> Document:
+        meta = await self._fetch(session, admission, url)
+        parsed = self.cache.get_parsed(meta["content_hash"], url)
+        if parsed is not None:
+            self.stats["parse_cache_hits"] += 1
+        else:
+            body = self.cache.read_body(meta["content_hash"])
+            # 解析是 CPU 密集的，放到线程里避免阻塞事件循环
+            parsed = await asyncio.to_thread(
+                parse_html, body.decode(meta["encoding"] or "utf-8", errors="replace"), url)
+            self.cache.put_parsed(meta["content_hash"], parsed)
+            self.stats["parsed"] += 1
+        return Document(page_content=parsed["page_content"], metadata=parsed["metadata"])
+
+    async def _fetch(self, session: aiohttp.ClientSession, admission: _Admission, url: str) -> Dict:
+        cached = self.cache.get_meta(url)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        host = admission.host(url)
+        for attempt in range(self.max_retries + 1):
+            try:
+                # 先拿名额再发请求，total 超时只从真正发出请求时算起；退避等待时不占名额
+                async with host, admission.total, session.get(url, headers=headers) as response:
+                    if response.status == 304 and cached:
+                        self.stats["not_modified"] += 1
+                        return cached
+                    response.raise_for_status()
+                    body = await response.read()
+                    self.stats["fetched"] += 1
+                    return self.cache.put(url, body, response.headers,
+                                          response.get_encoding() if body else "utf-8")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries or not _retryable(e):
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+
+if __name__ == "__main__":
+    loader = AsyncWebLoader(["https://zh.wikipedia.org/wiki/黑神话：悟空"], max_per_host=4)
+    for doc in loader.lazy_load():
+        print(doc.metadata)
+    # 再次运行时服务端返回 304，解析结果直接命中缓存
+    print(loader.stats)
@@ -0,0 +1,102 @@
+"""AsyncWebLoader 与 WebBaseLoader 的对比（本地替身服务器，不需要网络）
+
+替身服务器生成 --pages 个页面，每个页面带 ETag / Last-Modified，支持条件请求：
+    WebBaseLoader：逐个页面顺序抓取
+    AsyncWebLoader 第 1 次：冷启动，全部 200 并解析
+    AsyncWebLoader 第 2 次：全部 304，解析结果直接命中缓存
+
+用法：
+    python async_web_loader_benchmark.py
+    python async_web_loader_benchmark.py --pages 300
+"""
+import argparse
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from langchain_community.document_loaders import WebBaseLoader
+
+from async_web_loader import AsyncWebLoader, _sha256
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """本地替身服务器：每个页面带 ETag / Last-Modified，支持条件请求"""
+
+    pages: Dict[str, bytes] = {}
+    last_modified = formatdate(usegmt=True)
+    requests = {"200": 0, "304": 0, "404": 0}
+    delay = 0.02  # 模拟网络与服务端耗时
+
+    def do_GET(self):
+        body = self.pages.get(self.path)
+        if body is None:
+            self.requests["404"] += 1
+            self.send_error(404)
+            return
+        etag = '"' + _sha256(body)[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.requests["304"] += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        time.sleep(self.delay)
+        self.requests["200"] += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_page(i: int, paragraphs: int = 200) -> bytes:
+    body = "".join(f"<p>天命人前往黑风山寻找根器，第{i}页第{j}段。</p>" for j in range(paragraphs))
+    return (f'<html lang="zh"><head><title>黑神话：悟空 {i}</title>'
+            f'<meta name="description" content="第{i}页"></head><body>{body}</body></html>').encode("utf-8")
+
+
+class _Server(ThreadingHTTPServer):
+    # 默认 listen 队列只有 5，并发连接多时新连接要等 1s 的 SYN 重传，测出来的是这个而不是加载器
+    request_queue_size = 128
+
+
+def start_server(handler) -> ThreadingHTTPServer:
+    server = _Server(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=100)
+    args = parser.parse_args()
+
+    # 1. 启动本地替身服务器
+    for i in range(args.pages):
+        StandInHandler.pages[f"/wiki/{i}"] = make_page(i)
+    server = start_server(StandInHandler)
+    urls = [f"http://127.0.0.1:{server.server_port}/wiki/{i}" for i in range(args.pages)]
+
+    # 2. 对照：WebBaseLoader 逐个页面顺序抓取
+    start = time.perf_counter()
+    docs = WebBaseLoader(web_paths=urls).load()
+    print(f"WebBaseLoader: {len(docs)} 个文档, {time.perf_counter() - start:.2f}s")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # 3. 冷启动：全部 200 并解析；再次运行：全部 304，解析结果直接命中缓存
+        for round_no in (1, 2):
+            loader = AsyncWebLoader(urls, cache_dir=cache_dir, max_per_host=8)
+            start = time.perf_counter()
+            docs = loader.load()
+            print(f"第 {round_no} 次: {len(docs)} 个文档, {time.perf_counter() - start:.2f}s, "
+                  f"{loader.stats}, 服务端 {StandInHandler.requests}")
+        print(docs[0].metadata)
+    server.shutdown()
@@ -9,8 +9,13 @@ from langchain_community.document_loaders import DirectoryLoader
 # loader = DirectoryLoader("../../data/黑悟空", glob="**/黑悟空英文.jpg")
 # loader = DirectoryLoader("../../data/黑悟空", glob="**/黑悟空销量.jpg")
 loader = DirectoryLoader("../../data/黑悟空", glob="**/*.md")
-docs = loader.load()
-for doc in docs:
+# lazy_load 逐个文件产出文档，不会一次性把整个目录读进内存
+for doc in loader.lazy_load():
     print(doc.metadata)
     print(doc.page_content)
     print("-" * 30)
+
+# 并行加载：文本走线程池、Unstructured 分区走进程池，文件类型识别结果按 (路径, 大小, mtime) 缓存
+# from parallel_directory_loader import ParallelDirectoryLoader
+# loader = ParallelDirectoryLoader("../../data/黑悟空", max_processes=4)
+# docs = loader.load()
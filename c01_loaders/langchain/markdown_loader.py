@@ -1,8 +1,7 @@
 from langchain_community.document_loaders import UnstructuredMarkdownLoader
 
 loader = UnstructuredMarkdownLoader("../../data/黑悟空/黑悟空版本介绍.md", mode="single")
-docs = loader.load()
-for doc in docs:
+for doc in loader.lazy_load():
     print(doc.metadata)
     print(doc.page_content)
     print("-" * 30)
\ No newline at end of file
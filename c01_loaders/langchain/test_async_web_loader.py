@@ -0,0 +1,79 @@
+"""AsyncWebLoader 的条件请求与解析缓存（本地替身服务器，不需要网络）
+
+    python -m pytest test_async_web_loader.py
+"""
+import aiohttp
+import pytest
+
+from async_web_loader import AsyncWebLoader
+from async_web_loader_benchmark import StandInHandler, make_page, start_server
+
+
+@pytest.fixture
+def server():
+    # 每个用例一份独立的页面和计数
+    handler = type("Handler", (StandInHandler,), {
+        "pages": {f"/wiki/{i}": make_page(i, paragraphs=5) for i in range(3)},
+        "requests": {"200": 0, "304": 0, "404": 0},
+        "delay": 0.0,
+    })
+    server = start_server(handler)
+    server.handler = handler
+    yield server
+    server.shutdown()
+
+
+def _urls(server, paths):
+    return [f"http://127.0.0.1:{server.server_port}{path}" for path in paths]
+
+
+def test_second_run_uses_304_and_parse_cache(server, tmp_path):
+    urls = _urls(server, [f"/wiki/{i}" for i in range(3)])
+
+    first = AsyncWebLoader(urls, cache_dir=str(tmp_path))
+    docs = first.load()
+    assert [doc.metadata["source"] for doc in docs] == urls
+    assert first.stats == {"fetched": 3, "not_modified": 0, "parse_cache_hits": 0, "parsed": 3}
+
+    second = AsyncWebLoader(urls, cache_dir=str(tmp_path))
+    cached = second.load()
+    assert second.stats == {"fetched": 0, "not_modified": 3, "parse_cache_hits": 3, "parsed": 0}
+    assert server.handler.requests == {"200": 3, "304": 3, "404": 0}
+    assert [doc.page_content for doc in cached] == [doc.page_content for doc in docs]
+    assert cached[0].metadata["title"] == "黑神话：悟空 0"
+
+
+def test_changed_page_is_downloaded_and_parsed_again(server, tmp_path):
+    urls = _urls(server, ["/wiki/0", "/wiki/1"])
+    AsyncWebLoader(urls, cache_dir=str(tmp_path)).load()
+
+    server.handler.pages["/wiki/1"] = make_page(100, paragraphs=5)
+    loader = AsyncWebLoader(urls, cache_dir=str(tmp_path))
+    docs = loader.load()
+    assert loader.stats == {"fetched": 1, "not_modified": 1, "parse_cache_hits": 1, "parsed": 1}
+    assert docs[1].metadata["title"] == "黑神话：悟空 100"
+
+
+def test_404_is_not_retried(server, tmp_path):
+    loader = AsyncWebLoader(_urls(server, ["/missing"]), cache_dir=str(tmp_path), max_retries=2)
+    with pytest.raises(aiohttp.ClientResponseError):
+        loader.load()
+    assert server.handler.requests["404"] == 1
+
+
+def test_lazy_load_stops_early(server, tmp_path):
+    loader = AsyncWebLoader(_urls(server, [f"/wiki/{i}" for i in range(3)]), cache_dir=str(tmp_path))
+    for doc in loader.lazy_load():
+        break
+    assert doc.metadata["source"].startswith("http://127.0.0.1")
+
+
+def test_queued_requests_do_not_count_against_timeout(server, tmp_path):
+    # 40 页 × 0.2s，每个主机 2 个并发，总共要 4s；每个请求自己只要 0.2s，不应超过 2s 的 timeout
+    server.handler.pages = {f"/slow/{i}": make_page(i, paragraphs=5) for i in range(40)}
+    server.handler.delay = 0.2
+    urls = _urls(server, [f"/slow/{i}" for i in range(40)])
+    loader = AsyncWebLoader(urls, cache_dir=str(tmp_path), max_per_host=2, timeout=2, max_retries=0)
+    docs = loader.load()
+    assert len(docs) == 40
+    assert loader.stats["fetched"] == 40
@@ -2,7 +2,11 @@ from langchain_community.document_loaders import TextLoader
 
 # loader = TextLoader("../../data/黑悟空/设定.txt")
 loader = TextLoader("../../data/黑悟空/黑悟空版本介绍.md")
-docs = loader.load()
-printout = [str(len(docs)), "-" * 30, str(docs[0].metadata),
-            "-"*30, docs[0].page_content]
-print("\n\n".join(printout))
+count = 0
+for doc in loader.lazy_load():
+    if count == 0:
+        printout = [str(doc.metadata), "-"*30, doc.page_content]
+        print("\n\n".join(printout))
+    count += 1
+print("-" * 30)
+print(count)
@@ -2,7 +2,14 @@ import bs4
 from langchain_community.document_loaders import WebBaseLoader
 page_url = "https://zh.wikipedia.org/wiki/黑神话：悟空"
 loader = WebBaseLoader(web_paths=[page_url])
-docs = loader.load()
-print(docs[0].metadata)
-print("-"*100)
-print(docs[0].page_content)
\ No newline at end of file
+# lazy_load 每抓取、解析完一个页面就产出一个文档
+for doc in loader.lazy_load():
+    print(doc.metadata)
+    print("-"*100)
+    print(doc.page_content)
+
+# 批量抓取：连接池 + 按主机限流并发，响应按 ETag / Last-Modified 缓存，未变化的页面不再下载和解析
+# from async_web_loader import AsyncWebLoader
+# loader = AsyncWebLoader(web_paths=[page_url], max_per_host=4)
+# for doc in loader.lazy_load():
+#     print(doc.metadata)
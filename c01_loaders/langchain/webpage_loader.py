@@ -2,10 +2,13 @@ from langchain_unstructured import UnstructuredLoader
 
 page_url = "https://zh.wikipedia.org/wiki/黑神话：悟空"
 loader = UnstructuredLoader(web_url=page_url)
-docs = loader.load()
-print(docs[0].metadata)
-print("-"*100)
-print(docs[0].page_content)
-print("-"*100)
-for doc in docs[:5]:
-    print(doc)
\ No newline at end of file
+# lazy_load 逐个产出分区元素，可以直接接到切分，不必先攒成完整列表
+for i, doc in enumerate(loader.lazy_load()):
+    if i == 0:
+        print(doc.metadata)
+        print("-"*100)
+        print(doc.page_content)
+        print("-"*100)
+    print(doc)
+    if i == 4:
+        break
\ No newline at end of file
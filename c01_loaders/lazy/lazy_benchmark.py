@@ -0,0 +1,86 @@
+"""load() 与 lazy_load() 的峰值内存、首个切块耗时对比
+
+在临时目录生成大量合成文本文件，分别用两种方式走 加载 -> 切分 -> 嵌入：
+    - eager：DirectoryLoader.load() 拿到全部文档，再整体切分、嵌入
+    - lazy ：DirectoryLoader.lazy_load() + prefetch，逐文档切分、按批嵌入
+每种方式在独立子进程中运行，统计峰值 RSS。嵌入用哈希向量代替真实模型，只测加载管线本身。
+
+用法：
+    python lazy_benchmark.py                   # 600 个 50KB 文件，约 30MB
+    python lazy_benchmark.py --files 500 --kb 20
+"""
+import argparse
+import hashlib
+import os
+import random
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from langchain_community.document_loaders import DirectoryLoader, TextLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from streaming import prefetch, split_and_embed
+
+WORDS = ["天命人", "黑风山", "悟空", "根器", "妖王", "土地公", "观音禅院", "黄风岭", "小西天", "盘丝洞"]
+
+
+def make_corpus(root: str, files: int, kb: int) -> None:
+    rng = random.Random(0)
+    for i in range(files):
+        with open(os.path.join(root, f"doc_{i:05d}.txt"), "w", encoding="utf-8") as f:
+            written = 0
+            while written < kb * 1024:
+                paragraph = "".join(rng.choice(WORDS) for _ in range(40)) + "。\n\n"
+                f.write(paragraph)
+                written += len(paragraph.encode("utf-8"))
+
+
+def fake_embed(texts: List[str]) -> List[List[float]]:
+    return [[b / 255 for b in hashlib.sha256(text.encode("utf-8")).digest()[:16]] for text in texts]
+
+
+def run(root: str, lazy: bool):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    loader = DirectoryLoader(root, glob="**/*.txt", loader_cls=TextLoader,
+                             loader_kwargs={"encoding": "utf-8"})
+    start = time.perf_counter()
+    first_chunk, chunks = None, 0
+    if lazy:
+        batches = split_and_embed(
+            prefetch(loader.lazy_load(), maxsize=8),
+            split=lambda doc: splitter.split_text(doc.page_content),
+            embed=fake_embed)
+    else:
+        documents = loader.load()
+        all_texts = [chunk.page_content for chunk in splitter.split_documents(documents)]
+        batches = ((all_texts[i:i + 64], fake_embed(all_texts[i:i + 64]))
+                   for i in range(0, len(all_texts), 64))
+    for texts, _ in batches:
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        chunks += len(texts)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return first_chunk, chunks, time.perf_counter() - start, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=600)
+    parser.add_argument("--kb", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        make_corpus(root, args.files, args.kb)
+        print(f"{args.files} 个文件, 共 {args.files * args.kb / 1024:.0f} MB")
+        for name, lazy in [("load()", False), ("lazy_load()", True)]:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                first_chunk, chunks, total, peak = executor.submit(run, root, lazy).result()
+            print(f"{name:<12} 首批切块 {first_chunk:.2f}s, 共 {chunks} 块, "
+                  f"总耗时 {total:.2f}s, 峰值 RSS {peak:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+from langchain_community.document_loaders import TextLoader, UnstructuredMarkdownLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from streaming import LazyPagedCSVReader, iter_documents, lazy_partition_text, prefetch
+
+# 1. LangChain loader：lazy_load 逐个产出文档，prefetch 在后台线程预取（有界队列）
+splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=20)
+for loader in [TextLoader("../../data/黑悟空/设定.txt", encoding="utf-8"),
+               UnstructuredMarkdownLoader("../../data/黑悟空/黑悟空版本介绍.md", mode="single")]:
+    for doc in prefetch(iter_documents(loader), maxsize=4):
+        print(doc.metadata, len(splitter.split_text(doc.page_content)), "个切块")
+print("-" * 30)
+
+# 2. CSV：与 PagedCSVReader 输出相同，每读一行产出一个 Document
+reader = LazyPagedCSVReader()
+for doc in reader.lazy_load_data("../../data/黑悟空/黑神话悟空.csv"):
+    print(doc.text)
+    print("-" * 30)
+
+# 3. unstructured：按段落块调用 partition_text，逐个产出元素
+for element in lazy_partition_text("../../data/黑悟空/设定.txt"):
+    print(type(element).__name__, element.text)
+    print("-" * 30)
@@ -0,0 +1,132 @@
+"""统一的流式加载接口：逐个产出文档/元素，直接接到切分和嵌入
+
+各框架自带的惰性接口：
+    - LangChain 的 BaseLoader.lazy_load()（TextLoader、UnstructuredMarkdownLoader、
+      WebBaseLoader、UnstructuredLoader、DirectoryLoader）
+    - llama_index 的 BaseReader.lazy_load_data()
+这里补上没有惰性接口的两个：
+    - LazyPagedCSVReader：与 PagedCSVReader 输出相同，每读一行产出一个 Document
+    - lazy_partition_text：按段落块读取文本文件，逐块调用 partition_text，逐个产出元素
+再用 prefetch() 把任意生成器放到后台线程里预取，队列有界（背压），
+split_and_embed() 按批切分、嵌入，第一批切块不必等全部文件加载完。
+"""
+import csv
+import queue
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from llama_index.core.readers.base import BaseReader
+from llama_index.core.schema import Document
+
+_DONE = object()
+
+
+def iter_documents(source) -> Iterator:
+    """LangChain loader 用 lazy_load，llama_index reader 用 lazy_load_data，其余当作可迭代对象"""
+    if hasattr(source, "lazy_load"):
+        return source.lazy_load()
+    if hasattr(source, "lazy_load_data"):
+        return source.lazy_load_data()
+    return iter(source)
+
+
+def prefetch(iterable: Iterable, maxsize: int = 8) -> Iterator:
+    """后台线程预取，最多缓存 maxsize 个元素；消费者慢时生产者阻塞"""
+    items: "queue.Queue" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        """队列满时每 0.1s 检查一次 stop，消费者已退出就放弃，不会永远阻塞"""
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:  # 异常交给消费者线程抛出
+            put(e)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+
+
+class LazyPagedCSVReader(BaseReader):
+    """PagedCSVReader 的流式版本：每行 "列名: 值" 拼成一个 Document"""
+
+    def __init__(self, encoding: str = "utf-8"):
+        self.encoding = encoding
+
+    def lazy_load_data(
+        self,
+        file: Path,
+        extra_info: Optional[dict] = None,
+        delimiter: str = ",",
+        quotechar: str = '"',
+    ) -> Iterator[Document]:
+        with open(file, "r", encoding=self.encoding, newline="") as f:
+            for row in csv.DictReader(f, delimiter=delimiter, quotechar=quotechar):
+                text = "\n".join(f"{key.strip()}: {value.strip()}" for key, value in row.items())
+                yield Document(text=text, extra_info=extra_info or {})
+
+    def load_data(self, file: Path, extra_info: Optional[dict] = None, **kwargs) -> List[Document]:
+        return list(self.lazy_load_data(file, extra_info, **kwargs))
+
+
+def _iter_blocks(filename: str, block_chars: int, encoding: str) -> Iterator[str]:
+    """按空行切段，攒够 block_chars 个字符产出一块，不会把段落截断"""
+    block: List[str] = []
+    size = 0
+    with open(filename, "r", encoding=encoding) as f:
+        for line in f:
+            block.append(line)
+            size += len(line)
+            if size >= block_chars and not line.strip():
+                yield "".join(block)
+                block, size = [], 0
+    if block:
+        yield "".join(block)
+
+
+def lazy_partition_text(filename: str, block_chars: int = 64 * 1024, encoding: str = "utf-8") -> Iterator:
+    """逐块调用 unstructured 的 partition_text，逐个产出元素"""
+    from unstructured.partition.text import partition_text
+
+    for block in _iter_blocks(filename, block_chars, encoding):
+        yield from partition_text(text=block)
+
+
+def split_and_embed(
+    documents: Iterable,
+    split: Callable[[object], Sequence[str]],
+    embed: Callable[[List[str]], List[List[float]]],
+    batch_size: int = 64,
+) -> Iterator[Tuple[List[str], List[List[float]]]]:
+    """逐个文档切分，攒够 batch_size 个切块就嵌入并产出一批 (texts, vectors)"""
+    batch: List[str] = []
+    for document in documents:
+        batch.extend(split(document))
+        while len(batch) >= batch_size:
+            texts, batch = batch[:batch_size], batch[batch_size:]
+            yield texts, embed(texts)
+    if batch:
+        yield batch, embed(batch)
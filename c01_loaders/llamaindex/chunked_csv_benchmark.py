@@ -0,0 +1,88 @@
+"""ChunkedCSVReader 与 PagedCSVReader 的吞吐对比（行/秒）
+
+生成一份合成 CSV（列与 黑神话悟空.csv 相同），分别统计：
+    - PagedCSVReader.load_data：逐行 Python 拼接
+    - ChunkedCSVReader 只生成文本（iter_texts）：衡量解析 + 向量化拼接本身
+    - ChunkedCSVReader.lazy_load_data：含 Document 对象构造
+    - rows_per_document=100：多行合并成一个 Document
+并校验两者产出的文本一致。
+
+每个 Document 的构造（pydantic 校验 + uuid）约 25~30 微秒，逐行一个 Document 时它是瓶颈，
+文本拼接本身的速度差异要看 "Chunked 文本" 一行；合并多行能把这部分开销摊薄。
+
+用法：
+    python chunked_csv_benchmark.py                 # 200k 行
+    python chunked_csv_benchmark.py --rows 1000000 --skip-baseline
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from llama_index.readers.file import PagedCSVReader
+
+from chunked_csv_reader import ChunkedCSVReader
+
+CATEGORIES = ["装备", "技能", "人物", "地点"]
+NAMES = ["铜云棒", "天雷击", "悟空", "银角大王", "黑风山", "火焰舞", "百戏衬钱衣"]
+
+
+def make_csv(path: str, rows: int) -> None:
+    rng = random.Random(0)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Category", "Name", "Description", "PowerLevel"])
+        for i in range(rows):
+            writer.writerow([rng.choice(CATEGORIES), f"{rng.choice(NAMES)}{i}",
+                             "一段描述，" * rng.randint(1, 5), rng.randint(1, 100)])
+
+
+def report(name: str, rows: int, seconds: float) -> None:
+    print(f"{name:<32}{seconds:>8.2f}s{rows / seconds:>14,.0f} 行/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rows.csv")
+        make_csv(path, args.rows)
+        print(f"{args.rows:,} 行, {os.path.getsize(path) / 2**20:.1f} MB")
+
+        for engine in ["c", "pyarrow"]:
+            reader = ChunkedCSVReader(chunksize=args.chunksize, engine=engine)
+            start = time.perf_counter()
+            try:
+                count = sum(len(texts) for texts in reader.iter_texts(path))
+            except ImportError:
+                print(f"engine={engine} 不可用，跳过")
+                continue
+            report(f"Chunked 文本 (engine={engine})", count, time.perf_counter() - start)
+
+        reader = ChunkedCSVReader(chunksize=args.chunksize)
+        start = time.perf_counter()
+        chunked_docs = reader.load_data(path)
+        report("Chunked Document", len(chunked_docs), time.perf_counter() - start)
+
+        reader = ChunkedCSVReader(chunksize=args.chunksize, rows_per_document=100)
+        start = time.perf_counter()
+        grouped_docs = reader.load_data(path)
+        report("Chunked Document (100 行/个)", args.rows, time.perf_counter() - start)
+        print(f"按 100 行合并后共 {len(grouped_docs):,} 个 Document")
+
+        if not args.skip_baseline:
+            start = time.perf_counter()
+            paged_docs = PagedCSVReader().load_data(path)
+            report("PagedCSVReader Document", len(paged_docs), time.perf_counter() - start)
+            same = all(a.text == b.text for a, b in zip(paged_docs, chunked_docs))
+            print(f"文本一致: {same and len(paged_docs) == len(chunked_docs)}")
+
+
+if __name__ == "__main__":
+    main()
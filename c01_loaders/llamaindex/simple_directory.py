@@ -1,11 +1,23 @@
 from llama_index.core import SimpleDirectoryReader
-from llama_index.readers.file import PagedCSVReader
+
+from chunked_csv_reader import ChunkedCSVReader
 
 # 读取目录下所有文件
 # reader = SimpleDirectoryReader("../../data/黑悟空")
 # docs = reader.load_data()
 # print(docs)
 
+# 多进程读取：num_workers 个进程并行解析文件
+# （解析+切分放进进程池、嵌入在主进程批量完成的完整流程见 llama_tutorials/rags/parallel_ingestion.py）
+# reader = SimpleDirectoryReader("../../data/黑悟空")
+# docs = reader.load_data(num_workers=4)
+# print(len(docs))
+
+# 逐个文件读取：iter_data 每读完一个文件就产出该文件的文档列表
+# reader = SimpleDirectoryReader("../../data/黑悟空")
+# for docs in reader.iter_data():
+#     print(docs)
+
 # 读取图片
 # reader = SimpleDirectoryReader(input_files=["../../data/黑悟空/黑悟空英文.jpg"])
 # docs = reader.load_data()
@@ -26,13 +38,21 @@ from llama_index.readers.file import PagedCSVReader
 # docs = reader.load_data()
 # print(docs[0].text)
 
-# 读取csv
-reader = PagedCSVReader()
-docs = reader.load_data(
+# 读取csv（逐行 Python 处理）
+# from llama_index.readers.file import PagedCSVReader
+# reader = PagedCSVReader()
+# docs = reader.load_data(
+#     file="../../data/黑悟空/黑神话悟空.csv",
+#     delimiter=",",
+#     quotechar='"'
+# )
+# print(docs[0].text)
+
+# 读取csv（pandas 分块解析 + 列级字符串拼接，每块处理完就流式产出 Document）
+reader = ChunkedCSVReader(chunksize=50_000)
+for doc in reader.lazy_load_data(
     file="../../data/黑悟空/黑神话悟空.csv",
     delimiter=",",
     quotechar='"'
-)
-# print(docs[0].text)
-for doc in docs:
+):
     print(doc.text)
\ No newline at end of file
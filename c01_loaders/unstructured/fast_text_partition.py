@@ -0,0 +1,143 @@
+"""轻量的纯文本分区器：.txt / .md 的快速路径，替代 partition_text
+
+partition_text 会导入 unstructured 的整套依赖（nltk、分类模型等），并对每个元素做 NLP 分类；
+对纯文本来说这些开销远大于实际工作。这里只用标准库：
+    - 按块（默认 1 MB）流式读取文件，以空行切段，跨块的段落会拼接完整
+    - 用预编译正则把段落分成 Title / ListItem / NarrativeText / UncategorizedText
+    - 元素的 category、text、metadata 与 unstructured 的同名元素对应；
+      需要真正的 unstructured 元素对象时调用 to_unstructured()（此时才导入 unstructured）
+
+用法：
+    for element in iter_partition_text("../../data/黑悟空/设定.txt"):
+        print(element.category, element.text)
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+_PARAGRAPH_SPLIT = re.compile(r"\n[ \t\r\f\v]*\n")
+_BULLET = re.compile(r"^\s*(?:[•·●○◦▪■□◆◇\-\*–—]|\d{1,3}[\.\)、]|[一二三四五六七八九十]{1,3}、|\(\d{1,3}\)|（\d{1,3}）)\s*")
+_MD_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+")
+_SENTENCE_END = re.compile(r"[。！？；.!?;:：，,]\s*$")
+_HAS_WORD = re.compile(r"[A-Za-z一-鿿]")
+_WHITESPACE = re.compile(r"\s+")
+
+# 标题的长度上限：中文按字符数，英文按单词数
+TITLE_MAX_CHARS = 30
+TITLE_MAX_WORDS = 12
+
+
+@dataclass
+class TextElement:
+    category: str
+    text: str
+    metadata: Dict = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return {"type": self.category, "text": self.text, "metadata": dict(self.metadata)}
+
+    def to_unstructured(self):
+        from unstructured.documents.elements import (
+            ElementMetadata,
+            ListItem,
+            NarrativeText,
+            Text,
+            Title,
+        )
+        cls = {"Title": Title, "ListItem": ListItem, "NarrativeText": NarrativeText}.get(self.category, Text)
+        return cls(text=self.text, metadata=ElementMetadata(**self.metadata))
+
+    def __str__(self) -> str:
+        return self.text
+
+
+def classify(paragraph: str) -> Optional[TextElement]:
+    text = _WHITESPACE.sub(" ", paragraph).strip()
+    if not text:
+        return None
+    bullet = _BULLET.match(text)
+    if bullet and len(text) > bullet.end():
+        return TextElement("ListItem", text[bullet.end():].strip())
+    heading = _MD_HEADING.match(text)
+    if heading:
+        return TextElement("Title", text[heading.end():].strip())
+    if not _HAS_WORD.search(text):
+        return TextElement("UncategorizedText", text)
+    is_short = len(text) <= TITLE_MAX_CHARS if not text.isascii() else len(text.split()) <= TITLE_MAX_WORDS
+    if is_short and "\n" not in paragraph.strip() and not _SENTENCE_END.search(text):
+        return TextElement("Title", text)
+    return TextElement("NarrativeText", text)
+
+
+def _split_blocks(paragraph: str) -> Iterator[str]:
+    """段落内以列表符号或 markdown 标题开头的行单独成块，其余相邻行合为一块"""
+    lines = paragraph.split("\n")
+    if len(lines) == 1:
+        yield paragraph
+        return
+    group: List[str] = []
+    for line in lines:
+        if _BULLET.match(line) or _MD_HEADING.match(line):
+            if group:
+                yield "\n".join(group)
+                group = []
+            yield line
+        else:
+            group.append(line)
+    if group:
+        yield "\n".join(group)
+
+
+def _iter_elements(paragraphs, metadata: Dict) -> Iterator[TextElement]:
+    for paragraph in paragraphs:
+        for block in _split_blocks(paragraph.replace("\r", "")):
+            element = classify(block)
+            if element is not None:
+                element.metadata = dict(metadata)
+                yield element
+
+
+def _iter_paragraphs(f, chunk_size: int) -> Iterator[str]:
+    tail = ""
+    while True:
+        block = f.read(chunk_size)
+        if not block:
+            break
+        parts = _PARAGRAPH_SPLIT.split(tail + block)
+        # 最后一段可能被块边界截断，留到下一块
+        tail = parts.pop()
+        yield from parts
+    if tail:
+        yield tail
+
+
+def iter_partition_text(
+    filename: Optional[str] = None,
+    text: Optional[str] = None,
+    encoding: str = "utf-8",
+    chunk_size: int = 1 << 20,
+) -> Iterator[TextElement]:
+    """流式分区：逐个产出元素"""
+    if (filename is None) == (text is None):
+        raise ValueError("filename 和 text 必须且只能传一个")
+    metadata = {"filetype": "text/plain"}
+    if filename is not None:
+        metadata.update(filename=os.path.basename(filename),
+                        file_directory=os.path.dirname(filename) or None)
+        if filename.lower().endswith(".md"):
+            metadata["filetype"] = "text/markdown"
+
+    if text is not None:
+        yield from _iter_elements(_PARAGRAPH_SPLIT.split(text), metadata)
+        return
+    with open(filename, "r", encoding=encoding, newline="") as f:
+        yield from _iter_elements(_iter_paragraphs(f, chunk_size), metadata)
+
+
+def partition_text_fast(
+    filename: Optional[str] = None,
+    text: Optional[str] = None,
+    encoding: str = "utf-8",
+) -> List[TextElement]:
+    return list(iter_partition_text(filename=filename, text=text, encoding=encoding))
@@ -1,6 +1,11 @@
-from unstructured.partition.text import partition_text
+# from unstructured.partition.text import partition_text
+#
+# elements = partition_text("../../data/黑悟空/设定.txt")
 
-elements = partition_text("../../data/黑悟空/设定.txt")
+# 纯文本快速路径：只用标准库正则切分，导入几乎无开销，元素类型与 partition_text 相同
+from fast_text_partition import iter_partition_text
+
+elements = iter_partition_text("../../data/黑悟空/设定.txt")
 for element in elements:
     print(element.text)
-    print("-"*100)
\ No newline at end of file
+    print("-"*100)
@@ -1,8 +1,33 @@
-import pandas as pd
+"""把多个 CSV 合并成一个 Excel（每个 CSV 一个 sheet），或一组 Parquet 文件
+
+- 输入支持通配符；不传参数时处理原来的 billionaires_table_2~6.csv
+- 多个 CSV 由线程池并发按块读取（pandas chunksize），每个文件的块放进有界队列，
+  写入端按文件顺序逐块消费：内存里最多只有 workers × prefetch 个块
+- xlsx 用 openpyxl 的 write_only 模式逐行写出，不在内存中构建整个工作簿
+- parquet 用 pyarrow 的 ParquetWriter 逐块写出，每个 CSV 一个 .parquet 文件；
+  各块按字符串读取，保证 schema 稳定（某列前几块是整数、后面出现文本时不会写到一半报错）
+- 写入失败时通知读取线程停止并清空队列，再把异常抛出来，不会卡在队列上
+- 结束时打印各文件行数、读/写耗时和进程峰值内存
+
+用法：
+    python merge_csv_to_excel.py
+    python merge_csv_to_excel.py "exports/*.csv" -o merged.xlsx --workers 8
+    python merge_csv_to_excel.py "exports/*.csv" -o merged_parquet --format parquet
+"""
+import argparse
+import glob
+import math
 import os
+import queue
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
 
 # 定义要处理的CSV文件列表
-csv_files = [
+DEFAULT_CSV_FILES = [
     'billionaires_table_2.csv',
     'billionaires_table_3.csv',
     'billionaires_table_4.csv',
@@ -10,17 +35,193 @@ csv_files = [
     'billionaires_table_6.csv'
 ]
 
-# 创建一个ExcelWriter对象
-with pd.ExcelWriter('billionaires_merged.xlsx', engine='openpyxl') as writer:
-    # 遍历每个CSV文件
-    for csv_file in csv_files:
-        # 读取CSV文件
-        df = pd.read_csv(csv_file)
-        
-        # 获取sheet名称（去掉.csv后缀）
-        sheet_name = os.path.splitext(csv_file)[0]
-        
-        # 将数据写入Excel的对应sheet
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-print("CSV文件已成功合并到 billionaires_merged.xlsx") 
\ No newline at end of file
+_DONE = object()
+
+
+def expand_inputs(patterns):
+    """展开通配符，保持参数顺序并去重"""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise FileNotFoundError(f"没有匹配的文件: {pattern}")
+        files.extend(path for path in matches if path not in files)
+    return files
+
+
+def sheet_name_for(path, used):
+    """sheet 名称取文件名（去掉.csv后缀），Excel 限制 31 个字符且不能重名"""
+    base = os.path.splitext(os.path.basename(path))[0][:31]
+    name, i = base, 1
+    while name in used:
+        suffix = f"_{i}"
+        name, i = base[:31 - len(suffix)] + suffix, i + 1
+    used.add(name)
+    return name
+
+
+def _put(chunks, item, stop):
+    """队列满时阻塞等待，但每隔一小段时间检查 stop，写入端失败后读取线程能退出"""
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def read_chunks(path, chunksize, chunks, stats, stop, dtype=None):
+    """读取线程：按块读取 CSV 放入有界队列，队列满时阻塞（背压）
+
+    stats["read_seconds"] 只统计解析耗时，不含等待写入端消费的时间
+    """
+    stats["read_seconds"] = 0.0
+    try:
+        reader = pd.read_csv(path, chunksize=chunksize, dtype=dtype)
+        while not stop.is_set():
+            start = time.perf_counter()
+            df = next(reader, None)
+            stats["read_seconds"] += time.perf_counter() - start
+            if df is None:
+                break
+            if not _put(chunks, df, stop):
+                return
+    except BaseException as e:
+        _put(chunks, e, stop)
+        return
+    _put(chunks, _DONE, stop)
+
+
+def iter_file_chunks(chunks):
+    while True:
+        item = chunks.get()
+        if item is _DONE:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+def _cell(value):
+    # openpyxl 不接受 NaN/NaT 和 numpy 标量，转成 None 和 Python 原生类型
+    if value is None or (isinstance(value, float) and math.isnan(value)) or value is pd.NaT:
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+class XlsxSink:
+    def __init__(self, output):
+        from openpyxl import Workbook
+
+        self.output = output
+        self.workbook = Workbook(write_only=True)
+
+    def write_file(self, sheet_name, frames):
+        sheet = self.workbook.create_sheet(title=sheet_name)
+        rows, header_written = 0, False
+        for df in frames:
+            if not header_written:
+                sheet.append([str(column) for column in df.columns])
+                header_written = True
+            for row in df.itertuples(index=False, name=None):
+                sheet.append([_cell(value) for value in row])
+            rows += len(df)
+        return rows
+
+    def close(self):
+        self.workbook.save(self.output)
+
+
+class ParquetSink:
+    def __init__(self, output):
+        os.makedirs(output, exist_ok=True)
+        self.output = output
+
+    def write_file(self, sheet_name, frames):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer, rows = None, 0
+        try:
+            for df in frames:
+                df.columns = [str(column) for column in df.columns]
+                if writer is None:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    writer = pq.ParquetWriter(os.path.join(self.output, f"{sheet_name}.parquet"),
+                                              table.schema)
+                else:
+                    # 后续块沿用第一块的 schema（merge 按字符串读取 parquet 的输入，各块类型一致）
+                    table = pa.Table.from_pandas(df, schema=writer.schema, preserve_index=False)
+                writer.write_table(table)
+                rows += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    def close(self):
+        pass
+
+
+def merge(files, output, fmt="xlsx", workers=4, chunksize=50_000, prefetch=2):
+    sink = XlsxSink(output) if fmt == "xlsx" else ParquetSink(output)
+    report, used_names = [], set()
+    queues = [queue.Queue(maxsize=prefetch) for _ in files]
+    stats = [{} for _ in files]
+
+    stop = threading.Event()
+    dtype = str if fmt == "parquet" else None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for path, chunks, file_stats in zip(files, queues, stats):
+            executor.submit(read_chunks, path, chunksize, chunks, file_stats, stop, dtype)
+        try:
+            # 按文件顺序写出，后面的文件同时在后台读取
+            for path, chunks, file_stats in zip(files, queues, stats):
+                sheet_name = sheet_name_for(path, used_names)
+                start = time.perf_counter()
+                rows = sink.write_file(sheet_name, iter_file_chunks(chunks))
+                report.append((path, sheet_name, rows, time.perf_counter() - start, file_stats))
+        except BaseException:
+            # 写入失败：让读取线程停下，清空队列释放已读的块，退出线程池后再抛出异常
+            stop.set()
+            for chunks in queues:
+                while True:
+                    try:
+                        chunks.get_nowait()
+                    except queue.Empty:
+                        break
+            raise
+    sink.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合并多个 CSV 为 Excel（每个 CSV 一个 sheet）或 Parquet")
+    parser.add_argument("inputs", nargs="*", default=DEFAULT_CSV_FILES, help="CSV 文件或通配符")
+    parser.add_argument("-o", "--output", default=None,
+                        help="输出路径，默认 billionaires_merged.xlsx / billionaires_merged_parquet")
+    parser.add_argument("--format", choices=["xlsx", "parquet"], default="xlsx")
+    parser.add_argument("--workers", type=int, default=4, help="并发读取的线程数")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="每块行数")
+    parser.add_argument("--prefetch", type=int, default=2, help="每个文件最多预读的块数")
+    args = parser.parse_args()
+
+    output = args.output or ("billionaires_merged.xlsx" if args.format == "xlsx"
+                             else "billionaires_merged_parquet")
+    files = expand_inputs(args.inputs)
+    start = time.perf_counter()
+    report = merge(files, output, args.format, args.workers, args.chunksize, args.prefetch)
+    total = time.perf_counter() - start
+
+    for path, sheet_name, rows, write_seconds, file_stats in report:
+        print(f"{path} -> {sheet_name}: {rows} 行, 读取 {file_stats.get('read_seconds', 0):.2f}s, "
+              f"写出 {write_seconds:.2f}s")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"CSV文件已成功合并到 {output}，共 {sum(r[2] for r in report)} 行, "
+          f"总耗时 {total:.2f}s, 峰值内存 {peak:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
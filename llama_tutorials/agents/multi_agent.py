@@ -49,6 +49,20 @@ async def review_report(ctx: Context, review: str) -> str:
 
 llm = OpenAI(model="gpt-4o-mini")
 
+# 共享调度器（见 ../llms/llm_scheduler.py，需要把 llm_scheduler.py 和 llm_cache.py 放在本脚本同目录）：
+# 三个 agent 共用同一组 rpm / tpm 限额和并发上限，同时跑多个报告任务时不会一起撞上 429；
+# 每个 agent 一个队列，写作和审查的优先级高于搜索，不用排在大量搜索请求后面
+# from llm_scheduler import LLMScheduler, ScheduledLLM
+# scheduler = LLMScheduler(rpm=500, tpm=200_000, max_concurrency=8)
+#
+# def scheduled_llm(agent_name: str, priority: int = 0) -> ScheduledLLM:
+#     # 重试交给调度器，关掉 SDK 自带的重试
+#     return ScheduledLLM(OpenAI(model="gpt-4o-mini", max_retries=0), scheduler=scheduler,
+#                         workflow=agent_name, priority=priority)
+#
+# 然后把下面三个 agent 的 llm=llm 换成 scheduled_llm("ResearchAgent", priority=1)、
+# scheduled_llm("WriteAgent")、scheduled_llm("ReviewAgent")
+
 research_agent = FunctionAgent(
     # name 标识agent
     name="ResearchAgent",
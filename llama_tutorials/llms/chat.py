@@ -1,7 +1,10 @@
 from llama_index.llms.openai import OpenAI
 from llama_index.core.llms import ChatMessage
 
-llm = OpenAI(model="gpt-4o-mini")
+from llm_cache import CachedLLM
+
+# 相同的请求直接走磁盘缓存（./storage/llm_cache.sqlite），流式调用会重放缓存的增量
+llm = CachedLLM(OpenAI(model="gpt-4o-mini"), ttl=24 * 3600)
 requirements = """
 - 西红柿
 - 鸡蛋
@@ -0,0 +1,131 @@
+"""多模态调用前的图片预处理 + 编码缓存
+
+- 按像素预算等比缩小（默认约 1MP，多模态模型对更大的图也会先缩放），转 RGB，JPEG 重新压缩
+- 缓存键 = (原图内容 sha256, 像素预算, 质量)，缓存的是 base64 后的 JPEG，
+  直接交给 ImageBlock(image=...)，ImageBlock 检测到已是 base64 就不会再编码
+- 原图哈希按 (路径, 大小, mtime) 记忆，缓存命中时不必重新读取几 MB 的原图
+- prepare_batch 把未命中缓存的图片放进进程池并行处理
+
+用法：
+    pipeline = ImagePipeline()
+    block = pipeline.image_block("../../data/多模态/01.jpg")
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from llama_index.core.llms import ImageBlock
+from PIL import Image, ImageOps
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def downscale_and_encode(path: str, max_pixels: int, quality: int) -> bytes:
+    """读取、按像素预算缩小并重新压缩为 JPEG，返回 base64 编码（可在子进程中运行）"""
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        pixels = image.width * image.height
+        if pixels > max_pixels:
+            scale = (max_pixels / pixels) ** 0.5
+            image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                                 Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return base64.b64encode(buffer.getvalue())
+
+
+class ImagePipeline:
+    def __init__(
+        self,
+        cache_dir: str = "./storage/image_cache",
+        max_pixels: int = 1024 * 1024,
+        quality: int = 85,
+        max_workers: int = os.cpu_count() or 1,
+    ):
+        self.cache_dir = cache_dir
+        self.max_pixels = max_pixels
+        self.quality = quality
+        self.max_workers = max_workers
+        os.makedirs(cache_dir, exist_ok=True)
+        self._hash_index_path = os.path.join(cache_dir, "file_hashes.json")
+        self._hash_index: Dict[str, List] = {}
+        if os.path.exists(self._hash_index_path):
+            with open(self._hash_index_path, "r", encoding="utf-8") as f:
+                self._hash_index = json.load(f)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def cache_key(self, path: str) -> str:
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._hash_index.get(key)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            digest = entry[2]
+        else:
+            digest = file_sha256(path)
+            with self._lock:
+                self._hash_index[key] = [stat.st_size, stat.st_mtime_ns, digest]
+                self._save_hash_index()
+        return f"{digest}_{self.max_pixels}_q{self.quality}"
+
+    def encoded(self, path: str) -> bytes:
+        """返回预处理后的 base64 JPEG"""
+        return self.prepare_batch([path])[0]
+
+    def image_block(self, path: str, detail: Optional[str] = None) -> ImageBlock:
+        return ImageBlock(image=self.encoded(path), image_mimetype="image/jpeg", detail=detail)
+
+    def prepare_batch(self, paths: List[str]) -> List[bytes]:
+        """批量预处理：命中缓存的直接读取，未命中的在进程池中并行缩放、压缩"""
+        keys = [self.cache_key(path) for path in paths]
+        results: List[Optional[bytes]] = [self._read_cache(key) for key in keys]
+        missing = [i for i, data in enumerate(results) if data is None]
+        self.stats["hits"] += len(paths) - len(missing)
+        self.stats["misses"] += len(missing)
+        if len(missing) > 1 and self.max_workers > 1:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(missing))) as executor:
+                encoded = list(executor.map(
+                    downscale_and_encode, [paths[i] for i in missing],
+                    [self.max_pixels] * len(missing), [self.quality] * len(missing)))
+        else:
+            encoded = [downscale_and_encode(paths[i], self.max_pixels, self.quality) for i in missing]
+        for i, data in zip(missing, encoded):
+            self._write_cache(keys[i], data)
+            results[i] = data
+        return results
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".b64")
+
+    def _read_cache(self, key: str) -> Optional[bytes]:
+        path = self._cache_path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _write_cache(self, key: str, data: bytes) -> None:
+        tmp_path = f"{self._cache_path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._cache_path(key))
+
+    def _save_hash_index(self) -> None:
+        tmp_path = self._hash_index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._hash_index, f)
+        os.replace(tmp_path, self._hash_index_path)
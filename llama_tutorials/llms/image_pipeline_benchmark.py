@@ -0,0 +1,93 @@
+"""图片预处理前后的请求字节数和延迟对比（本地替身 OpenAI 接口，不需要网络和 API key）
+
+对 data/多模态 下的 9 张图片各发一次 chat 请求：
+    - 原图：ImageBlock(path=...)，每次调用都重新读取原图并 base64 编码
+    - 预处理（冷）：进程池批量缩放、压缩，写入缓存
+    - 预处理（热）：全部命中缓存
+替身服务器记录收到的请求体大小，模拟按上传字节计费的网络耗时（--mbps）。
+
+用法：
+    python image_pipeline_benchmark.py
+    python image_pipeline_benchmark.py --max-pixels 512000 --mbps 50
+"""
+import argparse
+import glob
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llama_index.core.llms import ChatMessage, ImageBlock, TextBlock
+from llama_index.llms.openai import OpenAI
+
+from image_pipeline import ImagePipeline
+
+IMAGES = sorted(glob.glob("../../data/多模态/0*.jpg"))
+
+
+class MockChatHandler(BaseHTTPRequestHandler):
+    received_bytes = []
+    mbps = 100.0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.received_bytes.append(len(body))
+        # 模拟上传耗时
+        time.sleep(len(body) * 8 / (self.mbps * 1e6))
+        payload = json.dumps({
+            "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+            "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "图片中是悟空与妖王的战斗场景。"}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(llm, make_block, label):
+    MockChatHandler.received_bytes.clear()
+    start = time.perf_counter()
+    for path in IMAGES:
+        messages = [ChatMessage(role="user", blocks=[
+            TextBlock(text="请用中文描述图片内容，要求在100字以内"), make_block(path)])]
+        llm.chat(messages)
+    seconds = time.perf_counter() - start
+    total = sum(MockChatHandler.received_bytes)
+    print(f"{label:<14} 请求体共 {total / 2**20:7.2f} MB, 总耗时 {seconds:6.2f}s, "
+          f"平均 {seconds / len(IMAGES) * 1000:7.1f} ms/次")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-pixels", type=int, default=1024 * 1024)
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--mbps", type=float, default=100.0, help="模拟的上行带宽")
+    args = parser.parse_args()
+
+    MockChatHandler.mbps = args.mbps
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockChatHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    llm = OpenAI(model="gpt-4o-mini", api_key="sk-mock",
+                 api_base=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+
+    run(llm, lambda path: ImageBlock(path=path), "原图")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        pipeline = ImagePipeline(cache_dir=cache_dir, max_pixels=args.max_pixels, quality=args.quality)
+        start = time.perf_counter()
+        pipeline.prepare_batch(IMAGES)
+        print(f"批量预处理 {len(IMAGES)} 张: {time.perf_counter() - start:.2f}s")
+        run(llm, pipeline.image_block, "预处理(缓存)")
+        print(f"缓存统计: {pipeline.stats}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
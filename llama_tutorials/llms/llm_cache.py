@@ -0,0 +1,422 @@
+"""LLM 响应的磁盘缓存：包装任意 llama_index LLM，相同请求直接返回缓存结果
+
+- 缓存键 = sha256(模型名, 消息, temperature, tools, 其余调用参数)；complete 的 prompt 按一条 user 消息处理
+- 存储：SQLite（WAL），每条记录保存完整响应和流式的增量序列
+    - TTL：读取时过期的记录直接删除，按未命中处理
+    - 容量：超过 max_entries 或 max_bytes 时按最近访问时间（LRU）淘汰
+- 流式调用：未命中时边转发边记录增量，流完整结束才写入缓存（中途断开不缓存）；
+  命中时按原来的增量重放成流。流式与非流式共用同一条缓存
+- 继承 FunctionCallingLLM，predict_and_call / chat_with_tools 的准备和解析交给被包装的 LLM，
+  工具定义会进入缓存键
+
+用法：
+    llm = CachedLLM(OpenAI(model="gpt-4o-mini"), ttl=24 * 3600)
+    for token in llm.stream_chat(messages):
+        print(token.delta, end="")
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncGenerator, Dict, Generator, List, Optional, Sequence, Tuple
+
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+    MessageRole,
+)
+from llama_index.core.bridge.pydantic import Field, PrivateAttr, SerializeAsAny
+from llama_index.core.llms import LLM, CustomLLM
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.llms.function_calling import FunctionCallingLLM
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    deltas TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at);
+"""
+
+
+class ResponseStore:
+    """SQLite 存储，带 TTL 和 LRU 容量淘汰；多线程共用一个连接，用锁串行化
+
+    条数和总字节数启动时统计一次，之后在内存里随写入 / 删除增减，超限时才扫表淘汰；
+    多个进程同时写同一个文件时各自的计数只反映自己的写入，容量限制是近似的
+    """
+
+    def __init__(
+        self,
+        path: str = "./storage/llm_cache.sqlite",
+        ttl: Optional[float] = 7 * 24 * 3600,
+        max_entries: Optional[int] = 100_000,
+        max_bytes: Optional[int] = 512 * 2**20,
+    ):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+        self._load_totals()
+
+    def _load_totals(self) -> None:
+        self._count, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+    def get(self, key: str) -> Optional[Tuple[Dict, Optional[List[str]]]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, deltas, created_at, size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[2] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count -= 1
+                self._bytes -= row[3]
+                self.stats["expired"] += 1
+                row = None
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ?, hits = hits + 1 WHERE key = ?",
+                               (now, key))
+            self.stats["hits"] += 1
+        return json.loads(row[0]), (json.loads(row[1]) if row[1] is not None else None)
+
+    def put(self, key: str, response: Dict, deltas: Optional[List[str]] = None) -> None:
+        response_json = json.dumps(response, ensure_ascii=False)
+        deltas_json = json.dumps(deltas, ensure_ascii=False) if deltas is not None else None
+        size = len(response_json.encode("utf-8")) + len((deltas_json or "").encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, deltas, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (key, response_json, deltas_json, size, now, now))
+            if old is None:
+                self._count += 1
+                self._bytes += size
+            else:
+                self._bytes += size - old[0]
+            self._evict()
+
+    def _over_limit(self, evicted: int, over_entries: int) -> bool:
+        return evicted < over_entries or (self.max_bytes is not None and self._bytes > self.max_bytes)
+
+    def _evict(self) -> None:
+        over_entries = self._count - self.max_entries if self.max_entries is not None else 0
+        if not self._over_limit(0, over_entries):
+            return
+        evicted = 0
+        # 按访问时间从旧到新每次取一小批（走 accessed_at 索引），够了就停，不读整张表
+        while self._over_limit(evicted, over_entries):
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 256").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if not self._over_limit(evicted, over_entries):
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count -= 1
+                self._bytes -= size
+                evicted += 1
+        self.stats["evicted"] += evicted
+
+    def purge_expired(self) -> int:
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM responses WHERE created_at < ?",
+                                         (time.time() - self.ttl,)).rowcount
+            if deleted:
+                self._load_totals()
+        self.stats["expired"] += deleted
+        return deleted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._count, self._bytes = 0, 0
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def _dump(response) -> Dict:
+    """raw 里是各家 SDK 的原始对象，不可序列化也不需要缓存"""
+    return response.model_dump(mode="json", exclude={"raw"})
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def request_key(llm: LLM, kind: str, messages: Sequence[ChatMessage], **kwargs: Any) -> str:
+    """(模型, 消息, temperature, tools) 之外的调用参数也进入键，避免不同参数串用结果"""
+    payload = {
+        "kind": kind,
+        "model": llm.metadata.model_name,
+        "temperature": kwargs.pop("temperature", getattr(llm, "temperature", None)),
+        "tools": kwargs.pop("tools", None),
+        "messages": [message.model_dump(mode="json") for message in messages],
+        "kwargs": kwargs,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CachedLLM(FunctionCallingLLM):
+    llm: SerializeAsAny[LLM] = Field(description="被包装的 LLM")
+    cache_path: str = Field(default="./storage/llm_cache.sqlite")
+    ttl: Optional[float] = Field(default=7 * 24 * 3600, description="缓存有效期（秒），None 表示不过期")
+    max_entries: Optional[int] = Field(default=100_000)
+    max_bytes: Optional[int] = Field(default=512 * 2**20)
+
+    _store: ResponseStore = PrivateAttr()
+
+    def __init__(self, llm: LLM, **kwargs: Any):
+        super().__init__(llm=llm, **kwargs)
+        self._store = ResponseStore(self.cache_path, self.ttl, self.max_entries, self.max_bytes)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self.llm.metadata
+
+    @property
+    def store(self) -> ResponseStore:
+        return self._store
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self._store.stats
+
+    def cache_key(self, kind: str, messages: Sequence[ChatMessage], **kwargs: Any) -> str:
+        return request_key(self.llm, kind, messages, **kwargs)
+
+    def _complete_key(self, prompt: str, formatted: bool, **kwargs: Any) -> str:
+        return self.cache_key("complete", [ChatMessage(role=MessageRole.USER, content=prompt)],
+                              formatted=formatted, **kwargs)
+
+    # ---- chat ----
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        key = self.cache_key("chat", messages, **kwargs)
+        cached = self._store.get(key)
+        if cached is not None:
+            return ChatResponse.model_validate(cached[0])
+        response = self.llm.chat(messages, **kwargs)
+        self._store.put(key, _dump(response))
+        return response
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        key = self.cache_key("chat", messages, **kwargs)
+        cached = self._store.get(key)
+        if cached is not None:
+            return self._replay_chat(*cached)
+        return self._record(key, self.llm.stream_chat(messages, **kwargs))
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        key = self.cache_key("chat", messages, **kwargs)
+        cached = self._store.get(key)
+        if cached is not None:
+            return ChatResponse.model_validate(cached[0])
+        response = await self.llm.achat(messages, **kwargs)
+        self._store.put(key, _dump(response))
+        return response
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        key = self.cache_key("chat", messages, **kwargs)
+        cached = self._store.get(key)
+        if cached is not None:
+            return self._areplay(self._replay_chat(*cached))
+        return self._arecord(key, await self.llm.astream_chat(messages, **kwargs))
+
+    # ---- complete ----
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        key = self._complete_key(prompt, formatted, **kwargs)
+        cached = self._store.get(key)
+        if cached is not None:
+            return CompletionResponse.model_validate(cached[0])
+        response = self.llm.complete(prompt, formatted=formatted, **kwargs)
+        self._store.put(key, _dump(response))
+        return response
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        key = self._complete_key(prompt, formatted, **kwargs)
+        cached = self._store.get(key)
+        if cached is not None:
+            return self._replay_completion(*cached)
+        return self._record(key, self.llm.stream_complete(prompt, formatted=formatted, **kwargs))
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        key = self._complete_key(prompt, formatted, **kwargs)
+        cached = self._store.get(key)
+        if cached is not None:
+            return CompletionResponse.model_validate(cached[0])
+        response = await self.llm.acomplete(prompt, formatted=formatted, **kwargs)
+        self._store.put(key, _dump(response))
+        return response
+
+    async def astream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseAsyncGen:
+        key = self._complete_key(prompt, formatted, **kwargs)
+        cached = self._store.get(key)
+        if cached is not None:
+            return self._areplay(self._replay_completion(*cached))
+        return self._arecord(key, await self.llm.astream_complete(prompt, formatted=formatted, **kwargs))
+
+    # ---- 工具调用交给被包装的 LLM ----
+    def _prepare_chat_with_tools(self, tools, user_msg=None, chat_history=None, **kwargs: Any) -> Dict[str, Any]:
+        return self.llm._prepare_chat_with_tools(tools, user_msg=user_msg, chat_history=chat_history, **kwargs)
+
+    def _validate_chat_with_tools_response(self, response, tools, **kwargs: Any) -> ChatResponse:
+        return self.llm._validate_chat_with_tools_response(response, tools, **kwargs)
+
+    def get_tool_calls_from_response(self, response, **kwargs: Any):
+        return self.llm.get_tool_calls_from_response(response, **kwargs)
+
+    # ---- 流的记录与重放 ----
+    def _record(self, key: str, stream: Generator) -> Generator:
+        deltas, last = [], None
+        for chunk in stream:
+            deltas.append(chunk.delta or "")
+            last = chunk
+            yield chunk
+        # 只有完整结束的流才会走到这里
+        if last is not None:
+            self._store.put(key, _dump(last), deltas)
+
+    async def _arecord(self, key: str, stream: AsyncGenerator) -> AsyncGenerator:
+        deltas, last = [], None
+        async for chunk in stream:
+            deltas.append(chunk.delta or "")
+            last = chunk
+            yield chunk
+        if last is not None:
+            self._store.put(key, _dump(last), deltas)
+
+    @staticmethod
+    def _replay_chat(response: Dict, deltas: Optional[List[str]]) -> ChatResponseGen:
+        final = ChatResponse.model_validate(response)
+        deltas = deltas if deltas is not None else [final.message.content or ""]
+        text = ""
+        for i, delta in enumerate(deltas):
+            text += delta
+            if i == len(deltas) - 1:
+                # 最后一块用原始响应，保留 tool_calls 等附加字段
+                final.delta = delta
+                yield final
+            else:
+                yield ChatResponse(message=ChatMessage(role=final.message.role, content=text), delta=delta)
+
+    @staticmethod
+    def _replay_completion(response: Dict, deltas: Optional[List[str]]) -> CompletionResponseGen:
+        final = CompletionResponse.model_validate(response)
+        deltas = deltas if deltas is not None else [final.text]
+        text = ""
+        for i, delta in enumerate(deltas):
+            text += delta
+            if i == len(deltas) - 1:
+                final.delta = delta
+                yield final
+            else:
+                yield CompletionResponse(text=text, delta=delta)
+
+    @staticmethod
+    async def _areplay(stream: Generator) -> AsyncGenerator:
+        for chunk in stream:
+            yield chunk
+
+
+class SlowMockLLM(CustomLLM):
+    """本地替身（演示和 test_llm_cache.py 共用）：固定延迟，按两个字一块流式输出，记录真实调用次数"""
+
+    latency: float = 0.5
+    calls: int = 0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="slow-mock")
+
+    def _answer(self, prompt: str) -> str:
+        self.calls += 1
+        return f"食谱（第 {self.calls} 次生成）：1. 鸡蛋打散 2. 西红柿切块 3. 先炒蛋再炒西红柿，加盐出锅。"
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        time.sleep(self.latency)
+        return CompletionResponse(text=self._answer(prompt))
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        text = self._answer(prompt)
+
+        def gen() -> CompletionResponseGen:
+            for i in range(0, len(text), 2):
+                time.sleep(self.latency / len(text) * 2)
+                yield CompletionResponse(text=text[:i + 2], delta=text[i:i + 2])
+
+        return gen()
+
+
+if __name__ == "__main__":
+    import asyncio
+    import tempfile
+
+    messages = [
+        ChatMessage(role="system", content="你是一个美食大师，擅长各种中西美食的制作"),
+        ChatMessage(role="user", content="请根据以下需求，给出一份详细的食谱：\n- 西红柿\n- 鸡蛋"),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mock = SlowMockLLM()
+        llm = CachedLLM(mock, cache_path=os.path.join(tmp, "llm_cache.sqlite"), ttl=2, max_entries=3)
+
+        # 1. 流式：第一次转发并记录增量，第二次从缓存重放
+        for round_no in (1, 2):
+            start = time.perf_counter()
+            deltas = [chunk.delta for chunk in llm.stream_chat(messages)]
+            print(f"stream_chat 第 {round_no} 次: {len(deltas)} 块, {time.perf_counter() - start:.3f}s, "
+                  f"{''.join(deltas)[:20]}...")
+
+        # 2. 非流式、异步调用命中同一条缓存；temperature 不同则是另一条
+        start = time.perf_counter()
+        response = llm.chat(messages)
+        print(f"chat: {time.perf_counter() - start:.4f}s, {response.message.content[:20]}...")
+        response = asyncio.run(llm.achat(messages))
+        print(f"achat: {response.message.content[:20]}..., temperature=0.9 时键不同: "
+              f"{llm.cache_key('chat', messages) != llm.cache_key('chat', messages, temperature=0.9)}")
+
+        # 3. 容量淘汰（max_entries=3）与 TTL 过期（ttl=2s）
+        for i in range(4):
+            llm.complete(f"请介绍第 {i} 道菜")
+        print(f"写入 4 条后剩 {len(llm.store)} 条, 统计 {llm.stats}")
+        time.sleep(2.1)
+        llm.complete("请介绍第 3 道菜")
+        print(f"TTL 过期后: 统计 {llm.stats}, 被包装 LLM 共调用 {mock.calls} 次")
@@ -0,0 +1,394 @@
+"""LLM 调用的全局调度器：令牌桶限流 + 按工作流的优先级队列 + 相同请求合并 + 抖动退避重试
+
+所有 LLM 客户端共用一个 LLMScheduler，各个工作流 / agent 用 ScheduledLLM 包装自己的 LLM：
+    - 令牌桶：requests/min 与 tokens/min 各一个桶；token 数先按 prompt + 预期输出估算，
+      响应返回 usage 后再按实际用量补扣或退还
+    - 优先级队列：每个工作流一个 FIFO 队列，调度时先取优先级数值最小的队列，
+      同优先级的工作流之间轮转，避免批量任务饿死交互请求
+    - 并发上限：max_concurrency 个请求同时在途，流式请求占用名额直到流结束
+    - 请求合并：完全相同（模型、消息、参数）且都还在途的非流式请求只真正发送一次
+    - 重试：429 / 5xx / 超时 / 连接错误按 full jitter 指数退避重试，有 Retry-After 时按服务端要求等待；
+      收到 429 时清空两个桶，让其它请求一起放慢
+调度只作用在异步接口（achat / acomplete / astream_*），workflows 和 agents 走的都是这些；
+同步接口直接转发给被包装的 LLM。
+
+用法：
+    scheduler = LLMScheduler(rpm=500, tpm=200_000, max_concurrency=16)
+    llm = ScheduledLLM(OpenAI(model="gpt-4o-mini", max_retries=0), scheduler=scheduler,
+                       workflow="research", priority=0)
+agents/multi_agent.py 中三个 agent 共用一个调度器，每个 agent 一个队列。
+"""
+import asyncio
+import itertools
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Sequence
+
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+    MessageRole,
+)
+from llama_index.core.bridge.pydantic import Field, PrivateAttr, SerializeAsAny
+from llama_index.core.llms import LLM
+from llama_index.core.llms.function_calling import FunctionCallingLLM
+from llama_index.core.utils import get_tokenizer
+
+from llm_cache import request_key
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "TimeoutError", "ConnectionError",
+                    "ClientConnectionError", "ServerDisconnectedError", "ReadTimeout", "ConnectTimeout"}
+
+
+class TokenBucket:
+    """rate_per_minute 的速率匀速补充，容量为 burst_seconds 秒的量"""
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = 1.0):
+        self.rate = rate_per_minute / 60
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        # 超过容量的请求等到桶满为止，再记成欠账
+        need = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= need:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((need - self.tokens) / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """正数补扣、负数退还"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+    def drain(self) -> None:
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    code = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, _StreamInterrupted):
+        return False
+    if status_code(error) in RETRYABLE_STATUS:
+        return True
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError)) or type(error).__name__ in RETRYABLE_ERRORS
+
+
+class _StreamInterrupted(Exception):
+    """流已经输出过内容后失败：重试会重复输出，直接抛给调用方"""
+
+
+@dataclass
+class _Job:
+    fn: Callable[[], Awaitable[Any]]
+    tokens: float
+    future: asyncio.Future
+    workflow: str
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_concurrency: int = 16,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        burst_seconds: float = 1.0,
+    ):
+        self.rpm = TokenBucket(rpm, burst_seconds) if rpm else None
+        self.tpm = TokenBucket(tpm, burst_seconds) if tpm else None
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._priorities: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"submitted": 0, "coalesced": 0, "retries": 0, "rate_limited": 0, "failed": 0}
+
+    def register(self, workflow: str, priority: int = 0) -> None:
+        """priority 越小越先调度"""
+        self._priorities[workflow] = priority
+
+    def _bind_loop(self) -> None:
+        """队列、信号量都绑定在事件循环上；换了事件循环（如多次 asyncio.run）就重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queues: Dict[str, Deque[_Job]] = {}
+        self._order: Deque[str] = deque()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._wakeup = asyncio.Event()
+        self._dispatcher = loop.create_task(self._dispatch())
+
+    async def submit(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        workflow: str = "default",
+        tokens: float = 0,
+        key: Optional[str] = None,
+    ) -> Any:
+        self._bind_loop()
+        self.stats["submitted"] += 1
+        if key is not None and key in self._inflight:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(self._inflight[key])
+
+        future = self._loop.create_future()
+        if key is not None:
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        if workflow not in self._queues:
+            self._priorities.setdefault(workflow, 0)
+            self._queues[workflow] = deque()
+            self._order.append(workflow)
+        self._queues[workflow].append(_Job(fn, tokens, future, workflow))
+        self._wakeup.set()
+        # 合并的调用方共享这个 future，单个调用方取消不影响其它人
+        return await asyncio.shield(future)
+
+    def _next_job(self) -> Optional[_Job]:
+        ready = [name for name in self._order if self._queues[name]]
+        if not ready:
+            return None
+        best = min(self._priorities[name] for name in ready)
+        name = next(name for name in ready if self._priorities[name] == best)
+        # 同优先级轮转：取过的工作流排到队尾
+        self._order.remove(name)
+        self._order.append(name)
+        return self._queues[name].popleft()
+
+    async def _acquire_budget(self, tokens: float) -> None:
+        if self.rpm is not None:
+            await self.rpm.acquire(1)
+        if self.tpm is not None and tokens:
+            await self.tpm.acquire(tokens)
+
+    async def _dispatch(self) -> None:
+        while True:
+            await self._slots.acquire()
+            job = self._next_job()
+            while job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                job = self._next_job()
+            await self._acquire_budget(job.tokens)
+            self._loop.create_task(self._run(job))
+
+    async def _run(self, job: _Job) -> None:
+        try:
+            for attempt in itertools.count():
+                try:
+                    result = await job.fn()
+                except Exception as e:
+                    if not is_retryable(e) or attempt >= self.max_retries:
+                        self.stats["failed"] += 1
+                        if not job.future.done():
+                            job.future.set_exception(e)
+                        return
+                    delay = retry_after(e)
+                    if status_code(e) == 429:
+                        self.stats["rate_limited"] += 1
+                        for bucket in (self.rpm, self.tpm):
+                            if bucket is not None:
+                                bucket.drain()
+                    if delay is None:
+                        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(delay)
+                    await self._acquire_budget(job.tokens)
+                    continue
+                if not job.future.done():
+                    job.future.set_result(result)
+                return
+        finally:
+            self._slots.release()
+            # job.fn() 抛出 CancelledError（或本任务被取消）时上面不会设置结果，
+            # 不取消 future 的话，合并到这个请求上的调用方会一直等下去
+            if not job.future.done():
+                job.future.cancel()
+
+    def settle(self, estimated: float, actual: Optional[float]) -> None:
+        """按响应里的实际 token 用量修正 tpm 桶"""
+        if self.tpm is not None and actual is not None:
+            self.tpm.adjust(actual - estimated)
+
+
+def _usage_tokens(response) -> Optional[int]:
+    raw = getattr(response, "raw", None)
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        return None
+    total = usage.get("total_tokens") if isinstance(usage, dict) else getattr(usage, "total_tokens", None)
+    return total if isinstance(total, int) else None
+
+
+class ScheduledLLM(FunctionCallingLLM):
+    llm: SerializeAsAny[LLM] = Field(description="被包装的 LLM，建议关闭其自带重试（max_retries=0）")
+    workflow: str = Field(default="default", description="所属工作流，对应一个优先级队列")
+    priority: int = Field(default=0, description="越小越先调度")
+    expected_output_tokens: int = Field(default=256, description="估算 tpm 时预留的输出 token 数")
+    coalesce: bool = Field(default=True, description="合并在途的相同请求")
+    stream_buffer: int = Field(default=32, description="流式输出在调度器与调用方之间最多缓存的块数")
+
+    _scheduler: LLMScheduler = PrivateAttr()
+
+    def __init__(self, llm: LLM, scheduler: LLMScheduler, **kwargs: Any):
+        super().__init__(llm=llm, **kwargs)
+        self._scheduler = scheduler
+        scheduler.register(self.workflow, self.priority)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ScheduledLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self.llm.metadata
+
+    @property
+    def scheduler(self) -> LLMScheduler:
+        return self._scheduler
+
+    def _estimate(self, messages: Sequence[ChatMessage]) -> int:
+        tokenizer = get_tokenizer()
+        return sum(len(tokenizer(m.content or "")) + 4 for m in messages) + self.expected_output_tokens
+
+    async def _call(self, kind: str, messages: Sequence[ChatMessage], call: Callable[[], Awaitable[Any]],
+                    **kwargs: Any) -> Any:
+        estimated = self._estimate(messages)
+
+        async def fn():
+            response = await call()
+            self._scheduler.settle(estimated, _usage_tokens(response))
+            return response
+
+        key = request_key(self.llm, kind, messages, **kwargs) if self.coalesce else None
+        return await self._scheduler.submit(fn, self.workflow, estimated, key)
+
+    async def _stream(self, messages: Sequence[ChatMessage], open_stream: Callable[[], Awaitable[Any]]):
+        """流在调度器的任务里消费（占用并发名额直到结束），经有界队列转给调用方：
+        调用方读得慢时不再从 LLM 读取；调用方提前关闭生成器时取消调度器里的任务，释放名额"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.stream_buffer)
+        done = object()
+        state = {"closed": False, "runner": None}
+
+        async def fn():
+            if state["closed"]:  # 排到时调用方已经不要了
+                return
+            state["runner"] = asyncio.current_task()
+            started = False
+            try:
+                async for chunk in await open_stream():
+                    started = True
+                    await queue.put(chunk)
+            except Exception as e:
+                if started:
+                    raise _StreamInterrupted(str(e)) from e
+                raise
+            await queue.put(done)
+
+        task = asyncio.ensure_future(self._scheduler.submit(fn, self.workflow, self._estimate(messages)))
+
+        async def gen():
+            getter = None
+            try:
+                while True:
+                    getter = asyncio.ensure_future(queue.get())
+                    finished, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                    if getter not in finished:
+                        getter.cancel()
+                        task.result()  # 失败时在这里抛出
+                        if queue.empty():
+                            return
+                        continue
+                    item = getter.result()
+                    if item is done:
+                        return
+                    yield item
+            finally:
+                state["closed"] = True
+                for pending in (getter, state["runner"], task):
+                    if pending is not None and not pending.done():
+                        pending.cancel()
+
+        return gen()
+
+    # ---- 异步接口：经过调度器 ----
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return await self._call("chat", messages, lambda: self.llm.achat(messages, **kwargs), **kwargs)
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        messages = [ChatMessage(role=MessageRole.USER, content=prompt)]
+        return await self._call("complete", messages,
+                                lambda: self.llm.acomplete(prompt, formatted=formatted, **kwargs),
+                                formatted=formatted, **kwargs)
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        return await self._stream(messages, lambda: self.llm.astream_chat(messages, **kwargs))
+
+    async def astream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseAsyncGen:
+        messages = [ChatMessage(role=MessageRole.USER, content=prompt)]
+        return await self._stream(messages, lambda: self.llm.astream_complete(prompt, formatted=formatted, **kwargs))
+
+    # ---- 同步接口：直接转发 ----
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return self.llm.chat(messages, **kwargs)
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        return self.llm.stream_chat(messages, **kwargs)
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return self.llm.complete(prompt, formatted=formatted, **kwargs)
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        return self.llm.stream_complete(prompt, formatted=formatted, **kwargs)
+
+    # ---- 工具调用交给被包装的 LLM ----
+    def _prepare_chat_with_tools(self, tools, user_msg=None, chat_history=None, **kwargs: Any) -> Dict[str, Any]:
+        return self.llm._prepare_chat_with_tools(tools, user_msg=user_msg, chat_history=chat_history, **kwargs)
+
+    def _validate_chat_with_tools_response(self, response, tools, **kwargs: Any) -> ChatResponse:
+        return self.llm._validate_chat_with_tools_response(response, tools, **kwargs)
+
+    def get_tool_calls_from_response(self, response, **kwargs: Any):
+        return self.llm.get_tool_calls_from_response(response, **kwargs)
@@ -0,0 +1,175 @@
+"""LLMScheduler 与直接并发调用的对比（本地限流替身服务器，OpenAI 兼容接口，不需要网络）
+
+替身服务器：
+    - 1 秒滑动窗口内超过 --rps 个请求或 --tps 个 token 就返回 429（带 Retry-After）
+    - 响应延迟随在途请求数上升，模拟过载时的长尾
+请求：interactive（优先级 0）和 batch（优先级 1）两个工作流同时一次性提交，
+batch 中有 --dup 比例的重复问题。
+
+    直接并发：asyncio.gather 全部请求，依赖 OpenAI SDK 自带的重试
+    调度器：ScheduledLLM + 共享 LLMScheduler（rpm/tpm 取服务端限额的 90%，SDK 重试关闭）
+
+用法：
+    python llm_scheduler_benchmark.py
+    python llm_scheduler_benchmark.py --requests 400 --rps 30
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from llama_index.core.llms import ChatMessage
+from llama_index.core.utils import get_tokenizer
+from llama_index.llms.openai import OpenAI
+
+from llm_scheduler import LLMScheduler, ScheduledLLM
+
+COMPLETION_TOKENS = 64
+
+
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    rps = 20
+    tps = 3000
+    lock = threading.Lock()
+    window = deque()  # (时间, token 数)
+    inflight = 0
+    counts = {"200": 0, "429": 0}
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = "".join(str(m.get("content", "")) for m in body["messages"])
+        tokens = len(get_tokenizer()(prompt)) + COMPLETION_TOKENS
+        cls = type(self)
+        with cls.lock:
+            now = time.monotonic()
+            while cls.window and now - cls.window[0][0] > 1.0:
+                cls.window.popleft()
+            used = sum(t for _, t in cls.window)
+            limited = len(cls.window) >= cls.rps or used + tokens > cls.tps
+            if limited:
+                cls.counts["429"] += 1
+            else:
+                cls.counts["200"] += 1
+                cls.window.append((now, tokens))
+                cls.inflight += 1
+                load = cls.inflight
+        if limited:
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "requests",
+                                       "code": "rate_limit_exceeded"}}, {"Retry-After": "1"})
+            return
+        try:
+            # 在途越多越慢：基础延迟 × (1 + 在途数 / 8)，再叠加对数正态的长尾
+            time.sleep(0.15 * (1 + load / 8) * random.lognormvariate(0, 0.3))
+        finally:
+            with cls.lock:
+                cls.inflight -= 1
+        self._send(200, {
+            "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "好的。" * 20}}],
+            "usage": {"prompt_tokens": tokens - COMPLETION_TOKENS, "completion_tokens": COMPLETION_TOKENS,
+                      "total_tokens": tokens},
+        })
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_requests(n: int, dup: float, seed: int = 0):
+    rng = random.Random(seed)
+    requests = []
+    for i in range(n):
+        if i % 6 == 0:
+            requests.append(("interactive", f"用户提问 {i}：请用一句话介绍黑神话悟空的第{i % 5 + 1}章"))
+        elif requests and rng.random() < dup:
+            requests.append(("batch", rng.choice([q for w, q in requests if w == "batch"] or [f"批量任务 {i}"])))
+        else:
+            requests.append(("batch", f"批量任务 {i}：总结第 {i} 段研究笔记的要点，列出三条结论"))
+    return requests
+
+
+async def run(llms, requests):
+    async def one(workflow, question):
+        start = time.perf_counter()
+        try:
+            await llms[workflow].achat([ChatMessage(role="user", content=question)])
+            return workflow, time.perf_counter() - start, None
+        except Exception as e:
+            return workflow, time.perf_counter() - start, type(e).__name__
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(w, q) for w, q in requests))
+    return results, time.perf_counter() - start
+
+
+def report(label, results, wall):
+    print(f"\n{label}: 总耗时 {wall:.2f}s, 失败 {sum(1 for r in results if r[2])} / {len(results)}, "
+          f"服务端 {dict(RateLimitedHandler.counts)}")
+    for workflow in ("interactive", "batch"):
+        ms = np.array([r[1] for r in results if r[0] == workflow and not r[2]]) * 1000
+        if ms.size:
+            print(f"  {workflow:<12} p50 {np.percentile(ms, 50):7.0f} ms  p95 {np.percentile(ms, 95):7.0f} ms  "
+                  f"p99 {np.percentile(ms, 99):7.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=240)
+    parser.add_argument("--rps", type=int, default=20, help="服务端每秒请求数上限")
+    parser.add_argument("--tps", type=int, default=3000, help="服务端每秒 token 上限")
+    parser.add_argument("--dup", type=float, default=0.25, help="batch 中重复问题的比例")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    # OpenAI SDK 每次重试都会打一行日志
+    logging.getLogger("llama_index.llms.openai").setLevel(logging.ERROR)
+    RateLimitedHandler.rps, RateLimitedHandler.tps = args.rps, args.tps
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RateLimitedHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_base = f"http://127.0.0.1:{server.server_port}/v1"
+    requests = make_requests(args.requests, args.dup)
+
+    # 1. 直接并发，依赖 SDK 自带重试
+    llm = OpenAI(model="gpt-4o-mini", api_key="sk-mock", api_base=api_base)
+    results, wall = asyncio.run(run({"interactive": llm, "batch": llm}, requests))
+    report("直接并发", results, wall)
+
+    # 2. 共享调度器
+    for key in RateLimitedHandler.counts:
+        RateLimitedHandler.counts[key] = 0
+    time.sleep(1.1)  # 等服务端窗口清空
+    scheduler = LLMScheduler(rpm=args.rps * 60 * 0.9, tpm=args.tps * 60 * 0.9,
+                             max_concurrency=args.concurrency, burst_seconds=0.5)
+    inner = OpenAI(model="gpt-4o-mini", api_key="sk-mock", api_base=api_base, max_retries=0)
+    llms = {
+        "interactive": ScheduledLLM(inner, scheduler=scheduler, workflow="interactive", priority=0,
+                                    expected_output_tokens=COMPLETION_TOKENS),
+        "batch": ScheduledLLM(inner, scheduler=scheduler, workflow="batch", priority=1,
+                              expected_output_tokens=COMPLETION_TOKENS),
+    }
+    results, wall = asyncio.run(run(llms, requests))
+    report("调度器", results, wall)
+    print(f"  调度器统计: {scheduler.stats}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
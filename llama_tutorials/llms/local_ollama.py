@@ -13,3 +13,17 @@ response = llm.stream_complete("请介绍一下中国的赛龙舟")
 
 for chunk in response:
     print(chunk.delta, end="", flush=True)
+
+
+# 常驻会话：连接池 + 预加载 + keep_alive + 并发上限（见 ollama_pool.py）
+# import asyncio
+# from ollama_pool import ManagedOllama
+#
+# async def main():
+#     llm = ManagedOllama(model="deepseek-r1:1.5b", keep_alive="30m", max_parallel=4)
+#     await llm.apreload()
+#     async for chunk in await llm.astream_complete("请介绍一下中国的赛龙舟"):
+#         print(chunk.delta, end="", flush=True)
+#     await llm.aclose()
+#
+# asyncio.run(main())
@@ -2,15 +2,18 @@ from llama_index.llms.openai import OpenAI
 from llama_index.core.llms import (
     ChatMessage,
     TextBlock,
-    ImageBlock,
 )
 
+from image_pipeline import ImagePipeline
+
 llm = OpenAI(model="gpt-4o-mini")
+# 先缩放、压缩再发送，结果按 (文件哈希, 像素预算) 缓存，见 image_pipeline.py
+pipeline = ImagePipeline()
 
 messages = [
     ChatMessage(role="user", blocks=[
         TextBlock(text="请用中文描述图片内容，要求在100字以内"),
-        ImageBlock(path="../../data/黑悟空/黑悟空英文.jpg")
+        pipeline.image_block("../../data/黑悟空/黑悟空英文.jpg")
     ])
 ]
 
@@ -0,0 +1,293 @@
+"""本地 Ollama 的常驻会话：连接池 + 模型预加载 / keep_alive 控制 + 并发上限
+
+local_ollama.py 每个进程新建一个 Ollama 客户端：第一次请求要等模型加载，每次调用都新建 HTTP 连接。这里：
+    - 连接池：进程内共用一个 httpx.AsyncClient（和一个同步 Client），HTTP keep-alive 复用 TCP 连接
+    - 模型常驻：preload() 发一个空的 /api/generate 让服务端提前加载模型；每个请求都带 keep_alive，
+      keep_warm() 在后台定期续期；unload() 用 keep_alive=0 立即卸载；loaded_models() 查 /api/ps
+    - 并发上限：max_parallel 个请求同时发往服务端（与服务端的 OLLAMA_NUM_PARALLEL 对齐），
+      多出来的在客户端排队，避免在服务端排队时连接一直占着；同步接口（chat / complete / stream_*）
+      用 threading.BoundedSemaphore、异步接口用 asyncio.Semaphore，两者各自限制在 max_parallel 以内
+    - 流式接口记录首 token 延迟和生成速度（服务端返回的 eval_count / eval_duration）
+直接调用 Ollama 的 HTTP 接口（/api/chat、/api/generate），不依赖 llama-index-llms-ollama。
+
+用法：
+    llm = ManagedOllama(model="deepseek-r1:1.5b", keep_alive="30m", max_parallel=4)
+    await llm.apreload()
+    async for chunk in await llm.astream_complete("请介绍一下中国的赛龙舟"):
+        print(chunk.delta, end="")
+"""
+import asyncio
+import json
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Union
+
+import httpx
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.llms import CustomLLM
+from llama_index.core.llms.callbacks import llm_chat_callback, llm_completion_callback
+
+
+class ManagedOllama(CustomLLM):
+    model: str = Field(description="Ollama 模型名")
+    base_url: str = Field(default="http://localhost:11434")
+    keep_alive: Union[str, int] = Field(default="30m", description="模型在显存中的保留时间，-1 表示一直保留")
+    max_parallel: int = Field(default=4, description="同时发往服务端的请求数")
+    request_timeout: float = Field(default=120.0)
+    context_window: int = Field(default=8000)
+    temperature: Optional[float] = Field(default=None)
+    additional_options: Dict[str, Any] = Field(default_factory=dict, description="透传给 Ollama 的 options")
+
+    _client: Optional[httpx.Client] = PrivateAttr(default=None)
+    _aclient: Optional[httpx.AsyncClient] = PrivateAttr(default=None)
+    _aclient_loop: Any = PrivateAttr(default=None)
+    _semaphore: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+    _sync_semaphore: threading.BoundedSemaphore = PrivateAttr()
+    _keep_warm_task: Optional[asyncio.Task] = PrivateAttr(default=None)
+    _stats: Dict[str, List[float]] = PrivateAttr(default_factory=lambda: {"first_token_s": [], "tokens_per_s": []})
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._sync_semaphore = threading.BoundedSemaphore(self.max_parallel)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ManagedOllama"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name=self.model, context_window=self.context_window, is_chat_model=True)
+
+    @property
+    def stats(self) -> Dict[str, List[float]]:
+        return self._stats
+
+    # ---- 连接池 ----
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_parallel * 2, max_keepalive_connections=self.max_parallel,
+                            keepalive_expiry=300)
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(base_url=self.base_url, timeout=self.request_timeout, limits=self._limits())
+        return self._client
+
+    @property
+    def aclient(self) -> httpx.AsyncClient:
+        """AsyncClient 和信号量都绑定事件循环，换了事件循环就关闭旧客户端、重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            if self._aclient is not None:
+                self._close_stale_aclient(self._aclient, self._aclient_loop)
+            self._aclient = httpx.AsyncClient(base_url=self.base_url, timeout=self.request_timeout,
+                                              limits=self._limits())
+            self._aclient_loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_parallel)
+        return self._aclient
+
+    @staticmethod
+    def _close_stale_aclient(aclient: httpx.AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+        """旧客户端的连接只能在它自己的事件循环上关闭"""
+        if loop.is_closed():
+            # 旧循环已结束（比如上一次 asyncio.run 退出前没有 aclose），连接已不可用，只能交给 GC
+            return
+        if loop.is_running():
+            # 旧循环还在别的线程里运行，把关闭交给它，不等待结果
+            asyncio.run_coroutine_threadsafe(aclient.aclose(), loop)
+            return
+        # 旧循环还在但没有运行：当前线程已有运行中的事件循环，借一个线程跑完关闭
+        closer = threading.Thread(target=loop.run_until_complete, args=(aclient.aclose(),))
+        closer.start()
+        closer.join()
+
+    async def aclose(self) -> None:
+        """每个事件循环结束前调用（例如 asyncio.run 的 main 末尾），连接才能被正常关闭"""
+        if self._keep_warm_task is not None:
+            self._keep_warm_task.cancel()
+            self._keep_warm_task = None
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    # ---- 模型常驻 ----
+    def preload(self) -> float:
+        """让服务端加载模型，返回耗时（秒）"""
+        start = time.perf_counter()
+        self.client.post("/api/generate", json={"model": self.model, "keep_alive": self.keep_alive}).raise_for_status()
+        return time.perf_counter() - start
+
+    async def apreload(self) -> float:
+        start = time.perf_counter()
+        response = await self.aclient.post("/api/generate", json={"model": self.model, "keep_alive": self.keep_alive})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    async def unload(self) -> None:
+        response = await self.aclient.post("/api/generate", json={"model": self.model, "keep_alive": 0})
+        response.raise_for_status()
+
+    async def loaded_models(self) -> List[str]:
+        response = await self.aclient.get("/api/ps")
+        response.raise_for_status()
+        return [m["name"] for m in response.json().get("models", [])]
+
+    def keep_warm(self, interval: float = 240.0) -> asyncio.Task:
+        """后台定期续期 keep_alive（间隔应小于 keep_alive），进程空闲时模型也不会被卸载"""
+        async def loop():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.apreload()
+                except httpx.HTTPError:
+                    pass
+
+        if self._keep_warm_task is None or self._keep_warm_task.done():
+            self._keep_warm_task = asyncio.get_running_loop().create_task(loop())
+        return self._keep_warm_task
+
+    # ---- 请求 ----
+    def _payload(self, stream: bool, messages: Optional[Sequence[ChatMessage]] = None,
+                 prompt: Optional[str] = None, **kwargs: Any) -> Dict[str, Any]:
+        options = dict(self.additional_options)
+        if self.temperature is not None:
+            options["temperature"] = self.temperature
+        options.setdefault("num_ctx", self.context_window)
+        payload = {"model": self.model, "stream": stream, "keep_alive": self.keep_alive, "options": options}
+        if messages is not None:
+            payload["messages"] = [{"role": m.role.value, "content": m.content or ""} for m in messages]
+        else:
+            payload["prompt"] = prompt
+        payload.update(kwargs)
+        return payload
+
+    def _record(self, start: float, first: Optional[float], final: Dict[str, Any]) -> None:
+        if first is not None:
+            self._stats["first_token_s"].append(first - start)
+        if final.get("eval_count") and final.get("eval_duration"):
+            self._stats["tokens_per_s"].append(final["eval_count"] / (final["eval_duration"] / 1e9))
+
+    def _iter_lines(self, path: str, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        with self._sync_semaphore:
+            start, first = time.perf_counter(), None
+            with self.client.stream("POST", path, json=payload) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if first is None:
+                        first = time.perf_counter()
+                    if data.get("done"):
+                        self._record(start, first, data)
+                    yield data
+
+    async def _aiter_lines(self, path: str, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        client = self.aclient
+        async with self._semaphore:
+            start, first = time.perf_counter(), None
+            async with client.stream("POST", path, json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if first is None:
+                        first = time.perf_counter()
+                    if data.get("done"):
+                        self._record(start, first, data)
+                    yield data
+
+    @staticmethod
+    def _chat_response(text: str, data: Dict[str, Any], delta: Optional[str] = None) -> ChatResponse:
+        role = data.get("message", {}).get("role", "assistant")
+        return ChatResponse(message=ChatMessage(role=role, content=text), delta=delta, raw=data)
+
+    # ---- chat ----
+    @llm_chat_callback()
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        text, last = "", {}
+        for data in self._iter_lines("/api/chat", self._payload(True, messages=messages, **kwargs)):
+            text += data.get("message", {}).get("content", "")
+            last = data
+        return self._chat_response(text, last)
+
+    @llm_chat_callback()
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        def gen() -> ChatResponseGen:
+            text = ""
+            for data in self._iter_lines("/api/chat", self._payload(True, messages=messages, **kwargs)):
+                delta = data.get("message", {}).get("content", "")
+                text += delta
+                yield self._chat_response(text, data, delta)
+
+        return gen()
+
+    @llm_chat_callback()
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        text, last = "", {}
+        async for data in self._aiter_lines("/api/chat", self._payload(True, messages=messages, **kwargs)):
+            text += data.get("message", {}).get("content", "")
+            last = data
+        return self._chat_response(text, last)
+
+    @llm_chat_callback()
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        async def gen() -> ChatResponseAsyncGen:
+            text = ""
+            async for data in self._aiter_lines("/api/chat", self._payload(True, messages=messages, **kwargs)):
+                delta = data.get("message", {}).get("content", "")
+                text += delta
+                yield self._chat_response(text, data, delta)
+
+        return gen()
+
+    # ---- complete ----
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        text, last = "", {}
+        for data in self._iter_lines("/api/generate", self._payload(True, prompt=prompt, **kwargs)):
+            text += data.get("response", "")
+            last = data
+        return CompletionResponse(text=text, raw=last)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        def gen() -> CompletionResponseGen:
+            text = ""
+            for data in self._iter_lines("/api/generate", self._payload(True, prompt=prompt, **kwargs)):
+                text += data.get("response", "")
+                yield CompletionResponse(text=text, delta=data.get("response", ""), raw=data)
+
+        return gen()
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        text, last = "", {}
+        async for data in self._aiter_lines("/api/generate", self._payload(True, prompt=prompt, **kwargs)):
+            text += data.get("response", "")
+            last = data
+        return CompletionResponse(text=text, raw=last)
+
+    @llm_completion_callback()
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseAsyncGen:
+        async def gen() -> CompletionResponseAsyncGen:
+            text = ""
+            async for data in self._aiter_lines("/api/generate", self._payload(True, prompt=prompt, **kwargs)):
+                text += data.get("response", "")
+                yield CompletionResponse(text=text, delta=data.get("response", ""), raw=data)
+
+        return gen()
@@ -0,0 +1,183 @@
+"""ManagedOllama 与"每次调用新建客户端"的对比：首 token 延迟、吞吐、新建连接数
+
+本地替身服务器模拟 Ollama 的 /api/generate、/api/chat、/api/ps：
+    - 模型未加载时第一个请求要等 --load-s 秒加载；keep_alive 到期或为 0 时卸载
+    - 同时最多 --server-parallel 个请求在生成（OLLAMA_NUM_PARALLEL），其余在服务端排队
+    - 每个 token 耗时 --token-ms 毫秒，流式返回 NDJSON
+两种客户端都从"模型未加载"开始，同时提交 --requests 个流式请求：
+    每次新建：每个请求一个新的 httpx.AsyncClient，不预加载、不限并发
+    ManagedOllama：启动时预加载（单独计时），共用连接池，max_parallel 与服务端对齐
+
+用法：
+    python ollama_pool_benchmark.py
+    python ollama_pool_benchmark.py --requests 64 --load-s 3
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import numpy as np
+from aiohttp import web
+
+from ollama_pool import ManagedOllama
+
+MODEL = "deepseek-r1:1.5b"
+
+
+class StandInOllama:
+    def __init__(self, load_s: float, token_ms: float, parallel: int, tokens: int = 48):
+        self.load_s = load_s
+        self.token_ms = token_ms
+        self.parallel = parallel
+        self.tokens = tokens
+        self.loaded_until = 0.0
+        self.connections = set()
+        self._load_lock = None
+        self._slots = None
+
+    async def _ensure_loaded(self, keep_alive) -> None:
+        async with self._load_lock:
+            if time.monotonic() > self.loaded_until:
+                await asyncio.sleep(self.load_s)
+            self._extend(keep_alive)
+
+    def _extend(self, keep_alive) -> None:
+        if keep_alive in (0, "0"):
+            self.loaded_until = 0.0
+        elif keep_alive in (-1, "-1"):
+            self.loaded_until = float("inf")
+        else:
+            text = str(keep_alive)
+            seconds = float(text[:-1]) * 60 if text.endswith("m") else float(text.rstrip("s"))
+            self.loaded_until = time.monotonic() + seconds
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        self.connections.add(request.transport.get_extra_info("peername"))
+        body = await request.json()
+        keep_alive = body.get("keep_alive", "5m")
+        is_chat = request.path == "/api/chat"
+        if not is_chat and not body.get("prompt"):
+            # 空 prompt：只加载或卸载模型
+            if keep_alive in (0, "0"):
+                self._extend(0)
+            else:
+                await self._ensure_loaded(keep_alive)
+            return web.json_response({"model": body["model"], "response": "", "done": True, "done_reason": "load"})
+
+        await self._ensure_loaded(keep_alive)
+        async with self._slots:
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            start = time.perf_counter()
+            for i in range(self.tokens):
+                await asyncio.sleep(self.token_ms / 1000)
+                piece = {"message": {"role": "assistant", "content": "龙"}} if is_chat else {"response": "龙"}
+                await response.write((json.dumps({"model": body["model"], "done": False, **piece}) + "\n").encode())
+            final = {"model": body["model"], "done": True, "eval_count": self.tokens,
+                     "eval_duration": int((time.perf_counter() - start) * 1e9),
+                     **({"message": {"role": "assistant", "content": ""}} if is_chat else {"response": ""})}
+            await response.write((json.dumps(final) + "\n").encode())
+            await response.write_eof()
+            self._extend(keep_alive)
+            return response
+
+    async def ps(self, request: web.Request) -> web.Response:
+        loaded = time.monotonic() < self.loaded_until
+        return web.json_response({"models": [{"name": MODEL}] if loaded else []})
+
+    def start(self) -> int:
+        ready = threading.Event()
+        state = {}
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._load_lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.parallel)
+            app = web.Application()
+            app.router.add_post("/api/generate", self.handle)
+            app.router.add_post("/api/chat", self.handle)
+            app.router.add_get("/api/ps", self.ps)
+            runner = web.AppRunner(app)
+            loop.run_until_complete(runner.setup())
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            loop.run_until_complete(site.start())
+            state["port"] = site._server.sockets[0].getsockname()[1]
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        return state["port"]
+
+
+async def stream_fresh_client(base_url: str, prompt: str):
+    """对照组：每次调用都新建客户端和连接"""
+    start, first, count = time.perf_counter(), None, 0
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        async with client.stream("POST", "/api/generate",
+                                 json={"model": MODEL, "prompt": prompt, "stream": True}) as response:
+            async for line in response.aiter_lines():
+                if line and not json.loads(line).get("done"):
+                    first = first or time.perf_counter()
+                    count += 1
+    return first - start, count
+
+
+async def stream_managed(llm: ManagedOllama, prompt: str):
+    start, first, count = time.perf_counter(), None, 0
+    async for chunk in await llm.astream_complete(prompt):
+        if chunk.delta:
+            first = first or time.perf_counter()
+            count += 1
+    return first - start, count
+
+
+def report(label: str, results, wall: float, connections: int) -> None:
+    first = np.array([r[0] for r in results]) * 1000
+    tokens = sum(r[1] for r in results)
+    print(f"{label:<12} 首 token p50 {np.percentile(first, 50):7.0f} ms  p95 {np.percentile(first, 95):7.0f} ms  "
+          f"总耗时 {wall:5.2f}s  吞吐 {tokens / wall:6.1f} tokens/s  新建连接 {connections}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--load-s", type=float, default=2.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--server-parallel", type=int, default=4)
+    args = parser.parse_args()
+
+    server = StandInOllama(args.load_s, args.token_ms, args.server_parallel)
+    base_url = f"http://127.0.0.1:{server.start()}"
+    prompts = [f"请介绍一下中国的赛龙舟（第 {i} 问）" for i in range(args.requests)]
+
+    # 1. 对照：模型未加载，每个请求新建客户端
+    start = time.perf_counter()
+    results = await asyncio.gather(*(stream_fresh_client(base_url, p) for p in prompts))
+    report("每次新建", results, time.perf_counter() - start, len(server.connections))
+
+    # 2. ManagedOllama：先卸载模型，启动时预加载，再同时提交
+    llm = ManagedOllama(model=MODEL, base_url=base_url, keep_alive="30m", max_parallel=args.server_parallel)
+    await llm.unload()
+    server.connections.clear()
+    print(f"预加载耗时: {await llm.apreload():.2f}s, 已加载模型: {await llm.loaded_models()}")
+    start = time.perf_counter()
+    results = await asyncio.gather(*(stream_managed(llm, p) for p in prompts))
+    report("ManagedOllama", results, time.perf_counter() - start, len(server.connections))
+    print(f"服务端生成速度: {np.mean(llm.stats['tokens_per_s']):.1f} tokens/s/请求")
+
+    # 3. keep_warm 后台续期；unload 后 /api/ps 为空
+    task = llm.keep_warm(interval=0.5)
+    await asyncio.sleep(1.2)
+    task.cancel()
+    await llm.unload()
+    print(f"unload 后已加载模型: {await llm.loaded_models()}")
+    await llm.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+"""CachedLLM / ResponseStore 的命中、重放、键和淘汰（SlowMockLLM 本地替身，不需要网络）
+
+    python -m pytest test_llm_cache.py
+"""
+import asyncio
+import os
+import time
+
+import pytest
+from llama_index.core.base.llms.types import ChatMessage
+from llama_index.core.tools import FunctionTool
+
+from llm_cache import CachedLLM, ResponseStore, SlowMockLLM
+
+MESSAGES = [
+    ChatMessage(role="system", content="你是一个美食大师，擅长各种中西美食的制作"),
+    ChatMessage(role="user", content="请根据以下需求，给出一份详细的食谱：\n- 西红柿\n- 鸡蛋"),
+]
+
+
+@pytest.fixture
+def mock():
+    return SlowMockLLM(latency=0.0)
+
+
+def _cached(mock, tmp_path, **kwargs):
+    return CachedLLM(mock, cache_path=os.path.join(tmp_path, "llm_cache.sqlite"), **kwargs)
+
+
+def _count(store):
+    return store._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def test_stream_hit_replays_same_deltas(mock, tmp_path):
+    llm = _cached(mock, tmp_path)
+    first = [(chunk.delta, chunk.message.content) for chunk in llm.stream_chat(MESSAGES)]
+    second = [(chunk.delta, chunk.message.content) for chunk in llm.stream_chat(MESSAGES)]
+    assert len(first) > 1
+    assert second == first
+    assert mock.calls == 1
+    assert llm.stats["hits"] == 1
+
+
+def test_chat_achat_and_stream_share_one_entry(mock, tmp_path):
+    llm = _cached(mock, tmp_path)
+    text = "".join(chunk.delta for chunk in llm.stream_chat(MESSAGES))
+    assert llm.chat(MESSAGES).message.content == text
+    assert asyncio.run(llm.achat(MESSAGES)).message.content == text
+    assert mock.calls == 1
+    assert len(llm.store) == 1
+
+
+def test_aborted_stream_is_not_cached(mock, tmp_path):
+    llm = _cached(mock, tmp_path)
+    stream = llm.stream_chat(MESSAGES)
+    next(stream)
+    stream.close()
+    assert len(llm.store) == 0
+
+    list(llm.stream_chat(MESSAGES))
+    assert mock.calls == 2
+    assert len(llm.store) == 1
+
+
+def test_temperature_and_tools_change_key(mock, tmp_path):
+    llm = _cached(mock, tmp_path)
+    tool = FunctionTool.from_defaults(fn=lambda dish: dish, name="find_recipe", description="查找食谱")
+    base = llm.cache_key("chat", MESSAGES)
+    assert llm.cache_key("chat", MESSAGES) == base
+    assert llm.cache_key("chat", MESSAGES, temperature=0.9) != base
+    assert llm.cache_key("chat", MESSAGES, tools=[tool.metadata.to_openai_tool()]) != base
+
+    llm.chat(MESSAGES)
+    llm.chat(MESSAGES, temperature=0.9)
+    assert mock.calls == 2
+
+
+@pytest.mark.parametrize("limits", [{"max_entries": 3}, {"max_bytes": 1500}])
+def test_lru_eviction_keeps_count_in_sync(tmp_path, limits):
+    store = ResponseStore(os.path.join(tmp_path, "cache.sqlite"), ttl=None,
+                          **{"max_entries": None, "max_bytes": None, **limits})
+    for i in range(10):
+        store.put(f"k{i}", {"text": "西红柿炒鸡蛋" * 20})
+        # 访问 k0 让它保持最新，不被 LRU 淘汰
+        assert store.get("k0") is not None
+        assert len(store) == _count(store)
+    assert store.stats["evicted"] > 0
+    assert store.get("k0") is not None
+    assert store.get("k1") is None
+    if "max_bytes" in limits:
+        size = store._conn.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+        assert size <= limits["max_bytes"]
+
+    # 覆盖写同一个键不增加条数
+    store.put("k0", {"text": "番茄炒蛋"})
+    assert len(store) == _count(store)
+
+
+def test_ttl_expiry(mock, tmp_path):
+    llm = _cached(mock, tmp_path, ttl=0.2)
+    llm.complete("请介绍第 1 道菜")
+    llm.complete("请介绍第 1 道菜")
+    assert mock.calls == 1
+
+    time.sleep(0.3)
+    llm.complete("请介绍第 1 道菜")
+    assert mock.calls == 2
+    assert llm.stats["expired"] == 1
+    assert len(llm.store) == _count(llm.store) == 1
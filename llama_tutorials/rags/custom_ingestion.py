@@ -3,15 +3,35 @@ from llama_index.core.ingestion import IngestionPipeline
 from llama_index.core.node_parser import TokenTextSplitter
 from llama_index.core import VectorStoreIndex
 
-documents = SimpleDirectoryReader(
-    input_files=["../../data/黑悟空/设定.txt"]).load_data()
+from incremental_ingestion import IncrementalIngestion
+from parallel_ingestion import parallel_ingest
 
-pipeline = IngestionPipeline(
-    transformations=[TokenTextSplitter(chunk_size=100, chunk_overlap=20)])
+INCREMENTAL = True
+# 并行模式（INCREMENTAL = False 时生效）：解析+切分分散到进程池，嵌入在主进程批量完成
+PARALLEL = False
 
-nodes = pipeline.run(documents=documents)
+if INCREMENTAL:
+    # 增量模式：只重新切分/嵌入新增或修改过的文件，已删除文件的节点从索引中移除
+    ingestion = IncrementalIngestion(
+        "./storage/黑悟空",
+        transformations=[TokenTextSplitter(chunk_size=100, chunk_overlap=20)])
+    print(ingestion.sync("../../data/黑悟空", required_exts=[".txt"]))
+    index = ingestion.index
+elif PARALLEL:
+    # 子进程会重新导入本脚本，macOS / Windows（spawn）下需要把这段放进 if __name__ == "__main__": 里
+    nodes = parallel_ingest("../../data/黑悟空", num_workers=4, required_exts=[".txt"],
+                            chunk_size=100, chunk_overlap=20)
+    index = VectorStoreIndex(nodes)
+else:
+    documents = SimpleDirectoryReader(
+        input_files=["../../data/黑悟空/设定.txt"]).load_data()
 
-index = VectorStoreIndex(nodes)
+    pipeline = IngestionPipeline(
+        transformations=[TokenTextSplitter(chunk_size=100, chunk_overlap=20)])
+
+    nodes = pipeline.run(documents=documents)
+
+    index = VectorStoreIndex(nodes)
 
 qe = index.as_query_engine()
 
@@ -1,14 +1,34 @@
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, get_response_synthesizer
+from llama_index.core import Settings, SimpleDirectoryReader, StorageContext, VectorStoreIndex, get_response_synthesizer
 from llama_index.core.retrievers import VectorIndexRetriever
 from llama_index.core.query_engine import RetrieverQueryEngine
 from llama_index.core.postprocessor import SimilarityPostprocessor
 
+from hybrid_retriever import BM25Index, BM25Retriever, HybridRetriever
+from numpy_vector_store import NumpyVectorStore
+from semantic_cache import SemanticCacheQueryEngine
+
+HYBRID = True
+
 documents = SimpleDirectoryReader(
-    input_files="../../data/黑悟空/黑悟空wiki.txt").load_data(show_progress=True)
-# 创建索引
-index = VectorStoreIndex.from_documents(documents)
+    input_files=["../../data/黑悟空/黑悟空wiki.txt", "../../data/黑悟空/设定.txt"]).load_data(show_progress=True)
+nodes = Settings.node_parser.get_nodes_from_documents(documents)
+# 创建索引：向量存放在连续的 NumPy 矩阵中，检索为一次矩阵-向量乘
+storage_context = StorageContext.from_defaults(vector_store=NumpyVectorStore())
+index = VectorStoreIndex(nodes, storage_context=storage_context)
 # 创建检索器
 retriever = VectorIndexRetriever(index=index, similarity_top_k=5)
+node_postprocessors = [SimilarityPostprocessor(similarity_cutoff=0.7)]
+
+if HYBRID:
+    # 混合检索：BM25 倒排索引负责人名、地名、章节名等精确词，向量检索负责语义，RRF 融合排名
+    # BM25 必须和向量索引用同一批 nodes（node_id 相同），RRF 才能把两路命中的同一个块合并；
+    # nodes 每次运行都重新切分、id 也会变，所以不从磁盘加载旧的 BM25 索引，每次现建（很快）
+    bm25_index = BM25Index()
+    bm25_index.add_nodes(nodes)
+    retriever = HybridRetriever(
+        [retriever, BM25Retriever(bm25_index, similarity_top_k=5)], similarity_top_k=5)
+    # RRF 分数不是余弦相似度，不能再用 similarity_cutoff 过滤
+    node_postprocessors = []
 
 # response synthesizer
 response_synthesizer = get_response_synthesizer()
@@ -16,8 +36,14 @@ response_synthesizer = get_response_synthesizer()
 qe = RetrieverQueryEngine(
     retriever=retriever,
     response_synthesizer=response_synthesizer,
-    node_postprocessors=[SimilarityPostprocessor(similarity_cutoff=0.7)]
+    node_postprocessors=node_postprocessors
 )
 
+# 语义缓存：相同或近义的问题直接返回缓存结果，跳过检索和合成
+qe = SemanticCacheQueryEngine(qe, similarity_threshold=0.95, ttl=3600)
+
 response = qe.query("讲述一下黑悟空的介绍")
 print(response)
+response = qe.query("介绍一下黑悟空")
+print(response)
+print(qe.stats)
@@ -0,0 +1,45 @@
+"""确定性哈希嵌入：离线、无模型下载，用于基准测试和回归比较
+
+把文本的单词和字符 n-gram 哈希到固定维度的桶里（带符号），再做 L2 归一化。
+词面重合越多余弦相似度越高，效果远不如真实模型，但结果完全可复现、速度很快。
+"""
+import hashlib
+import re
+from typing import List
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashEmbedding(BaseEmbedding):
+    embed_dim: int = Field(default=384, description="向量维度")
+    ngram: int = Field(default=3, description="字符 n-gram 长度")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashEmbedding"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.embed_dim, dtype=np.float32)
+        text = text.lower()
+        features = _WORD_RE.findall(text)
+        compact = "".join(features)
+        features += [compact[i:i + self.ngram] for i in range(max(len(compact) - self.ngram + 1, 0))]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.embed_dim] += 1.0 if (value >> 63) else -1.0
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm).tolist() if norm else vector.tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
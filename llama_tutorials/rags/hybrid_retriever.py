@@ -0,0 +1,220 @@
+"""BM25 + 向量的混合检索（倒排索引对中文做字符 n-gram 切分）
+
+- 分词：中文连续片段切成单字 + 相邻双字（"黑风山" -> 黑 风 山 黑风 风山），
+  英文/数字按单词小写；不依赖词典，人名、地名、"第一章"这类精确词也能命中
+- 倒排表：term -> (doc_id 数组 uint32, 词频数组 uint16)，用 array 紧凑存储，
+  打分时 np.frombuffer 零拷贝转成 NumPy 向量化计算 BM25
+- 增量更新：add_nodes 直接追加倒排；delete_nodes 做墓碑标记，persist 时压实
+- 持久化：所有倒排表拼成一份 CSR（offsets / doc_ids / tfs）存 npz，节点存 jsonl
+- HybridRetriever 用倒数排名融合(RRF)合并 BM25 与向量检索结果
+"""
+import json
+import os
+import re
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import BaseNode, MetadataMode, NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+
+POSTINGS_FNAME = "bm25_postings.npz"
+NODES_FNAME = "bm25_nodes.jsonl"
+META_FNAME = "bm25_meta.json"
+
+_TOKEN_RE = re.compile(r"[㐀-䶿一-鿿豈-﫿]+|[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """中文片段输出单字和双字，其余按字母数字单词切分"""
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        piece = match.group()
+        if piece[0].isascii():
+            tokens.append(piece)
+            continue
+        tokens.extend(piece)
+        tokens.extend(piece[i:i + 2] for i in range(len(piece) - 1))
+    return tokens
+
+
+class BM25Index:
+    """内存倒排索引，支持增量增删与持久化"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._vocab: Dict[str, int] = {}
+        self._doc_ids: List[array] = []   # term_id -> array('I')
+        self._tfs: List[array] = []       # term_id -> array('H')
+        self._doc_len = array("I")
+        self._deleted = array("B")
+        self._node_ids: List[str] = []
+        self._raw_nodes: List[str] = []
+        self._id_to_doc: Dict[str, int] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._id_to_doc)
+
+    def add_nodes(self, nodes: Sequence[BaseNode]) -> None:
+        for node in nodes:
+            if node.node_id in self._id_to_doc:
+                self.delete_nodes([node.node_id])
+            doc = len(self._node_ids)
+            counts: Dict[int, int] = {}
+            tokens = tokenize(node.get_content(metadata_mode=MetadataMode.NONE))
+            for token in tokens:
+                term = self._vocab.get(token)
+                if term is None:
+                    term = self._vocab[token] = len(self._doc_ids)
+                    self._doc_ids.append(array("I"))
+                    self._tfs.append(array("H"))
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                self._doc_ids[term].append(doc)
+                self._tfs[term].append(min(tf, 0xFFFF))
+
+            node = node.model_copy()
+            node.embedding = None
+            metadata = node_to_metadata_dict(node, remove_text=False, flat_metadata=False)
+            self._raw_nodes.append(json.dumps(metadata, ensure_ascii=False))
+            self._node_ids.append(node.node_id)
+            self._id_to_doc[node.node_id] = doc
+            self._doc_len.append(len(tokens))
+            self._deleted.append(0)
+            self._total_len += len(tokens)
+
+    def delete_nodes(self, node_ids: Sequence[str]) -> None:
+        for node_id in node_ids:
+            doc = self._id_to_doc.pop(node_id, None)
+            if doc is not None:
+                self._deleted[doc] = 1
+                self._total_len -= self._doc_len[doc]
+
+    def search(self, query: str, top_k: int) -> List[NodeWithScore]:
+        num_docs = len(self._id_to_doc)
+        if num_docs == 0:
+            return []
+        avgdl = max(self._total_len / num_docs, 1.0)
+        doc_len = np.frombuffer(self._doc_len, dtype=np.uint32)
+        deleted = np.frombuffer(self._deleted, dtype=np.uint8).astype(bool)
+        scores = np.zeros(len(self._node_ids), dtype=np.float32)
+
+        for token in set(tokenize(query)):
+            term = self._vocab.get(token)
+            if term is None:
+                continue
+            docs = np.frombuffer(self._doc_ids[term], dtype=np.uint32)
+            tfs = np.frombuffer(self._tfs[term], dtype=np.uint16).astype(np.float32)
+            live = ~deleted[docs]
+            docs, tfs = docs[live], tfs[live]
+            if docs.size == 0:
+                continue
+            idf = np.log(1 + (num_docs - docs.size + 0.5) / (docs.size + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_len[docs] / avgdl)
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        hits = np.flatnonzero(scores > 0)
+        if hits.size == 0:
+            return []
+        top_k = min(top_k, hits.size)
+        top = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+        top = top[np.argsort(-scores[top])]
+        return [NodeWithScore(node=metadata_dict_to_node(json.loads(self._raw_nodes[doc])),
+                              score=float(scores[doc])) for doc in top]
+
+    def persist(self, persist_dir: str) -> None:
+        """压实（丢弃已删除文档）后写成 CSR 格式"""
+        os.makedirs(persist_dir, exist_ok=True)
+        live_docs = [doc for doc, flag in enumerate(self._deleted) if not flag]
+        remap = np.full(len(self._node_ids) + 1, -1, dtype=np.int64)
+        remap[live_docs] = np.arange(len(live_docs))
+
+        terms, offsets, all_docs, all_tfs = [], [0], [], []
+        for token, term in self._vocab.items():
+            docs = remap[np.frombuffer(self._doc_ids[term], dtype=np.uint32)]
+            keep = docs >= 0
+            if not keep.any():
+                continue
+            terms.append(token)
+            all_docs.append(docs[keep].astype(np.uint32))
+            all_tfs.append(np.frombuffer(self._tfs[term], dtype=np.uint16)[keep])
+            offsets.append(offsets[-1] + int(keep.sum()))
+        np.savez(
+            os.path.join(persist_dir, POSTINGS_FNAME),
+            offsets=np.asarray(offsets, dtype=np.int64),
+            doc_ids=np.concatenate(all_docs) if all_docs else np.zeros(0, dtype=np.uint32),
+            tfs=np.concatenate(all_tfs) if all_tfs else np.zeros(0, dtype=np.uint16),
+            doc_len=np.frombuffer(self._doc_len, dtype=np.uint32)[live_docs],
+        )
+        with open(os.path.join(persist_dir, NODES_FNAME), "w", encoding="utf-8") as f:
+            for doc in live_docs:
+                f.write(json.dumps([self._node_ids[doc], self._raw_nodes[doc]],
+                                   ensure_ascii=False) + "\n")
+        with open(os.path.join(persist_dir, META_FNAME), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "terms": terms}, f, ensure_ascii=False)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str) -> "BM25Index":
+        with open(os.path.join(persist_dir, META_FNAME), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(k1=meta["k1"], b=meta["b"])
+        data = np.load(os.path.join(persist_dir, POSTINGS_FNAME))
+        offsets, doc_ids, tfs = data["offsets"], data["doc_ids"], data["tfs"]
+        for term, token in enumerate(meta["terms"]):
+            index._vocab[token] = term
+            start, end = offsets[term], offsets[term + 1]
+            index._doc_ids.append(array("I", doc_ids[start:end].tobytes()))
+            index._tfs.append(array("H", tfs[start:end].tobytes()))
+        index._doc_len = array("I", data["doc_len"].astype(np.uint32).tobytes())
+        index._deleted = array("B", bytes(len(index._doc_len)))
+        index._total_len = int(data["doc_len"].sum())
+
+        with open(os.path.join(persist_dir, NODES_FNAME), "r", encoding="utf-8") as f:
+            for doc, line in enumerate(f):
+                node_id, raw = json.loads(line)
+                index._node_ids.append(node_id)
+                index._raw_nodes.append(raw)
+                index._id_to_doc[node_id] = doc
+        return index
+
+
+class BM25Retriever(BaseRetriever):
+    def __init__(self, index: BM25Index, similarity_top_k: int = 5, **kwargs):
+        self._index = index
+        self._similarity_top_k = similarity_top_k
+        super().__init__(**kwargs)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._index.search(query_bundle.query_str, self._similarity_top_k)
+
+
+class HybridRetriever(BaseRetriever):
+    """倒数排名融合：score = sum(1 / (rrf_k + rank))，只看排名，不受两路分数量纲影响"""
+
+    def __init__(
+        self,
+        retrievers: List[BaseRetriever],
+        similarity_top_k: int = 5,
+        rrf_k: int = 60,
+        weights: Optional[List[float]] = None,
+        **kwargs,
+    ):
+        self._retrievers = retrievers
+        self._similarity_top_k = similarity_top_k
+        self._rrf_k = rrf_k
+        self._weights = weights or [1.0] * len(retrievers)
+        super().__init__(**kwargs)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        fused: Dict[str, float] = {}
+        nodes: Dict[str, NodeWithScore] = {}
+        for retriever, weight in zip(self._retrievers, self._weights):
+            for rank, hit in enumerate(retriever.retrieve(query_bundle)):
+                node_id = hit.node.node_id
+                fused[node_id] = fused.get(node_id, 0.0) + weight / (self._rrf_k + rank + 1)
+                nodes.setdefault(node_id, hit)
+        ranked = sorted(fused, key=fused.get, reverse=True)[:self._similarity_top_k]
+        return [NodeWithScore(node=nodes[node_id].node, score=fused[node_id]) for node_id in ranked]
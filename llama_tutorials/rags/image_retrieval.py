@@ -0,0 +1,336 @@
+"""多模态图片检索：位图元数据索引 + 稠密向量索引 + 带过滤的 top-k 查询
+
+数据来自 data/多模态/metadata.json（每张图有 category / tags / game_chapter / location /
+characters / abilities_shown / environment / time_of_day 等字段）。
+
+- BitmapIndex：每个 (字段, 取值) 一张按行编号的位图（np.packbits 压缩，每行 1 bit），
+  列表字段（tags、characters ...）每个元素各记一位；
+  过滤条件 {"game_chapter": "第一章", "characters": "狮妖"} 就是几张位图按位与，
+  同一字段给多个取值时按位或，全程不逐条扫描记录
+- 稠密索引：标题 + 描述 + 标签的文本向量（默认 HashEmbedding，可换成任意 BaseEmbedding），
+  可选的图片向量（传入 MultiModalEmbedding，如 CLIP）；向量连续存放在 float32 矩阵里，
+  只对过滤后的行做矩阵-向量乘，再用 argpartition 取 top-k
+- 持久化：records.json + text_embeddings.npy / image_embeddings.npy + meta.json；
+  metadata.json 的哈希和嵌入模型都没变时直接加载，不重新计算向量
+- ImageRetriever 把查询包装成 llama_index 的 BaseRetriever，返回 ImageNode
+
+用法：
+    index = ImageIndex.from_metadata_file("../../data/多模态/metadata.json")
+    hits = index.search("与妖怪的BOSS战", filters={"game_chapter": "第一章", "characters": "狮妖"})
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.embeddings import MultiModalEmbedding
+from llama_index.core.schema import ImageNode, NodeWithScore, QueryBundle
+
+from hash_embedding import HashEmbedding
+from numpy_vector_store import top_k_rows
+
+FILTER_FIELDS = ("category", "tags", "game_chapter", "location", "characters",
+                 "abilities_shown", "environment", "time_of_day")
+
+RECORDS_FNAME = "records.json"
+TEXT_EMBEDDINGS_FNAME = "text_embeddings.npy"
+IMAGE_EMBEDDINGS_FNAME = "image_embeddings.npy"
+META_FNAME = "meta.json"
+
+FilterValue = Union[str, Sequence[str]]
+
+
+class BitmapIndex:
+    """列式位图索引：field -> value -> 压缩位图（uint8，little 位序）"""
+
+    def __init__(self, records: Sequence[Dict], fields: Sequence[str] = FILTER_FIELDS):
+        self.size = len(records)
+        self.fields = tuple(fields)
+        rows: Dict[str, Dict[str, List[int]]] = {field: {} for field in self.fields}
+        for row, record in enumerate(records):
+            for field in self.fields:
+                values = record.get(field)
+                if values is None:
+                    continue
+                for value in (values if isinstance(values, list) else [values]):
+                    rows[field].setdefault(str(value), []).append(row)
+        self._bitmaps: Dict[str, Dict[str, np.ndarray]] = {
+            field: {value: self._pack(value_rows) for value, value_rows in values.items()}
+            for field, values in rows.items()
+        }
+
+    def _pack(self, rows: Sequence[int]) -> np.ndarray:
+        bits = np.zeros(self.size, dtype=bool)
+        bits[list(rows)] = True
+        return np.packbits(bits, bitorder="little")
+
+    def values(self, field: str) -> List[str]:
+        return sorted(self._bitmaps[field])
+
+    def bitmap(self, filters: Dict[str, FilterValue]) -> np.ndarray:
+        """字段之间按位与；同一字段的多个取值按位或"""
+        result = np.full((self.size + 7) // 8, 0xFF, dtype=np.uint8)
+        for field, wanted in filters.items():
+            if field not in self._bitmaps:
+                raise KeyError(f"字段 {field} 没有建立索引，可用字段: {', '.join(self.fields)}")
+            values = [wanted] if isinstance(wanted, str) else list(wanted)
+            union = np.zeros_like(result)
+            for value in values:
+                bitmap = self._bitmaps[field].get(value)
+                if bitmap is not None:
+                    union |= bitmap
+            result &= union
+        return result
+
+    def rows(self, filters: Dict[str, FilterValue]) -> np.ndarray:
+        """满足过滤条件的行号（升序）"""
+        bits = np.unpackbits(self.bitmap(filters), count=self.size, bitorder="little")
+        return np.flatnonzero(bits)
+
+    def count(self, filters: Dict[str, FilterValue]) -> int:
+        return int(np.unpackbits(self.bitmap(filters), count=self.size, bitorder="little").sum())
+
+
+def record_text(record: Dict) -> str:
+    """文本向量的输入：标题、描述和标签"""
+    return f"{record.get('title', '')}。{record.get('description', '')} 标签：{'、'.join(record.get('tags', []))}"
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def _model_id(model: Optional[BaseEmbedding]) -> Optional[str]:
+    if model is None:
+        return None
+    return f"{model.class_name()}:{model.model_name}:{getattr(model, 'embed_dim', '')}"
+
+
+class ImageIndex:
+    def __init__(
+        self,
+        records: List[Dict],
+        text_embeddings: np.ndarray,
+        image_embeddings: Optional[np.ndarray] = None,
+        embed_model: Optional[BaseEmbedding] = None,
+        image_embed_model: Optional[MultiModalEmbedding] = None,
+        image_root: str = ".",
+    ):
+        self.records = records
+        self.text_embeddings = _normalize(np.asarray(text_embeddings, dtype=np.float32))
+        self.image_embeddings = (None if image_embeddings is None
+                                 else _normalize(np.asarray(image_embeddings, dtype=np.float32)))
+        self.embed_model = embed_model or HashEmbedding()
+        self.image_embed_model = image_embed_model
+        self.image_root = image_root
+        self.bitmaps = BitmapIndex(records)
+
+    @classmethod
+    def build(
+        cls,
+        records: List[Dict],
+        embed_model: Optional[BaseEmbedding] = None,
+        image_embed_model: Optional[MultiModalEmbedding] = None,
+        image_root: str = ".",
+    ) -> "ImageIndex":
+        embed_model = embed_model or HashEmbedding()
+        text_embeddings = np.asarray(
+            embed_model.get_text_embedding_batch([record_text(r) for r in records]), dtype=np.float32)
+        image_embeddings = None
+        if image_embed_model is not None:
+            image_embeddings = cls._embed_images(records, image_embed_model, image_root)
+        return cls(records, text_embeddings, image_embeddings, embed_model, image_embed_model, image_root)
+
+    @staticmethod
+    def _embed_images(records: List[Dict], model: MultiModalEmbedding, image_root: str) -> np.ndarray:
+        """图片文件不存在的记录用零向量占位（归一化后仍为零，相似度为 0）"""
+        paths = [os.path.join(image_root, os.path.basename(r["file_path"])) for r in records]
+        present = [i for i, path in enumerate(paths) if os.path.exists(path)]
+        vectors = model.get_image_embedding_batch([paths[i] for i in present])
+        matrix = np.zeros((len(records), len(vectors[0]) if vectors else 1), dtype=np.float32)
+        if vectors:
+            matrix[present] = np.asarray(vectors, dtype=np.float32)
+        return matrix
+
+    @classmethod
+    def from_metadata_file(
+        cls,
+        metadata_path: str,
+        persist_dir: str = "./storage/image_index",
+        embed_model: Optional[BaseEmbedding] = None,
+        image_embed_model: Optional[MultiModalEmbedding] = None,
+    ) -> "ImageIndex":
+        """metadata.json 与嵌入模型都没变时直接加载持久化的向量，否则重建并持久化"""
+        embed_model = embed_model or HashEmbedding()
+        with open(metadata_path, "rb") as f:
+            raw = f.read()
+        expected = {
+            "source_sha256": hashlib.sha256(raw).hexdigest(),
+            "embed_model": _model_id(embed_model),
+            "image_embed_model": _model_id(image_embed_model),
+        }
+        image_root = os.path.dirname(metadata_path)
+        meta_path = os.path.join(persist_dir, META_FNAME)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                if json.load(f) == expected:
+                    return cls.from_persist_dir(persist_dir, embed_model, image_embed_model, image_root)
+
+        records = json.loads(raw.decode("utf-8"))["images"]
+        index = cls.build(records, embed_model, image_embed_model, image_root)
+        index.persist(persist_dir, meta=expected)
+        return index
+
+    def persist(self, persist_dir: str, meta: Optional[Dict] = None) -> None:
+        os.makedirs(persist_dir, exist_ok=True)
+        with open(os.path.join(persist_dir, RECORDS_FNAME), "w", encoding="utf-8") as f:
+            json.dump(self.records, f, ensure_ascii=False)
+        np.save(os.path.join(persist_dir, TEXT_EMBEDDINGS_FNAME), self.text_embeddings)
+        image_path = os.path.join(persist_dir, IMAGE_EMBEDDINGS_FNAME)
+        if self.image_embeddings is not None:
+            np.save(image_path, self.image_embeddings)
+        elif os.path.exists(image_path):
+            os.remove(image_path)
+        # meta.json 最后写，中途失败时下次会重建
+        with open(os.path.join(persist_dir, META_FNAME), "w", encoding="utf-8") as f:
+            json.dump(meta or {}, f, ensure_ascii=False)
+
+    @classmethod
+    def from_persist_dir(
+        cls,
+        persist_dir: str,
+        embed_model: Optional[BaseEmbedding] = None,
+        image_embed_model: Optional[MultiModalEmbedding] = None,
+        image_root: str = ".",
+    ) -> "ImageIndex":
+        with open(os.path.join(persist_dir, RECORDS_FNAME), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        text_embeddings = np.load(os.path.join(persist_dir, TEXT_EMBEDDINGS_FNAME))
+        image_path = os.path.join(persist_dir, IMAGE_EMBEDDINGS_FNAME)
+        image_embeddings = np.load(image_path) if os.path.exists(image_path) else None
+        return cls(records, text_embeddings, image_embeddings, embed_model, image_embed_model, image_root)
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        filters: Optional[Dict[str, FilterValue]] = None,
+        top_k: int = 3,
+        query_image: Optional[str] = None,
+        image_weight: float = 0.5,
+    ) -> List[Tuple[Dict, float]]:
+        """先用位图过滤出候选行，只对这些行计算相似度
+
+        - 只给 query：文本向量相似度；有图片向量时再按 image_weight 混合 CLIP 文本-图片相似度
+        - 给 query_image：以图搜图（需要 image_embed_model）
+        - 都不给：只做过滤，按原始顺序返回前 top_k 条
+        """
+        rows = self.bitmaps.rows(filters) if filters else np.arange(len(self.records))
+        if rows.size == 0:
+            return []
+        if query is None and query_image is None:
+            return [(self.records[i], 1.0) for i in rows[:top_k]]
+
+        scores = self._scores(rows, query, query_image, image_weight)
+        top = top_k_rows(scores[None, :], top_k)[0]
+        return [(self.records[rows[i]], float(scores[i])) for i in top]
+
+    def _scores(
+        self,
+        rows: np.ndarray,
+        query: Optional[str],
+        query_image: Optional[str],
+        image_weight: float,
+    ) -> np.ndarray:
+        if query_image is not None:
+            if self.image_embeddings is None or self.image_embed_model is None:
+                raise ValueError("以图搜图需要构建时传入 image_embed_model")
+            vector = _normalize(np.asarray(
+                [self.image_embed_model.get_image_embedding(query_image)], dtype=np.float32))[0]
+            return self.image_embeddings[rows] @ vector
+
+        vector = _normalize(np.asarray(
+            [self.embed_model.get_query_embedding(query)], dtype=np.float32))[0]
+        scores = self.text_embeddings[rows] @ vector
+        if self.image_embeddings is not None and self.image_embed_model is not None and image_weight > 0:
+            clip_vector = _normalize(np.asarray(
+                [self.image_embed_model.get_query_embedding(query)], dtype=np.float32))[0]
+            scores = (1 - image_weight) * scores + image_weight * (self.image_embeddings[rows] @ clip_vector)
+        return scores
+
+    def to_node(self, record: Dict) -> ImageNode:
+        metadata = {field: record[field] for field in FILTER_FIELDS if field in record}
+        metadata.update(image_id=record["image_id"], title=record.get("title"))
+        return ImageNode(
+            id_=record["image_id"],
+            text=record.get("description", ""),
+            image_path=os.path.join(self.image_root, os.path.basename(record["file_path"])),
+            image_mimetype="image/jpeg",
+            metadata=metadata,
+        )
+
+
+class ImageRetriever(BaseRetriever):
+    """带固定过滤条件的图片检索器"""
+
+    def __init__(
+        self,
+        index: ImageIndex,
+        similarity_top_k: int = 3,
+        filters: Optional[Dict[str, FilterValue]] = None,
+        **kwargs: Any,
+    ):
+        self._index = index
+        self._similarity_top_k = similarity_top_k
+        self._filters = filters
+        super().__init__(**kwargs)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        hits = self._index.search(query_bundle.query_str, self._filters, self._similarity_top_k)
+        return [NodeWithScore(node=self._index.to_node(record), score=score) for record, score in hits]
+
+
+if __name__ == "__main__":
+    import time
+
+    # 1. 从 metadata.json 构建（第二次运行直接加载持久化的向量）
+    start = time.perf_counter()
+    index = ImageIndex.from_metadata_file("../../data/多模态/metadata.json")
+    print(f"加载/构建索引: {len(index.records)} 张图片, {time.perf_counter() - start:.3f}s")
+    print(f"第一章的角色: {[c for c in index.bitmaps.values('characters') if index.bitmaps.count({'game_chapter': '第一章', 'characters': c})]}")
+
+    # 2. 带过滤的查询
+    for query, filters in [
+        ("与妖怪的BOSS战", {"game_chapter": "第一章", "characters": "狮妖"}),
+        ("金箍棒的技能特效", {"game_chapter": ["第一章", "第二章"]}),
+        ("夜晚的战斗", None),
+    ]:
+        print(f"\n查询: {query}  过滤: {filters}")
+        for record, score in index.search(query, filters=filters, top_k=3):
+            print(f"  {score:.3f} {record['image_id']} {record['title']} "
+                  f"({record['game_chapter']}, {'、'.join(record['characters'])})")
+
+    # 3. 作为 llama_index 检索器使用
+    retriever = ImageRetriever(index, similarity_top_k=2, filters={"environment": "山地"})
+    for node in retriever.retrieve("灵猴变身"):
+        print(f"\nImageRetriever: {node.node.metadata['title']} {node.node.image_path} {node.score:.3f}")
+
+    # 4. 规模测试：把记录复制到 20 万条，对比过滤后的查询与全量打分
+    rng = np.random.default_rng(0)
+    n = 200_000
+    picks = rng.integers(0, len(index.records), size=n)
+    big_records = [dict(index.records[i], image_id=f"{index.records[i]['image_id']}_{k}")
+                   for k, i in enumerate(picks)]
+    noise = rng.normal(scale=0.05, size=(n, index.text_embeddings.shape[1])).astype(np.float32)
+    start = time.perf_counter()
+    big = ImageIndex(big_records, index.text_embeddings[picks] + noise, embed_model=index.embed_model)
+    print(f"\n{n} 条记录建位图索引: {time.perf_counter() - start:.2f}s")
+    filters = {"game_chapter": "第一章", "characters": "狮妖"}
+    for label, f in [("全量打分", None), ("位图过滤", filters)]:
+        start = time.perf_counter()
+        for _ in range(20):
+            hits = big.search("与妖怪的BOSS战", filters=f, top_k=5)
+        print(f"{label}: 候选 {big.bitmaps.count(f) if f else n} 条, "
+              f"{(time.perf_counter() - start) / 20 * 1000:.2f} ms/次")
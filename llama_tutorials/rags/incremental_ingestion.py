@@ -0,0 +1,160 @@
+"""增量摄取：只处理新增/修改的文件，删除已消失文件的节点
+
+持久化目录中包含：
+    - llama_index 的 StorageContext（docstore / index_store / vector_store）
+      docstore 里额外以 "file::<路径>" 为键记录每个文件原始字节的 sha256
+    - manifest.json：文件 -> 该文件产生的 doc_id 列表（内容重复的文件记录 duplicate_of）
+    - changes.jsonl：每次运行追加一行变更清单（新增/修改/删除/未变/重复）
+
+判断是否变化只需读文件字节算哈希，未变化的文件不会被解析、切分或嵌入。
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+from llama_index.core import (
+    SimpleDirectoryReader,
+    StorageContext,
+    VectorStoreIndex,
+    load_index_from_storage,
+)
+from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.node_parser import TokenTextSplitter
+from llama_index.core.schema import TransformComponent
+
+MANIFEST_FNAME = "manifest.json"
+CHANGES_FNAME = "changes.jsonl"
+FILE_HASH_PREFIX = "file::"
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IncrementalIngestion:
+    """基于文件内容哈希的增量摄取器"""
+
+    def __init__(
+        self,
+        persist_dir: str,
+        transformations: Optional[List[TransformComponent]] = None,
+    ):
+        self.persist_dir = persist_dir
+        self.transformations = transformations or [
+            TokenTextSplitter(chunk_size=100, chunk_overlap=20)]
+        self.manifest_path = os.path.join(persist_dir, MANIFEST_FNAME)
+
+        if os.path.exists(self.manifest_path):
+            storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
+            self.index = load_index_from_storage(storage_context)
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest: Dict[str, Dict] = json.load(f)
+        else:
+            self.index = VectorStoreIndex(nodes=[])
+            self.manifest = {}
+
+    @property
+    def docstore(self):
+        return self.index.storage_context.docstore
+
+    @property
+    def version(self) -> str:
+        """由每个文件的内容哈希汇总而成，文件有增删改时才会变化，可用于让下游缓存失效"""
+        h = hashlib.sha256()
+        for path in sorted(self.manifest):
+            h.update(path.encode("utf-8"))
+            h.update((self.docstore.get_document_hash(FILE_HASH_PREFIX + path) or "").encode())
+        return h.hexdigest()
+
+    def sync(self, input_dir: str, required_exts: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """把 input_dir 的当前状态同步到索引，返回本次的变更清单"""
+        current = {}
+        for root, _, files in os.walk(input_dir):
+            for name in files:
+                if name.startswith("."):
+                    continue
+                if required_exts and os.path.splitext(name)[1].lower() not in required_exts:
+                    continue
+                path = os.path.join(root, name)
+                current[path] = file_sha256(path)
+
+        changes = {"added": [], "modified": [], "deleted": [],
+                   "unchanged": [], "duplicates": []}
+
+        # 1. 删除：文件已不存在，或内容已变化（旧节点先删掉）
+        for path in sorted(self.manifest):
+            old_hash = self.docstore.get_document_hash(FILE_HASH_PREFIX + path)
+            if path not in current:
+                changes["deleted"].append(path)
+            elif current[path] != old_hash:
+                changes["modified"].append(path)
+            else:
+                continue
+            self._remove_file(path)
+
+        # 2. 已入库且未变化的文件内容，用于识别内容重复的新文件
+        live_hashes = {
+            self.docstore.get_document_hash(FILE_HASH_PREFIX + path): path
+            for path, entry in self.manifest.items() if entry["doc_ids"]}
+
+        # 3. 新增/修改的文件：解析、切分、嵌入后插入；内容与已入库文件相同则跳过
+        for path in sorted(current):
+            entry = self.manifest.get(path)
+            if entry is not None and entry["doc_ids"]:
+                changes["unchanged"].append(path)
+                continue
+            duplicate_of = live_hashes.get(current[path])
+            if duplicate_of is not None and duplicate_of != path:
+                self.manifest[path] = {"doc_ids": [], "duplicate_of": duplicate_of}
+                self.docstore.set_document_hash(FILE_HASH_PREFIX + path, current[path])
+                changes["duplicates"].append(path)
+                continue
+            if path not in changes["modified"]:
+                changes["added"].append(path)
+            self._ingest_file(path, current[path])
+            live_hashes[current[path]] = path
+
+        self.persist(changes)
+        return changes
+
+    def persist(self, changes: Optional[Dict[str, List[str]]] = None) -> None:
+        os.makedirs(self.persist_dir, exist_ok=True)
+        self.index.storage_context.persist(persist_dir=self.persist_dir)
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        if changes is not None:
+            record = {"time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                      **{key: value for key, value in changes.items() if key != "unchanged"},
+                      "unchanged": len(changes["unchanged"])}
+            with open(os.path.join(self.persist_dir, CHANGES_FNAME), "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _ingest_file(self, path: str, sha256: str) -> None:
+        documents = SimpleDirectoryReader(
+            input_files=[path], filename_as_id=True).load_data()
+        pipeline = IngestionPipeline(transformations=self.transformations)
+        nodes = pipeline.run(documents=documents)
+        self.index.insert_nodes(nodes)
+        self.manifest[path] = {"doc_ids": [doc.doc_id for doc in documents]}
+        self.docstore.set_document_hash(FILE_HASH_PREFIX + path, sha256)
+
+    def _remove_file(self, path: str) -> None:
+        entry = self.manifest.pop(path)
+        for doc_id in entry["doc_ids"]:
+            self.index.delete_ref_doc(doc_id, delete_from_docstore=True)
+        self.docstore.delete_document(FILE_HASH_PREFIX + path, raise_error=False)
+
+
+if __name__ == "__main__":
+    ingestion = IncrementalIngestion("./storage/山西文旅")
+    start = time.perf_counter()
+    changes = ingestion.sync("../../data/山西文旅", required_exts=[".txt", ".pdf"])
+    print(f"同步耗时 {time.perf_counter() - start:.2f}s")
+    for key, paths in changes.items():
+        print(f"{key}: {len(paths)}")
@@ -0,0 +1,182 @@
+"""检索/问答基准：ipcc_eval_qr_dataset.json
+
+数据集只有 queries 和 responses 两部分（id 一一对应），没有单独的语料和标注，
+这里把每条 response 当作一篇语料文档，查询的相关文档就是同 id 的 response。
+
+统计内容：
+    - 摄取：文档/节点/字符吞吐（切分 + 嵌入 + 建索引）
+    - 每个检索器（vector / bm25 / hybrid）：hit-rate@k、MRR@k、recall@k、单条延迟 p50/p95/p99
+    - 端到端问答（确定性 MockLLM）：延迟 p50/p95/p99
+    - 进程峰值 RSS
+结果写成 JSON（含 git commit、参数和版本），便于跨提交比较回归。
+
+用法：
+    python ipcc_benchmark.py                         # 哈希嵌入，完全离线
+    python ipcc_benchmark.py --embed hf              # 本地 HuggingFace 模型（需已下载）
+    python ipcc_benchmark.py --output ./storage/ipcc_benchmark/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+from typing import Dict, List
+
+import numpy as np
+from llama_index.core import Document, Settings, StorageContext, VectorStoreIndex, __version__
+from llama_index.core.llms import MockLLM
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.retrievers import VectorIndexRetriever
+
+from hash_embedding import HashEmbedding
+from hybrid_retriever import BM25Index, BM25Retriever, HybridRetriever
+from numpy_vector_store import NumpyVectorStore
+
+DATASET = "../../data/复杂PDF/ipcc_eval_qr_dataset.json"
+
+
+def percentiles(timings: List[float]) -> Dict[str, float]:
+    ms = np.asarray(timings) * 1000
+    return {f"p{p}_ms": round(float(np.percentile(ms, p)), 3) for p in (50, 95, 99)}
+
+
+def peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 的单位是 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def load_embed_model(name: str, model_name: str):
+    if name == "hash":
+        return HashEmbedding()
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    return HuggingFaceEmbedding(model_name=model_name)
+
+
+def evaluate_retriever(retriever, queries: Dict[str, str], ks: List[int]) -> Dict:
+    """文档级评估：检索到的节点按 ref_doc_id 去重后计算排名"""
+    top = max(ks)
+    hits = {k: [] for k in ks}
+    reciprocal_ranks, timings = [], []
+    for qid, query in queries.items():
+        start = time.perf_counter()
+        results = retriever.retrieve(query)
+        timings.append(time.perf_counter() - start)
+
+        ranked = []
+        for result in results:
+            doc_id = result.node.ref_doc_id
+            if doc_id not in ranked:
+                ranked.append(doc_id)
+        ranked = ranked[:top]
+        rank = ranked.index(qid) + 1 if qid in ranked else None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        for k in ks:
+            hits[k].append(1.0 if rank and rank <= k else 0.0)
+
+    metrics = {"mrr": round(float(np.mean(reciprocal_ranks)), 4)}
+    for k in ks:
+        # 每条查询只有一篇相关文档，recall@k 与 hit-rate@k 数值相同
+        metrics[f"hit_rate@{k}"] = round(float(np.mean(hits[k])), 4)
+        metrics[f"recall@{k}"] = metrics[f"hit_rate@{k}"]
+    metrics["latency"] = percentiles(timings)
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embed", choices=["hash", "hf"], default="hash")
+    parser.add_argument("--embed-model", default="BAAI/bge-small-en-v1.5")
+    parser.add_argument("--chunk-size", type=int, default=128)
+    parser.add_argument("--chunk-overlap", type=int, default=16)
+    parser.add_argument("--ks", default="1,3,5,10")
+    parser.add_argument("--output", default=None,
+                        help="结果 JSON 路径，默认 ./storage/ipcc_benchmark/<时间戳>.json")
+    args = parser.parse_args()
+    ks = [int(k) for k in args.ks.split(",")]
+
+    with open(DATASET, "r", encoding="utf-8") as f:
+        dataset = json.load(f)
+    queries: Dict[str, str] = dataset["queries"]
+    documents = [Document(text=text, id_=qid) for qid, text in dataset["responses"].items()]
+
+    # 1. 确定性的离线模型
+    Settings.llm = MockLLM(max_tokens=64)
+    Settings.embed_model = embed_model = load_embed_model(args.embed, args.embed_model)
+
+    # 2. 摄取：切分 + 嵌入 + 建索引
+    start = time.perf_counter()
+    splitter = SentenceSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    nodes = splitter.get_nodes_from_documents(documents)
+    storage_context = StorageContext.from_defaults(vector_store=NumpyVectorStore())
+    index = VectorStoreIndex(nodes, storage_context=storage_context, embed_model=embed_model)
+    bm25_index = BM25Index()
+    bm25_index.add_nodes(nodes)
+    ingest_seconds = time.perf_counter() - start
+    num_chars = sum(len(doc.text) for doc in documents)
+    ingestion = {
+        "documents": len(documents),
+        "nodes": len(nodes),
+        "seconds": round(ingest_seconds, 3),
+        "docs_per_s": round(len(documents) / ingest_seconds, 2),
+        "nodes_per_s": round(len(nodes) / ingest_seconds, 2),
+        "chars_per_s": round(num_chars / ingest_seconds, 2),
+    }
+    print(f"摄取: {ingestion}")
+
+    # 3. 检索评估
+    top = max(ks)
+    vector_retriever = VectorIndexRetriever(index=index, similarity_top_k=top)
+    bm25_retriever = BM25Retriever(bm25_index, similarity_top_k=top)
+    retrievers = {
+        "vector": vector_retriever,
+        "bm25": bm25_retriever,
+        "hybrid": HybridRetriever([vector_retriever, bm25_retriever], similarity_top_k=top),
+    }
+    retrieval = {}
+    for name, retriever in retrievers.items():
+        retrieval[name] = evaluate_retriever(retriever, queries, ks)
+        print(f"{name}: {retrieval[name]}")
+
+    # 4. 端到端问答（MockLLM，测的是检索 + 合成框架本身的开销）
+    qe = RetrieverQueryEngine.from_args(retrievers["hybrid"])
+    timings = []
+    for query in queries.values():
+        start = time.perf_counter()
+        qe.query(query)
+        timings.append(time.perf_counter() - start)
+    qa = {"queries": len(timings), "latency": percentiles(timings)}
+    print(f"问答: {qa}")
+
+    results = {
+        "benchmark": "ipcc_eval_qr_dataset",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "config": vars(args),
+        "environment": {"python": platform.python_version(), "llama_index": __version__,
+                        "numpy": np.__version__, "machine": platform.machine()},
+        "ingestion": ingestion,
+        "retrieval": retrieval,
+        "qa": qa,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    output = args.output or os.path.join(
+        "./storage/ipcc_benchmark", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"峰值 RSS: {results['peak_rss_mb']} MB, 结果已写入 {output}")
+
+
+if __name__ == "__main__":
+    main()
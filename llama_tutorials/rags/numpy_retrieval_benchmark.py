@@ -0,0 +1,70 @@
+"""NumpyVectorStore 与默认 SimpleVectorStore 的检索延迟对比（随机向量）
+
+用法：
+    python numpy_retrieval_benchmark.py                  # 100k 个 512 维向量
+    python numpy_retrieval_benchmark.py --n 20000 --skip-baseline
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from numpy_vector_store import NumpyVectorStore
+
+
+def time_queries(store, queries: np.ndarray, top_k: int) -> list:
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        store.query(VectorStoreQuery(query_embedding=q.tolist(), similarity_top_k=top_k))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.n, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((max(args.queries, args.batch), args.dim), dtype=np.float32)
+    nodes = [TextNode(id_=str(i), text=f"chunk {i}", embedding=vectors[i].tolist())
+             for i in range(args.n)]
+    print(f"{args.n} 个 {args.dim} 维向量, top_k={args.top_k}")
+
+    numpy_store = NumpyVectorStore()
+    numpy_store.add(nodes)
+    timings = time_queries(numpy_store, queries[:args.queries], args.top_k)
+    print(f"NumpyVectorStore 单条查询: p50 {statistics.median(timings) * 1000:.2f} ms")
+
+    start = time.perf_counter()
+    numpy_store.batch_query(queries[:args.batch], args.top_k)
+    batch_ms = (time.perf_counter() - start) * 1000
+    print(f"NumpyVectorStore 批量 {args.batch} 条: {batch_ms:.2f} ms "
+          f"(均摊 {batch_ms / args.batch:.2f} ms/条)")
+
+    if not args.skip_baseline:
+        simple_store = SimpleVectorStore()
+        simple_store.add(nodes)
+        baseline = time_queries(simple_store, queries[:min(args.queries, 5)], args.top_k)
+        print(f"SimpleVectorStore 单条查询: p50 {statistics.median(baseline) * 1000:.2f} ms")
+
+        # 两种实现的 top-k 结果应一致
+        q = queries[0].tolist()
+        expected = simple_store.query(VectorStoreQuery(query_embedding=q, similarity_top_k=args.top_k)).ids
+        actual = numpy_store.query(VectorStoreQuery(query_embedding=q, similarity_top_k=args.top_k)).ids
+        print(f"top-k 一致: {expected == actual}")
+
+
+if __name__ == "__main__":
+    main()
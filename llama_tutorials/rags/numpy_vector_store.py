@@ -0,0 +1,188 @@
+"""NumPy 向量化检索后端
+
+所有向量归一化后存放在一块连续的 float32 矩阵里（按容量倍增预分配）：
+    - 单条查询：一次矩阵-向量乘得到全部余弦相似度，argpartition 选 top-k
+    - 批量查询：一次矩阵-矩阵乘，逐行 argpartition
+可直接作为 VectorStoreIndex 的 vector_store，挂在 VectorIndexRetriever 后面使用。
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+
+def top_k_rows(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """对二维分数矩阵逐行取 top-k，返回按分数降序排列的列下标"""
+    top_k = min(top_k, scores.shape[1])
+    if top_k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if top_k < scores.shape[1]:
+        part = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    else:
+        part = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """连续矩阵 + 矩阵乘的精确向量检索"""
+
+    stores_text: bool = True
+
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+    _size: int = PrivateAttr(default=0)
+    _nodes: List[BaseNode] = PrivateAttr(default_factory=list)
+    _node_ids: List[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: List[str] = PrivateAttr(default_factory=list)
+    _id_to_row: Dict[str, int] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """当前有效的归一化向量矩阵（视图，不拷贝）"""
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        """已有的 node_id 原地覆盖（同一批里重复出现时以最后一个为准），新的追加到末尾"""
+        if not nodes:
+            return []
+        vectors = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        new_ids = {node.node_id for node in nodes if node.node_id not in self._id_to_row}
+        self._reserve(self._size + len(new_ids), vectors.shape[1])
+
+        last: Dict[int, int] = {}  # 矩阵行 -> nodes 下标
+        for i, node in enumerate(nodes):
+            stored = node.model_copy()
+            stored.embedding = None
+            row = self._id_to_row.get(node.node_id)
+            if row is None:
+                row = self._id_to_row[node.node_id] = self._size
+                self._size += 1
+                self._nodes.append(stored)
+                self._node_ids.append(node.node_id)
+                self._ref_doc_ids.append(node.ref_doc_id or "None")
+            else:
+                self._nodes[row] = stored
+                self._ref_doc_ids[row] = node.ref_doc_id or "None"
+            last[row] = i
+        self._matrix[list(last)] = vectors[list(last.values())]
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        keep = [i for i, doc_id in enumerate(self._ref_doc_ids) if doc_id != ref_doc_id]
+        self._compact(keep)
+
+    def delete_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[Any] = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        if filters is not None:
+            raise NotImplementedError("NumpyVectorStore 不支持元数据过滤")
+        if node_ids is None:
+            self.clear()
+            return
+        drop = set(node_ids)
+        self._compact([i for i, node_id in enumerate(self._node_ids) if node_id not in drop])
+
+    def clear(self) -> None:
+        self._compact([])
+
+    def get_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[Any] = None,
+    ) -> List[BaseNode]:
+        if filters is not None:
+            raise NotImplementedError("NumpyVectorStore 不支持元数据过滤")
+        if node_ids is None:
+            return list(self._nodes)
+        return [self._nodes[self._id_to_row[node_id]]
+                for node_id in node_ids if node_id in self._id_to_row]
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            raise NotImplementedError("NumpyVectorStore 不支持元数据过滤")
+        # as_retriever() 对存文本的向量存储会传入空列表，按"不限制"处理
+        rows = None
+        if query.node_ids:
+            rows = np.array([self._id_to_row[node_id] for node_id in query.node_ids
+                             if node_id in self._id_to_row], dtype=np.int64)
+        return self._search(np.asarray([query.query_embedding], dtype=np.float32),
+                            query.similarity_top_k, rows)[0]
+
+    def batch_query(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        similarity_top_k: int,
+    ) -> List[VectorStoreQueryResult]:
+        """多条查询一次矩阵-矩阵乘完成"""
+        return self._search(np.asarray(query_embeddings, dtype=np.float32), similarity_top_k)
+
+    def _search(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[VectorStoreQueryResult]:
+        if self._size == 0 or (rows is not None and rows.size == 0):
+            return [VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+                    for _ in range(queries.shape[0])]
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        matrix = self.embeddings if rows is None else self.embeddings[rows]
+        if queries.shape[0] == 1:
+            scores = (matrix @ queries[0])[None, :]
+        else:
+            scores = queries @ matrix.T
+        top = top_k_rows(scores, top_k)
+
+        results = []
+        for q in range(queries.shape[0]):
+            hit_rows = top[q] if rows is None else rows[top[q]]
+            results.append(VectorStoreQueryResult(
+                nodes=[self._nodes[i] for i in hit_rows],
+                similarities=scores[q, top[q]].tolist(),
+                ids=[self._node_ids[i] for i in hit_rows],
+            ))
+        return results
+
+    def _reserve(self, capacity: int, dim: int) -> None:
+        """容量不够时按倍数扩容，避免每次 add 都重新分配整块矩阵"""
+        if self._matrix is None:
+            self._matrix = np.empty((max(capacity, 1024), dim), dtype=np.float32)
+            return
+        if self._matrix.shape[1] != dim:
+            raise ValueError(f"向量维度不一致: {dim} != {self._matrix.shape[1]}")
+        if capacity > self._matrix.shape[0]:
+            grown = np.empty((max(capacity, self._matrix.shape[0] * 2), dim), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+
+    def _compact(self, keep: List[int]) -> None:
+        if len(keep) == self._size:
+            return
+        if self._matrix is not None:
+            self._matrix[:len(keep)] = self._matrix[keep]
+        self._nodes = [self._nodes[i] for i in keep]
+        self._node_ids = [self._node_ids[i] for i in keep]
+        self._ref_doc_ids = [self._ref_doc_ids[i] for i in keep]
+        self._id_to_row = {node_id: row for row, node_id in enumerate(self._node_ids)}
+        self._size = len(keep)
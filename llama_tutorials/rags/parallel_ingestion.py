@@ -0,0 +1,103 @@
+"""多进程并行摄取：解析+切分分散到进程池，嵌入在主进程批量完成
+
+- 每个文件是一个任务，按文件大小从大到小提交，避免大 PDF 最后才开始拖慢整体
+- 结果按文件路径排序后拼接，节点 id 由 (doc_id, 序号) 生成，输出与并行度无关、可复现
+- 嵌入模型只在主进程加载一次，按 embed_batch_size 批量调用
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from llama_index.core import Settings, SimpleDirectoryReader
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.node_parser import TokenTextSplitter
+from llama_index.core.schema import BaseNode, MetadataMode
+
+
+def deterministic_id_func(i: int, doc: BaseNode) -> str:
+    """用文档 id 和切块序号生成节点 id，代替默认的随机 uuid"""
+    return f"{doc.doc_id}#{i}"
+
+
+def parse_and_split(path: str, chunk_size: int = 100, chunk_overlap: int = 20) -> List[BaseNode]:
+    """子进程任务：解析单个文件并切分成节点"""
+    documents = SimpleDirectoryReader(
+        input_files=[path], filename_as_id=True).load_data()
+    splitter = TokenTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+        id_func=deterministic_id_func)
+    return splitter.get_nodes_from_documents(documents)
+
+
+def list_files(input_dir: str, required_exts: Optional[List[str]] = None) -> List[str]:
+    files = []
+    for root, _, names in os.walk(input_dir):
+        for name in names:
+            if name.startswith("."):
+                continue
+            if required_exts and os.path.splitext(name)[1].lower() not in required_exts:
+                continue
+            files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def parallel_parse_and_split(
+    files: List[str],
+    num_workers: int = os.cpu_count() or 1,
+    chunk_size: int = 100,
+    chunk_overlap: int = 20,
+) -> List[BaseNode]:
+    """并行解析+切分，返回按文件路径顺序排列的节点"""
+    if num_workers <= 1:
+        results = [parse_and_split(path, chunk_size, chunk_overlap) for path in files]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            # 大文件先提交，收集时仍按原顺序
+            by_size = sorted(files, key=os.path.getsize, reverse=True)
+            futures = {path: executor.submit(parse_and_split, path, chunk_size, chunk_overlap)
+                       for path in by_size}
+            results = [futures[path].result() for path in files]
+    return [node for nodes in results for node in nodes]
+
+
+def embed_nodes(
+    nodes: List[BaseNode],
+    embed_model: Optional[BaseEmbedding] = None,
+    embed_batch_size: int = 64,
+) -> List[BaseNode]:
+    """在主进程中批量嵌入"""
+    embed_model = embed_model or Settings.embed_model
+    for start in range(0, len(nodes), embed_batch_size):
+        batch = nodes[start:start + embed_batch_size]
+        embeddings = embed_model.get_text_embedding_batch(
+            [node.get_content(metadata_mode=MetadataMode.EMBED) for node in batch])
+        for node, embedding in zip(batch, embeddings):
+            node.embedding = embedding
+    return nodes
+
+
+def parallel_ingest(
+    input_dir: str,
+    num_workers: int = os.cpu_count() or 1,
+    required_exts: Optional[List[str]] = None,
+    embed_model: Optional[BaseEmbedding] = None,
+    embed_batch_size: int = 64,
+    chunk_size: int = 100,
+    chunk_overlap: int = 20,
+) -> List[BaseNode]:
+    files = list_files(input_dir, required_exts)
+    nodes = parallel_parse_and_split(files, num_workers, chunk_size, chunk_overlap)
+    return embed_nodes(nodes, embed_model, embed_batch_size)
+
+
+if __name__ == "__main__":
+    from llama_index.core import VectorStoreIndex
+
+    start = time.perf_counter()
+    nodes = parallel_ingest("../../data/山西文旅", num_workers=4,
+                            required_exts=[".pdf", ".txt"])
+    print(f"共 {len(nodes)} 个节点, 耗时 {time.perf_counter() - start:.2f}s")
+
+    index = VectorStoreIndex(nodes)
+    print(index.as_query_engine().query("平遥古城有什么特色？"))
@@ -0,0 +1,50 @@
+"""并行摄取的扩展性测试：1..N 个进程解析+切分 data/山西文旅 的墙钟耗时
+
+用法：
+    python parallel_ingestion_benchmark.py
+    python parallel_ingestion_benchmark.py --max-workers 8 --repeat 3
+"""
+import argparse
+import os
+import statistics
+import time
+
+from parallel_ingestion import list_files, parallel_parse_and_split
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input-dir", default="../../data/山西文旅")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    files = list_files(args.input_dir, required_exts=[".pdf", ".txt"])
+    total_mb = sum(os.path.getsize(path) for path in files) / 1024 / 1024
+    print(f"{len(files)} 个文件, 共 {total_mb:.1f} MB")
+
+    worker_counts = sorted({1, *[2 ** i for i in range(1, args.max_workers.bit_length())],
+                            args.max_workers})
+    baseline = None
+    reference = None
+    print(f"{'workers':>8} {'seconds':>10} {'speedup':>8} {'nodes':>8}")
+    for num_workers in worker_counts:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            nodes = parallel_parse_and_split(files, num_workers)
+            timings.append(time.perf_counter() - start)
+        elapsed = statistics.median(timings)
+        baseline = baseline or elapsed
+
+        # 并行结果必须与单进程完全一致（顺序、id、文本）
+        signature = [(node.node_id, node.get_content()) for node in nodes]
+        if reference is None:
+            reference = signature
+        elif signature != reference:
+            raise RuntimeError(f"{num_workers} 个进程的输出与单进程不一致")
+        print(f"{num_workers:>8} {elapsed:>10.2f} {baseline / elapsed:>7.2f}x {len(nodes):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""把 data/sakila 的 MySQL DDL 转成本地 SQLite 库，并填充确定性的合成数据
+
+- parse_table：从 CREATE TABLE 语句解析列、主键、唯一/普通索引和外键
+- to_sqlite_ddl：类型映射（整数 -> INTEGER，decimal -> NUMERIC，字符/enum/set/日期 -> TEXT，
+  blob/geometry -> BLOB），单列自增主键写成 INTEGER PRIMARY KEY；
+  ON UPDATE CURRENT_TIMESTAMP 这类 MySQL 专有写法直接去掉
+- 视图使用 group_concat ... separator、concat 等 MySQL 函数，这里不建，只有基本表
+- 合成数据：行数与官方 Sakila 相当（scale 可缩放），单列主键都是 1..N，
+  外键在父表 1..N 中随机取值，所以不需要按依赖顺序生成
+- 外键约束不开启（PRAGMA foreign_keys 默认关闭），与 q2sql_pairs.json 里直接
+  DELETE 父表行的写法保持一致
+- connect() 注册 MySQL 的 NOW()，值在连接时冻结，同一连接里多次执行结果一致
+
+用法：
+    db_path = build_sakila_db()
+    conn = connect(db_path)
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+DDL_PATH = "../../data/sakila/ddl_statements.yaml"
+DB_PATH = "./storage/sakila.db"
+
+# 官方 Sakila 的行数
+ROW_COUNTS = {
+    "actor": 200, "country": 109, "city": 600, "address": 603, "category": 16, "language": 6,
+    "film": 1000, "film_actor": 5462, "film_category": 1000, "film_text": 1000, "staff": 6,
+    "store": 3, "customer": 599, "inventory": 4581, "rental": 16044, "payment": 16049,
+}
+# 参考表不随 scale 缩放
+FIXED_TABLES = {"category", "language", "staff", "store"}
+CATEGORY_NAMES = ["Action", "Animation", "Children", "Classics", "Comedy", "Documentary", "Drama",
+                  "Family", "Foreign", "Games", "Horror", "Music", "New", "Sci-Fi", "Sports", "Travel"]
+LANGUAGE_NAMES = ["English", "Italian", "Japanese", "Mandarin", "French", "German"]
+FIRST_NAMES = ["MARY", "PATRICIA", "LINDA", "BARBARA", "JOHN", "ROBERT", "MICHAEL", "WILLIAM",
+               "DAVID", "RICHARD", "PENELOPE", "NICK", "ED", "JENNIFER", "JOHNNY", "BETTE"]
+LAST_NAMES = ["SMITH", "JOHNSON", "WILLIAMS", "JONES", "BROWN", "DAVIS", "GUINESS", "WAHLBERG",
+              "CHASE", "DAVIS", "LOLLOBRIGIDA", "NICHOLSON", "MOSTEL", "JOHANSSON", "SWANK"]
+WORDS = ["ACADEMY", "DINOSAUR", "ACE", "GOLDFINGER", "ADAPTATION", "HOLES", "AFFAIR", "PREJUDICE",
+         "AGENT", "TRUMAN", "AIRPLANE", "SIERRA", "ALABAMA", "DEVIL", "ALADDIN", "CALENDAR"]
+BASE_TIME = datetime(2005, 5, 24, 22, 0, 0)
+
+_COLUMN_RE = re.compile(r"^`(\w+)`\s+(\w+)(\([^)]*\))?(.*)$")
+_KEY_RE = re.compile(r"^(UNIQUE |FULLTEXT |SPATIAL )?KEY `(\w+)` \(([^)]*)\)")
+_PK_RE = re.compile(r"^PRIMARY KEY \(([^)]*)\)")
+_FK_RE = re.compile(r"^CONSTRAINT `\w+` FOREIGN KEY \(([^)]*)\) REFERENCES `(\w+)` \(([^)]*)\)(.*)$")
+_DEFAULT_RE = re.compile(r"DEFAULT ('(?:[^']|'')*'|NULL|CURRENT_TIMESTAMP|-?[\d.]+)")
+_INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint", "year"}
+
+
+@dataclass
+class Column:
+    name: str
+    mysql_type: str
+    args: str = ""
+    not_null: bool = False
+    default: Optional[str] = None
+    auto_increment: bool = False
+
+    @property
+    def sqlite_type(self) -> str:
+        if self.mysql_type in _INTEGER_TYPES:
+            return "INTEGER"
+        if self.mysql_type == "decimal":
+            return "NUMERIC"
+        if self.mysql_type in ("blob", "geometry"):
+            return "BLOB"
+        return "TEXT"
+
+    @property
+    def enum_values(self) -> List[str]:
+        return re.findall(r"'([^']*)'", self.args) if self.mysql_type in ("enum", "set") else []
+
+    @property
+    def auto_timestamp(self) -> bool:
+        """由数据库自动写入当前时间的列（如 last_update），比较执行结果时应忽略"""
+        return self.default == "CURRENT_TIMESTAMP"
+
+
+@dataclass
+class TableSchema:
+    name: str
+    columns: List[Column] = field(default_factory=list)
+    primary_key: List[str] = field(default_factory=list)
+    # (列, 被引用表, 被引用列, ON DELETE/UPDATE 子句)
+    foreign_keys: List[Tuple[List[str], str, List[str], str]] = field(default_factory=list)
+    # (索引名, 列, 是否唯一)
+    indexes: List[Tuple[str, List[str], bool]] = field(default_factory=list)
+    ddl: str = ""
+
+    def column(self, name: str) -> Column:
+        return next(c for c in self.columns if c.name == name)
+
+    @property
+    def referenced_tables(self) -> List[str]:
+        return sorted({ref for _, ref, _, _ in self.foreign_keys})
+
+
+def _names(text: str) -> List[str]:
+    return [name.strip().strip("`") for name in text.split(",")]
+
+
+def parse_table(ddl: str) -> TableSchema:
+    name = re.search(r"CREATE TABLE `(\w+)`", ddl).group(1)
+    table = TableSchema(name=name, ddl=ddl)
+    body = ddl[ddl.index("(") + 1:ddl.rindex(")")]
+    for line in body.split("\n"):
+        line = line.strip().rstrip(",")
+        if not line:
+            continue
+        if line.startswith("`"):
+            match = _COLUMN_RE.match(line)
+            rest = match.group(4)
+            default = _DEFAULT_RE.search(rest)
+            table.columns.append(Column(
+                name=match.group(1),
+                mysql_type=match.group(2).lower(),
+                args=match.group(3) or "",
+                not_null="NOT NULL" in rest,
+                default=None if default is None or default.group(1) == "NULL" else default.group(1),
+                auto_increment="AUTO_INCREMENT" in rest,
+            ))
+        elif _PK_RE.match(line):
+            table.primary_key = _names(_PK_RE.match(line).group(1))
+        elif _FK_RE.match(line):
+            match = _FK_RE.match(line)
+            table.foreign_keys.append((_names(match.group(1)), match.group(2),
+                                       _names(match.group(3)), match.group(4).strip()))
+        elif _KEY_RE.match(line):
+            match = _KEY_RE.match(line)
+            kind = (match.group(1) or "").strip()
+            if kind in ("FULLTEXT", "SPATIAL"):
+                continue
+            table.indexes.append((match.group(2), _names(match.group(3)), kind == "UNIQUE"))
+    return table
+
+
+def load_schemas(ddl_path: str = DDL_PATH) -> Dict[str, TableSchema]:
+    """只返回基本表；视图依赖 MySQL 专有函数，不在 SQLite 中创建"""
+    with open(ddl_path, "r", encoding="utf-8") as f:
+        statements = yaml.safe_load(f)
+    return {name: parse_table(ddl) for name, ddl in statements.items()
+            if ddl.lstrip().startswith("CREATE TABLE")}
+
+
+def to_sqlite_ddl(table: TableSchema) -> List[str]:
+    rowid_pk = (len(table.primary_key) == 1
+                and table.column(table.primary_key[0]).sqlite_type == "INTEGER")
+    lines = []
+    for column in table.columns:
+        if rowid_pk and column.name == table.primary_key[0]:
+            lines.append(f"  {column.name} INTEGER PRIMARY KEY")
+            continue
+        line = f"  {column.name} {column.sqlite_type}"
+        if column.not_null:
+            line += " NOT NULL"
+        if column.default is not None:
+            line += f" DEFAULT {column.default}"
+        lines.append(line)
+    if table.primary_key and not rowid_pk:
+        lines.append(f"  PRIMARY KEY ({', '.join(table.primary_key)})")
+    for columns, ref_table, ref_columns, actions in table.foreign_keys:
+        lines.append(f"  FOREIGN KEY ({', '.join(columns)}) REFERENCES {ref_table} "
+                     f"({', '.join(ref_columns)}) {actions}".rstrip())
+    statements = [f"CREATE TABLE {table.name} (\n" + ",\n".join(lines) + "\n)"]
+    for index_name, columns, unique in table.indexes:
+        # SQLite 的索引名是库级命名空间，加表名前缀避免重名
+        statements.append(f"CREATE {'UNIQUE ' if unique else ''}INDEX {table.name}_{index_name} "
+                          f"ON {table.name} ({', '.join(columns)})")
+    return statements
+
+
+def _fk_map(table: TableSchema) -> Dict[str, str]:
+    return {columns[0]: ref for columns, ref, _, _ in table.foreign_keys if len(columns) == 1}
+
+
+def _value(table: TableSchema, column: Column, row: int, fks: Dict[str, str],
+           counts: Dict[str, int], rng: random.Random):
+    if column.name in table.primary_key and len(table.primary_key) == 1:
+        return row
+    if column.name in fks:
+        if not column.not_null and rng.random() < 0.05:
+            return None
+        return rng.randint(1, counts[fks[column.name]])
+    if column.auto_timestamp:
+        return "2006-02-15 04:34:33"
+    if column.enum_values:
+        if column.mysql_type == "set":
+            return ",".join(v for v in column.enum_values if rng.random() < 0.4) or column.enum_values[0]
+        return rng.choice(column.enum_values)
+    name, kind = column.name, column.mysql_type
+    if kind in ("blob", "geometry"):
+        return b""
+    if kind == "year":
+        return 2006
+    if kind in ("datetime", "timestamp", "date"):
+        # 行号决定时间，保证 rental 的 (rental_date, inventory_id, customer_id) 唯一
+        moment = BASE_TIME + timedelta(minutes=37 * row + rng.randint(0, 30))
+        return moment.strftime("%Y-%m-%d %H:%M:%S")
+    if kind == "decimal":
+        return round(rng.choice([0.99, 2.99, 4.99, 9.99, 14.99, 19.99, 24.99]), 2)
+    if kind in _INTEGER_TYPES:
+        if name == "active":
+            return int(rng.random() < 0.97)
+        if name == "length":
+            return rng.randint(46, 185)
+        return rng.randint(1, 10)
+    if name == "first_name":
+        return rng.choice(FIRST_NAMES)
+    if name == "last_name":
+        return rng.choice(LAST_NAMES)
+    if name == "title":
+        return f"{rng.choice(WORDS)} {rng.choice(WORDS)}"
+    if name == "email":
+        return f"user{row}@sakilacustomer.org"
+    if name == "phone":
+        return f"{rng.randint(10**10, 10**11 - 1)}"
+    if name == "description":
+        return f"A {rng.choice(['Epic', 'Astounding', 'Fateful', 'Boring'])} Drama of a " \
+               f"{rng.choice(['Dog', 'Robot', 'Car', 'Woman'])} who must find a {rng.choice(WORDS).title()}"
+    return f"{name.upper()}_{row}"
+
+
+def generate_rows(table: TableSchema, counts: Dict[str, int], rng: random.Random) -> List[Tuple]:
+    n = counts[table.name]
+    if table.name == "category":
+        return [(i + 1, name, "2006-02-15 04:46:27") for i, name in enumerate(CATEGORY_NAMES)]
+    if table.name == "language":
+        return [(i + 1, name, "2006-02-15 05:02:19") for i, name in enumerate(LANGUAGE_NAMES)]
+    if table.name == "store":
+        # 店长取 1、3、5 号员工：gold SQL 里的 INSERT/UPDATE 不会违反 idx_unique_manager
+        return [(i, 2 * i - 1, rng.randint(1, counts["address"]), "2006-02-15 04:57:12")
+                for i in range(1, n + 1)]
+
+    fks = _fk_map(table)
+    rows = []
+    if len(table.primary_key) > 1:
+        # 复合主键（film_actor / film_category）：每行的主键组合不重复
+        seen = set()
+        while len(rows) < n:
+            row = tuple(_value(table, c, len(rows) + 1, fks, counts, rng) for c in table.columns)
+            key = tuple(row[i] for i, c in enumerate(table.columns) if c.name in table.primary_key)
+            if key not in seen:
+                seen.add(key)
+                rows.append(row)
+        return rows
+    for i in range(1, n + 1):
+        rows.append(tuple(_value(table, c, i, fks, counts, rng) for c in table.columns))
+    return rows
+
+
+def build_sakila_db(
+    db_path: str = DB_PATH,
+    ddl_path: str = DDL_PATH,
+    scale: float = 1.0,
+    seed: int = 0,
+) -> str:
+    """DDL、scale、seed 都没变时直接复用已有的库文件"""
+    with open(ddl_path, "rb") as f:
+        fingerprint = json.dumps({"ddl_sha256": hashlib.sha256(f.read()).hexdigest(),
+                                  "scale": scale, "seed": seed})
+    if os.path.exists(db_path):
+        with sqlite3.connect(db_path) as conn:
+            try:
+                stored = conn.execute("SELECT value FROM _build_meta WHERE key = 'fingerprint'").fetchone()
+            except sqlite3.OperationalError:
+                stored = None
+        if stored and stored[0] == fingerprint:
+            return db_path
+
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    tmp_path = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    schemas = load_schemas(ddl_path)
+    counts = {name: n if name in FIXED_TABLES else max(1, int(n * scale))
+              for name, n in ROW_COUNTS.items()}
+    rng = random.Random(seed)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        for table in schemas.values():
+            for statement in to_sqlite_ddl(table):
+                conn.execute(statement)
+            rows = generate_rows(table, counts, rng)
+            placeholders = ", ".join("?" * len(table.columns))
+            conn.executemany(f"INSERT INTO {table.name} VALUES ({placeholders})", rows)
+        conn.execute("CREATE TABLE _build_meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("INSERT INTO _build_meta VALUES ('fingerprint', ?)", (fingerprint,))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return db_path
+
+
+def connect(db_path: str = DB_PATH, check_same_thread: bool = True) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.create_function("NOW", 0, lambda: now, deterministic=True)
+    return conn
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    path = build_sakila_db()
+    print(f"构建 {path}: {time.perf_counter() - start:.2f}s, {os.path.getsize(path) / 2**20:.1f} MB")
+    conn = connect(path)
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                "AND name NOT LIKE '\\_%' ESCAPE '\\' ORDER BY name"):
+        print(f"  {name}: {conn.execute(f'SELECT COUNT(*) FROM {name}').fetchone()[0]} 行")
+    print(conn.execute("SELECT rental_id, rental_date, customer_id FROM rental "
+                       "ORDER BY rental_date DESC LIMIT 3").fetchall())
@@ -0,0 +1,210 @@
+"""查询结果的语义缓存：包在任意 query engine 外面
+
+查找顺序：
+    1. 归一化文本精确命中（NFKC、小写、去空白和标点）
+    2. 查询向量与已缓存查询的余弦相似度 >= similarity_threshold 视为近似重复
+    3. 未命中才调用被包装的 query engine（检索 + 合成）；缓存和检索器用的是同一个嵌入模型时，
+       把已算好的查询向量（未归一化的原始向量）传给检索器复用，否则原样传 QueryBundle
+
+条目有 TTL，超过 max_entries 时按 LRU 淘汰；index_version 变化时整个缓存失效。
+命中时直接返回缓存的 Response，不做任何检索和合成。
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from copy import copy
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.response.schema import RESPONSE_TYPE, Response
+from llama_index.core.schema import QueryBundle
+
+_STRIP_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize_query(text: str) -> str:
+    return _STRIP_RE.sub("", unicodedata.normalize("NFKC", text).lower())
+
+
+def _retriever_embed_models(retriever) -> Iterator[BaseEmbedding]:
+    """检索器（及其组合的子检索器，如 HybridRetriever）用的嵌入模型"""
+    if retriever is None:
+        return
+    model = getattr(retriever, "_embed_model", None)
+    if model is not None:
+        yield model
+    for child in getattr(retriever, "_retrievers", None) or []:
+        yield from _retriever_embed_models(child)
+
+
+@dataclass
+class CacheEntry:
+    response: RESPONSE_TYPE
+    embedding: Optional[np.ndarray]
+    created: float
+
+
+class SemanticCacheQueryEngine(BaseQueryEngine):
+    """带精确/近似命中、TTL、LRU 和版本失效的查询缓存"""
+
+    def __init__(
+        self,
+        query_engine: BaseQueryEngine,
+        embed_model: Optional[BaseEmbedding] = None,
+        similarity_threshold: float = 0.95,
+        ttl: Optional[float] = 3600,
+        max_entries: int = 1000,
+        index_version: Optional[Callable[[], str]] = None,
+        reuse_embedding: Optional[bool] = None,
+    ):
+        """reuse_embedding：None 时检查被包装引擎的检索器，嵌入模型就是 embed_model 这个对象才复用查询向量；
+        检索器认不出来（如自定义检索器）但确定是同一个模型时传 True"""
+        self._query_engine = query_engine
+        self._embed_model = embed_model or Settings.embed_model
+        if reuse_embedding is None:
+            models = list(_retriever_embed_models(getattr(query_engine, "retriever", None)))
+            reuse_embedding = bool(models) and all(model is self._embed_model for model in models)
+        self.reuse_embedding = reuse_embedding
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._index_version = index_version
+        self._version = index_version() if index_version else None
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: list = []
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+        super().__init__(callback_manager=query_engine.callback_manager)
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        total = sum(self._stats.values())
+        hits = self._stats["exact_hits"] + self._stats["semantic_hits"]
+        return {**self._stats, "hit_ratio": hits / total if total else 0.0}
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def _get_prompt_modules(self):
+        return {"query_engine": self._query_engine}
+
+    def _query(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        key = normalize_query(query_bundle.query_str)
+        hit = self._lookup_exact(key)
+        if hit is not None:
+            return hit
+        raw = self._query_embedding(query_bundle)
+        embedding = self._normalize(raw)
+        hit = self._lookup_semantic(embedding)
+        if hit is not None:
+            return hit
+        response = self._query_engine.query(self._with_embedding(query_bundle, raw))
+        self._store(key, response, embedding)
+        return response
+
+    async def _aquery(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        key = normalize_query(query_bundle.query_str)
+        hit = self._lookup_exact(key)
+        if hit is not None:
+            return hit
+        raw = await self._aquery_embedding(query_bundle)
+        embedding = self._normalize(raw)
+        hit = self._lookup_semantic(embedding)
+        if hit is not None:
+            return hit
+        response = await self._query_engine.aquery(self._with_embedding(query_bundle, raw))
+        self._store(key, response, embedding)
+        return response
+
+    def _query_embedding(self, query_bundle: QueryBundle) -> List[float]:
+        if query_bundle.embedding is not None:
+            return query_bundle.embedding
+        return self._embed_model.get_agg_embedding_from_queries(query_bundle.embedding_strs)
+
+    async def _aquery_embedding(self, query_bundle: QueryBundle) -> List[float]:
+        if query_bundle.embedding is not None:
+            return query_bundle.embedding
+        return await self._embed_model.aget_agg_embedding_from_queries(query_bundle.embedding_strs)
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _with_embedding(self, query_bundle: QueryBundle, embedding: List[float]) -> QueryBundle:
+        # 检索器发现 embedding 已存在就不会再调用嵌入模型；模型不同时复用会用错向量，原样传下去
+        if query_bundle.embedding is not None or not self.reuse_embedding:
+            return query_bundle
+        bundle = copy(query_bundle)
+        bundle.embedding = list(embedding)
+        return bundle
+
+    def _check_version(self) -> None:
+        if self._index_version is None:
+            return
+        version = self._index_version()
+        if version != self._version:
+            self._version = version
+            self._entries.clear()
+            self._matrix = None
+
+    def _expired(self, entry: CacheEntry) -> bool:
+        return self.ttl is not None and time.time() - entry.created > self.ttl
+
+    def _hit(self, key: str, kind: str) -> RESPONSE_TYPE:
+        self._entries.move_to_end(key)
+        self._stats[kind] += 1
+        response = copy(self._entries[key].response)
+        if isinstance(response, Response):
+            response.metadata = {**(response.metadata or {}), "cache_hit": kind}
+        return response
+
+    def _lookup_exact(self, key: str) -> Optional[RESPONSE_TYPE]:
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                del self._entries[key]
+                self._matrix = None
+                return None
+            return self._hit(key, "exact_hits")
+
+    def _lookup_semantic(self, embedding: np.ndarray) -> Optional[RESPONSE_TYPE]:
+        with self._lock:
+            if self._matrix is None:
+                self._matrix_keys = [k for k, e in self._entries.items() if e.embedding is not None]
+                self._matrix = (np.stack([self._entries[k].embedding for k in self._matrix_keys])
+                                if self._matrix_keys else None)
+            if self._matrix is not None:
+                scores = self._matrix @ embedding
+                for row in np.argsort(-scores):
+                    if scores[row] < self.similarity_threshold:
+                        break
+                    key = self._matrix_keys[row]
+                    if self._expired(self._entries[key]):
+                        continue
+                    return self._hit(key, "semantic_hits")
+            self._stats["misses"] += 1
+            return None
+
+    def _store(self, key: str, response: RESPONSE_TYPE, embedding: np.ndarray) -> None:
+        # 流式响应只能消费一次，不缓存
+        if not isinstance(response, Response):
+            return
+        with self._lock:
+            self._entries[key] = CacheEntry(response, embedding, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
@@ -0,0 +1,355 @@
+"""Text-to-SQL：按问题检索相关表（含外键邻居）和相近的 few-shot 示例，只把这些放进 prompt
+
+把 ddl_statements.yaml + db_description.yaml 全部塞进 prompt 既慢又贵，这里：
+    - SchemaIndex：每张表一篇文档（表名、列名、类型、列说明、外键），预先嵌入；
+      查询时取相似度最高的 table_top_k 张表，再沿外键补上相邻表（被引用的和引用它的），
+      总数不超过 max_tables；prompt 里只放这些表的精简 SQLite DDL + 列说明注释
+    - FewShotIndex：q2sql_pairs.json 的问题预先嵌入，取最相近的 few_shot_k 条
+    - MockSQLLLM：离线的替身 LLM，按 prompt token 数和输出 token 数模拟延迟；
+      只有 prompt 里包含了 gold SQL 用到的全部表时才返回正确 SQL，否则会"猜错表"，
+      所以检索漏表会直接体现为准确率下降
+    - Text2SQLPipeline 接受任意 llama_index LLM，换成 OpenAI 等真实模型即可
+
+用法：
+    pipeline = Text2SQLPipeline(llm, SchemaIndex.from_files(), FewShotIndex.from_file())
+    result = pipeline.generate("List all actors with their IDs and names.")
+"""
+import asyncio
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import yaml
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.llms.types import (
+    CompletionResponse,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.llms import LLM, CustomLLM
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.prompts import PromptTemplate
+from llama_index.core.utils import get_tokenizer
+
+from hash_embedding import HashEmbedding
+from numpy_vector_store import top_k_rows
+from sakila_sqlite import DDL_PATH, TableSchema, load_schemas, to_sqlite_ddl
+
+DESCRIPTION_PATH = "../../data/sakila/db_description.yaml"
+EXAMPLES_PATH = "../../data/sakila/q2sql_pairs.json"
+
+TEXT_TO_SQL_PROMPT = PromptTemplate(
+    "Given the SQLite schema below, write one SQL statement that answers the question.\n"
+    "Only use the tables and columns listed. Return the SQL only, without explanation.\n\n"
+    "{schema}\n\n"
+    "{examples}"
+    "Question: {question}\n"
+    "SQL: "
+)
+
+_TABLE_REF_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+`?(\w+)`?", re.IGNORECASE)
+_QUESTION_RE = re.compile(r"Question: (.*)\nSQL: $")
+_FENCE_RE = re.compile(r"```(?:sql)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+
+
+def count_tokens(text: str) -> int:
+    return len(get_tokenizer()(text))
+
+
+def referenced_tables(sql: str) -> Set[str]:
+    return {name.lower() for name in _TABLE_REF_RE.findall(sql)}
+
+
+def extract_sql(text: str) -> str:
+    """去掉 markdown 代码块和多余说明，只保留第一条语句"""
+    fenced = _FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    text = text.strip()
+    if text.upper().startswith("SQL:"):
+        text = text[4:].strip()
+    end = text.find(";")
+    return text[:end + 1] if end >= 0 else text
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def table_document(table: TableSchema, descriptions: Dict[str, str]) -> str:
+    """用于嵌入检索的表文档"""
+    lines = [f"Table {table.name} ({table.name.replace('_', ' ')})"]
+    for column in table.columns:
+        description = descriptions.get(column.name, "")
+        lines.append(f"- {column.name} {column.mysql_type}: {description}".rstrip(": "))
+    if table.foreign_keys:
+        lines.append("References: " + ", ".join(table.referenced_tables))
+    return "\n".join(lines)
+
+
+def table_prompt(table: TableSchema, descriptions: Dict[str, str]) -> str:
+    """放进 prompt 的精简 DDL：SQLite 建表语句，列说明写成行尾注释"""
+    lines = to_sqlite_ddl(table)[0].split("\n")
+    for i, line in enumerate(lines):
+        name = line.strip().split(" ", 1)[0]
+        if name in descriptions:
+            lines[i] = f"{line}  -- {descriptions[name]}"
+    return "\n".join(lines)
+
+
+class SchemaIndex:
+    def __init__(
+        self,
+        schemas: Dict[str, TableSchema],
+        descriptions: Dict[str, Dict[str, str]],
+        embed_model: Optional[BaseEmbedding] = None,
+        raw_schema: str = "",
+    ):
+        self.schemas = schemas
+        self.descriptions = descriptions
+        self.embed_model = embed_model or HashEmbedding()
+        self.names = list(schemas)
+        # 不做检索时的对照：原始 DDL（含视图）+ 全部列说明
+        self.raw_schema = raw_schema
+        documents = [table_document(schemas[name], descriptions.get(name, {})) for name in self.names]
+        self.embeddings = _normalize(np.asarray(
+            self.embed_model.get_text_embedding_batch(documents), dtype=np.float32))
+        self.neighbors: Dict[str, Set[str]] = {name: set() for name in self.names}
+        for name, table in schemas.items():
+            for ref in table.referenced_tables:
+                if ref in self.neighbors and ref != name:
+                    self.neighbors[name].add(ref)
+                    self.neighbors[ref].add(name)
+        self._prompts = {name: table_prompt(schemas[name], descriptions.get(name, {}))
+                         for name in self.names}
+
+    @classmethod
+    def from_files(
+        cls,
+        ddl_path: str = DDL_PATH,
+        description_path: str = DESCRIPTION_PATH,
+        embed_model: Optional[BaseEmbedding] = None,
+    ) -> "SchemaIndex":
+        with open(ddl_path, "r", encoding="utf-8") as f:
+            raw_ddl = f.read()
+        with open(description_path, "r", encoding="utf-8") as f:
+            raw_descriptions = f.read()
+        statements = yaml.safe_load(raw_ddl)
+        raw_schema = "\n\n".join(statements.values()) + "\n\nColumn descriptions:\n" + raw_descriptions
+        return cls(load_schemas(ddl_path), yaml.safe_load(raw_descriptions), embed_model, raw_schema)
+
+    def retrieve(
+        self,
+        question: str,
+        top_k: int = 3,
+        max_tables: int = 6,
+        query_embedding: Optional[List[float]] = None,
+    ) -> List[str]:
+        """先取相似度 top_k 的表，再按相似度从高到低补充它们的外键邻居，直到 max_tables"""
+        if query_embedding is None:
+            query_embedding = self.embed_model.get_query_embedding(question)
+        query = _normalize(np.asarray([query_embedding], dtype=np.float32))[0]
+        scores = self.embeddings @ query
+        order = top_k_rows(scores[None, :], len(self.names))[0]
+        selected = [self.names[i] for i in order[:top_k]]
+        candidates = {n for name in selected for n in self.neighbors[name]} - set(selected)
+        for i in order:
+            if len(selected) >= max_tables:
+                break
+            if self.names[i] in candidates:
+                selected.append(self.names[i])
+        return selected
+
+    def schema_text(self, tables: Optional[Sequence[str]] = None) -> str:
+        if tables is None:
+            return self.raw_schema
+        return "\n\n".join(self._prompts[name] for name in tables)
+
+
+class FewShotIndex:
+    def __init__(self, examples: List[Dict[str, str]], embed_model: Optional[BaseEmbedding] = None):
+        self.examples = examples
+        self.embed_model = embed_model or HashEmbedding()
+        self.embeddings = _normalize(np.asarray(
+            self.embed_model.get_text_embedding_batch([e["question"] for e in examples]), dtype=np.float32))
+
+    @classmethod
+    def from_file(cls, path: str = EXAMPLES_PATH, embed_model: Optional[BaseEmbedding] = None) -> "FewShotIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), embed_model)
+
+    def retrieve(
+        self,
+        question: str,
+        k: int = 3,
+        exclude: Optional[Set[str]] = None,
+        query_embedding: Optional[List[float]] = None,
+    ) -> List[Dict[str, str]]:
+        if query_embedding is None:
+            query_embedding = self.embed_model.get_query_embedding(question)
+        query = _normalize(np.asarray([query_embedding], dtype=np.float32))[0]
+        scores = self.embeddings @ query
+        if exclude:
+            scores = np.where([e["question"] in exclude for e in self.examples], -np.inf, scores)
+        top = top_k_rows(scores[None, :], k)[0]
+        return [self.examples[i] for i in top if np.isfinite(scores[i])]
+
+
+@dataclass
+class Text2SQLResult:
+    question: str
+    sql: str
+    tables: List[str] = field(default_factory=list)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    generate_seconds: float = 0.0
+
+
+class Text2SQLPipeline:
+    def __init__(
+        self,
+        llm: LLM,
+        schema_index: SchemaIndex,
+        few_shot_index: Optional[FewShotIndex] = None,
+        table_top_k: int = 3,
+        max_tables: int = 6,
+        few_shot_k: int = 3,
+        full_schema: bool = False,
+        leave_one_out: bool = False,
+    ):
+        """full_schema=True 为对照组：不检索，整份 DDL 和列说明都进 prompt
+        leave_one_out=True 时 few-shot 不会选中与问题完全相同的示例（评测时避免泄漏答案）"""
+        self.llm = llm
+        self.schema_index = schema_index
+        self.few_shot_index = few_shot_index
+        self.table_top_k = table_top_k
+        self.max_tables = max_tables
+        self.few_shot_k = few_shot_k
+        self.full_schema = full_schema
+        self.leave_one_out = leave_one_out
+
+    def build_prompt(self, question: str) -> Tuple[str, List[str]]:
+        examples = ""
+        if self.full_schema:
+            tables = list(self.schema_index.names)
+            schema = self.schema_index.schema_text()
+        else:
+            # 表检索和 few-shot 共用一次查询嵌入
+            embedding = self.schema_index.embed_model.get_query_embedding(question)
+            tables = self.schema_index.retrieve(question, self.table_top_k, self.max_tables, embedding)
+            schema = self.schema_index.schema_text(tables)
+            if self.few_shot_index is not None and self.few_shot_k > 0:
+                shared = self.few_shot_index.embed_model is self.schema_index.embed_model
+                shots = self.few_shot_index.retrieve(
+                    question, self.few_shot_k, {question} if self.leave_one_out else None,
+                    embedding if shared else None)
+                examples = "".join(f"Question: {s['question']}\nSQL: {s['sql']}\n\n" for s in shots)
+        return TEXT_TO_SQL_PROMPT.format(schema=schema, examples=examples, question=question), tables
+
+    def generate(self, question: str) -> Text2SQLResult:
+        start = time.perf_counter()
+        prompt, tables = self.build_prompt(question)
+        text = self.llm.complete(prompt).text
+        return self._result(question, prompt, tables, text, time.perf_counter() - start)
+
+    async def agenerate(self, question: str) -> Text2SQLResult:
+        start = time.perf_counter()
+        prompt, tables = self.build_prompt(question)
+        text = (await self.llm.acomplete(prompt)).text
+        return self._result(question, prompt, tables, text, time.perf_counter() - start)
+
+    @staticmethod
+    def _result(question: str, prompt: str, tables: List[str], text: str, seconds: float) -> Text2SQLResult:
+        return Text2SQLResult(question=question, sql=extract_sql(text), tables=tables,
+                              prompt_tokens=count_tokens(prompt), completion_tokens=count_tokens(text),
+                              generate_seconds=seconds)
+
+
+class MockSQLLLM(CustomLLM):
+    """离线替身：按问题查 gold SQL；prompt 缺表时把缺的表换成 prompt 里的第一张表（模拟幻觉）"""
+
+    answers: Dict[str, str] = Field(default_factory=dict, description="question -> gold SQL")
+    prefill_ms_per_1k_tokens: float = Field(default=30.0, description="每 1k prompt token 的预填充耗时")
+    decode_ms_per_token: float = Field(default=5.0, description="每个输出 token 的生成耗时")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MockSQLLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="mock-sql")
+
+    def _answer(self, prompt: str) -> Tuple[str, float]:
+        match = _QUESTION_RE.search(prompt)
+        gold = self.answers.get(match.group(1) if match else "", "SELECT 1;")
+        available = re.findall(r"CREATE TABLE `?(\w+)`? \(", prompt)
+        for table in referenced_tables(gold):
+            if table not in available and available:
+                gold = re.sub(rf"\b{table}\b", available[0], gold)
+        seconds = (count_tokens(prompt) * self.prefill_ms_per_1k_tokens / 1000
+                   + count_tokens(gold) * self.decode_ms_per_token) / 1000
+        return gold, seconds
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        text, seconds = self._answer(prompt)
+        time.sleep(seconds)
+        return CompletionResponse(text=text)
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        text, seconds = self._answer(prompt)
+        await asyncio.sleep(seconds)
+        return CompletionResponse(text=text)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        response = self.complete(prompt, formatted=formatted, **kwargs)
+
+        def gen() -> CompletionResponseGen:
+            yield CompletionResponse(text=response.text, delta=response.text)
+
+        return gen()
+
+
+if __name__ == "__main__":
+    from sakila_sqlite import build_sakila_db, connect
+
+    # 1. 本地 SQLite 版 Sakila + 索引
+    conn = connect(build_sakila_db())
+    schema_index = SchemaIndex.from_files()
+    few_shot_index = FewShotIndex.from_file()
+    questions = few_shot_index.examples
+    llm = MockSQLLLM(answers={e["question"]: e["sql"] for e in questions})
+
+    # 2. 对照：整份 schema 进 prompt；检索：相关表 + 外键邻居 + 3 条 few-shot
+    pipelines = {
+        "全量 schema": Text2SQLPipeline(llm, schema_index, full_schema=True),
+        "检索 schema": Text2SQLPipeline(llm, schema_index, few_shot_index, leave_one_out=True),
+    }
+    for label, pipeline in pipelines.items():
+        tokens, latencies, covered = [], [], 0
+        for example in questions:
+            start = time.perf_counter()
+            result = pipeline.generate(example["question"])
+            conn.execute("SAVEPOINT q")
+            try:
+                conn.execute(result.sql).fetchall()
+            finally:
+                conn.execute("ROLLBACK TO q")
+                conn.execute("RELEASE q")
+            latencies.append(time.perf_counter() - start)
+            tokens.append(result.prompt_tokens)
+            covered += referenced_tables(example["sql"]) <= set(result.tables)
+        print(f"{label}: prompt 平均 {np.mean(tokens):7.1f} tokens, "
+              f"端到端 p50 {np.percentile(latencies, 50) * 1000:6.1f} ms / p95 {np.percentile(latencies, 95) * 1000:6.1f} ms, "
+              f"gold 表覆盖 {covered}/{len(questions)}")
+
+    question = "Show the 10 most recent rentals with their customers."
+    prompt, tables = pipelines["检索 schema"].build_prompt(question)
+    print(f"\n示例问题: {question}\n检索到的表: {tables}\n\n{prompt}")
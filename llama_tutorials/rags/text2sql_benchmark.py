@@ -0,0 +1,234 @@
+"""Text-to-SQL 基准：q2sql_pairs.json 的执行准确率、生成延迟、SQL 执行耗时和 token 数
+
+- 数据库：sakila_sqlite 用 ddl_statements.yaml 建的本地 SQLite（合成数据，--scale 缩放行数）
+- 并发：所有问题同时提交，--concurrency 限制同时在途的 LLM 请求数；
+  SQL 在线程池里执行，每个线程一份内存中的库副本，互不加锁
+- 执行准确率：预测 SQL 与 gold SQL 在同一份副本上、各自的 SAVEPOINT 里执行后回滚
+    - 查询语句比较结果集（gold 带 ORDER BY 时比较顺序，否则按多重集合比较）
+    - INSERT / UPDATE / DELETE 比较执行后涉及表的全部行（忽略 last_update 这类自动时间戳列）
+    - gold 本身执行失败的问题单独计数，不计入准确率
+- LLM 可插拔：默认离线的 MockSQLLLM（延迟随 token 数增长），--llm openai 使用真实模型
+结果写成 JSON（含 git commit 和参数），便于跨提交比较。
+
+用法：
+    python text2sql_benchmark.py                       # 全量 schema 与检索 schema 两种模式
+    python text2sql_benchmark.py --mode retrieved --max-tables 3 --concurrency 16
+    python text2sql_benchmark.py --llm openai --model gpt-4o-mini
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ipcc_benchmark import git_commit, peak_rss_mb, percentiles
+from sakila_sqlite import TableSchema, build_sakila_db, connect
+from text2sql import (
+    FewShotIndex,
+    MockSQLLLM,
+    SchemaIndex,
+    Text2SQLPipeline,
+    referenced_tables,
+)
+
+
+class SQLExecutor:
+    """线程池执行 SQL；每个线程一份内存副本，执行完回滚，副本状态始终与库文件一致"""
+
+    def __init__(self, db_path: str, schemas: Dict[str, TableSchema], workers: int = 4):
+        self.db_path = db_path
+        self.schemas = schemas
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(":memory:")
+            source = sqlite3.connect(self.db_path)
+            source.backup(conn)
+            source.close()
+            self._local.conn = conn
+        return conn
+
+    def _snapshot(self, conn: sqlite3.Connection, tables) -> Dict[str, Counter]:
+        snapshot = {}
+        for name in sorted(tables):
+            schema = self.schemas.get(name)
+            if schema is None:
+                continue
+            columns = [c.name for c in schema.columns if not c.auto_timestamp]
+            snapshot[name] = Counter(conn.execute(f"SELECT {', '.join(columns)} FROM {name}"))
+        return snapshot
+
+    def _run(self, conn: sqlite3.Connection, sql: str, tables) -> Tuple[object, float, Optional[str]]:
+        conn.execute("SAVEPOINT eval")
+        start = time.perf_counter()
+        try:
+            cursor = conn.execute(sql)
+            if cursor.description is not None:
+                rows = cursor.fetchall()
+                return ("rows", rows), time.perf_counter() - start, None
+            seconds = time.perf_counter() - start
+            return ("state", self._snapshot(conn, tables)), seconds, None
+        except (sqlite3.Error, sqlite3.Warning) as e:
+            return None, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+        finally:
+            conn.execute("ROLLBACK TO eval")
+            conn.execute("RELEASE eval")
+
+    def compare(self, gold_sql: str, pred_sql: str) -> Dict:
+        conn = self._conn()
+        tables = referenced_tables(gold_sql) | referenced_tables(pred_sql)
+        gold, _, gold_error = self._run(conn, gold_sql, tables)
+        pred, seconds, pred_error = self._run(conn, pred_sql, tables)
+        if gold_error is not None:
+            correct = None
+        elif pred is None or pred[0] != gold[0]:
+            correct = False
+        elif gold[0] == "rows" and "ORDER BY" not in gold_sql.upper():
+            correct = Counter(gold[1]) == Counter(pred[1])
+        else:
+            correct = gold[1] == pred[1]
+        return {"correct": correct, "exec_seconds": seconds, "error": pred_error or gold_error}
+
+    async def acompare(self, gold_sql: str, pred_sql: str) -> Dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self.compare, gold_sql, pred_sql)
+
+    def close(self) -> None:
+        self._pool.shutdown()
+
+
+async def run_mode(
+    pipeline: Text2SQLPipeline,
+    executor: SQLExecutor,
+    examples: List[Dict[str, str]],
+    concurrency: int,
+) -> Tuple[List[Dict], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(example: Dict[str, str]) -> Dict:
+        async with semaphore:
+            result = await pipeline.agenerate(example["question"])
+        outcome = await executor.acompare(example["sql"], result.sql)
+        return {
+            "question": example["question"],
+            "gold_sql": example["sql"],
+            "pred_sql": result.sql,
+            "tables": result.tables,
+            "prompt_tokens": result.prompt_tokens,
+            "completion_tokens": result.completion_tokens,
+            "generate_seconds": result.generate_seconds,
+            **outcome,
+        }
+
+    start = time.perf_counter()
+    records = await asyncio.gather(*(one(example) for example in examples))
+    return list(records), time.perf_counter() - start
+
+
+def summarize(records: List[Dict], wall_seconds: float) -> Dict:
+    scored = [r for r in records if r["correct"] is not None]
+    return {
+        "questions": len(records),
+        "execution_accuracy": round(sum(r["correct"] for r in scored) / max(len(scored), 1), 4),
+        "gold_errors": len(records) - len(scored),
+        "generation_latency": percentiles([r["generate_seconds"] for r in records]),
+        "sql_execution": percentiles([r["exec_seconds"] for r in records]),
+        "tokens_per_query": {
+            "prompt": round(float(np.mean([r["prompt_tokens"] for r in records])), 1),
+            "completion": round(float(np.mean([r["completion_tokens"] for r in records])), 1),
+        },
+        "wall_seconds": round(wall_seconds, 3),
+        "queries_per_s": round(len(records) / wall_seconds, 2),
+        "failures": [{k: r[k] for k in ("question", "gold_sql", "pred_sql", "error")}
+                     for r in records if r["correct"] is False],
+    }
+
+
+def load_llm(args, examples: List[Dict[str, str]]):
+    if args.llm == "mock":
+        return MockSQLLLM(answers={e["question"]: e["sql"] for e in examples},
+                          prefill_ms_per_1k_tokens=args.prefill_ms, decode_ms_per_token=args.decode_ms)
+    from llama_index.llms.openai import OpenAI
+    return OpenAI(model=args.model, temperature=0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm", choices=["mock", "openai"], default="mock")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--prefill-ms", type=float, default=30.0, help="MockSQLLLM: 每 1k prompt token 的耗时")
+    parser.add_argument("--decode-ms", type=float, default=5.0, help="MockSQLLLM: 每个输出 token 的耗时")
+    parser.add_argument("--mode", choices=["full", "retrieved", "both"], default="both")
+    parser.add_argument("--table-top-k", type=int, default=3)
+    parser.add_argument("--max-tables", type=int, default=6)
+    parser.add_argument("--few-shot-k", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--exec-workers", type=int, default=4)
+    parser.add_argument("--scale", type=float, default=1.0, help="合成数据行数缩放")
+    parser.add_argument("--output", default=None,
+                        help="结果 JSON 路径，默认 ./storage/text2sql_benchmark/<时间戳>.json")
+    args = parser.parse_args()
+
+    # 1. 本地库、schema 索引、few-shot 索引
+    start = time.perf_counter()
+    db_path = build_sakila_db(db_path=f"./storage/sakila_x{args.scale:g}.db", scale=args.scale)
+    schema_index = SchemaIndex.from_files()
+    few_shot_index = FewShotIndex.from_file()
+    examples = few_shot_index.examples
+    print(f"准备: {time.perf_counter() - start:.2f}s, {len(examples)} 个问题")
+
+    llm = load_llm(args, examples)
+    executor = SQLExecutor(db_path, schema_index.schemas, workers=args.exec_workers)
+    pipelines = {
+        "full": Text2SQLPipeline(llm, schema_index, full_schema=True),
+        # few-shot 排除问题本身，避免直接抄到答案
+        "retrieved": Text2SQLPipeline(llm, schema_index, few_shot_index, table_top_k=args.table_top_k,
+                                      max_tables=args.max_tables, few_shot_k=args.few_shot_k,
+                                      leave_one_out=True),
+    }
+    modes = ["full", "retrieved"] if args.mode == "both" else [args.mode]
+
+    # 2. 每种模式并发跑完全部问题
+    results = {}
+    try:
+        for mode in modes:
+            records, wall = asyncio.run(run_mode(pipelines[mode], executor, examples, args.concurrency))
+            results[mode] = summary = summarize(records, wall)
+            print(f"{mode:<9} 准确率 {summary['execution_accuracy']:.3f}  "
+                  f"生成 p50 {summary['generation_latency']['p50_ms']:7.1f} ms  "
+                  f"执行 p50 {summary['sql_execution']['p50_ms']:6.2f} ms  "
+                  f"prompt {summary['tokens_per_query']['prompt']:7.1f} tokens  "
+                  f"{summary['queries_per_s']:6.2f} q/s")
+            for failure in summary["failures"]:
+                print(f"    ✗ {failure['question']}\n      gold: {failure['gold_sql']}\n"
+                      f"      pred: {failure['pred_sql']}  {failure['error'] or ''}")
+    finally:
+        executor.close()
+
+    output = args.output or os.path.join(
+        "./storage/text2sql_benchmark", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "benchmark": "sakila_q2sql_pairs",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": git_commit(),
+            "config": vars(args),
+            "results": results,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""合并 token 的流式事件：按字数或时间窗口把多个 delta 合成一个事件，并对慢消费者做背压
+
+streaming_event.py 对每个 LLM delta 调一次 ctx.write_event_to_stream：每个 token 都要构造一个 pydantic 事件、
+入队一次、唤醒一次消费者，并发高时这些开销占满 CPU。这里：
+    - DeltaCoalescer 把 delta 攒到 max_chars 个字符或 max_delay 秒（以先到者为准）再发一个 TokenBatchEvent，
+      LLM 停顿时由定时器把剩余内容发出去
+    - FlowControl 是发送方和消费者共享的信用计数：最多 max_inflight 个事件未被消费者确认，
+      超过后 add() 会等待，不再从 LLM 读取，缓冲区最多 max_chars + 一个 delta
+    - stream_text() 是消费者一侧的帮助函数：读事件、确认、返回文本。传了 flow 就必须用它（或自己对每个
+      TokenBatchEvent 调 flow.ack()）读事件，否则发满 max_inflight 个事件后工作流会一直等信用
+
+用法：
+    flow = FlowControl(max_inflight=8)
+    handler = CoalescedStreamWorkflow().run(question="...", flow=flow)
+    async for text in stream_text(handler, flow):
+        print(text, end="")
+"""
+import asyncio
+import time
+from typing import AsyncIterator, Optional, Type
+
+from llama_index.core.workflow import (
+    step,
+    Event,
+    Context,
+    Workflow,
+    StartEvent,
+    StopEvent,
+)
+from llama_index.llms.openai import OpenAI
+
+
+class TokenBatchEvent(Event):
+    text: str
+    deltas: int  # 合并了多少个 delta
+    seq: int
+
+
+class ProgressEvent(Event):
+    """与 streaming_event.py 相同的逐 token 事件，用作对照"""
+    message: str
+
+
+class FlowControl:
+    """发送方与消费者之间的信用计数：未确认的事件数不超过 max_inflight
+
+    消费者必须对每个 TokenBatchEvent 调一次 ack()，stream_text(handler, flow) 会做这件事
+    """
+
+    def __init__(self, max_inflight: int = 8):
+        self.max_inflight = max_inflight
+        self.outstanding = 0
+        self.peak_outstanding = 0
+        self.waits = 0
+        self.wait_s = 0.0
+        self._space = asyncio.Event()
+
+    def try_acquire(self) -> bool:
+        if self.outstanding >= self.max_inflight:
+            return False
+        self._taken()
+        return True
+
+    async def acquire(self) -> None:
+        if self.outstanding >= self.max_inflight:
+            self.waits += 1
+            start = time.perf_counter()
+            while self.outstanding >= self.max_inflight:
+                self._space.clear()
+                await self._space.wait()
+            self.wait_s += time.perf_counter() - start
+        self._taken()
+
+    def _taken(self) -> None:
+        self.outstanding += 1
+        self.peak_outstanding = max(self.peak_outstanding, self.outstanding)
+
+    def ack(self) -> None:
+        self.outstanding -= 1
+        self._space.set()
+
+
+class DeltaCoalescer:
+    """按字数 / 时间窗口合并 delta，写入工作流的事件流"""
+
+    def __init__(self, ctx: Context, max_chars: int = 64, max_delay: float = 0.02,
+                 flow: Optional[FlowControl] = None, event_cls: Type[TokenBatchEvent] = TokenBatchEvent):
+        self.ctx = ctx
+        self.max_chars = max_chars
+        self.max_delay = max_delay
+        self.flow = flow
+        self.event_cls = event_cls
+        self._parts = []
+        self._chars = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.events = 0
+        self.deltas = 0
+
+    async def add(self, delta: str) -> None:
+        if not delta:
+            return
+        self._parts.append(delta)
+        self._chars += len(delta)
+        self.deltas += 1
+        if self._chars >= self.max_chars:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        if not self._parts:
+            return
+        if self.flow is None or self.flow.try_acquire():
+            self._emit()
+        else:
+            # 没有信用：LLM 可能一直停着不再调用 add()，重新定时，等消费者确认后再发
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._on_timer)
+
+    async def flush(self) -> None:
+        if not self._parts:
+            return
+        if self.flow is not None:
+            await self.flow.acquire()
+        self._emit()
+
+    def _emit(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.ctx.write_event_to_stream(
+            self.event_cls(text="".join(self._parts), deltas=len(self._parts), seq=self.events))
+        self.events += 1
+        self._parts.clear()
+        self._chars = 0
+
+    async def aclose(self) -> None:
+        await self.flush()
+
+    def discard(self) -> None:
+        """丢弃未发出的内容，不等信用"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._parts.clear()
+        self._chars = 0
+
+    async def __aenter__(self) -> "DeltaCoalescer":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            # 出错（包括被取消）时消费者可能已经不读了，等信用会卡住，剩余内容直接丢弃
+            self.discard()
+            return
+        await self.aclose()
+
+
+async def stream_text(handler, flow: Optional[FlowControl] = None) -> AsyncIterator[str]:
+    """消费者一侧：逐个读取 TokenBatchEvent 并确认，返回其中的文本"""
+    async for event in handler.stream_events():
+        if isinstance(event, TokenBatchEvent):
+            yield event.text
+            if flow is not None:
+                flow.ack()
+        elif isinstance(event, ProgressEvent):
+            yield event.message
+
+
+class CoalescedStreamWorkflow(Workflow):
+    """StartEvent 参数：question、llm、mode（"coalesced" 或 "token"）、flow、max_chars、max_delay
+
+    传了 flow 时，事件必须用 stream_text(handler, flow) 读取
+    """
+
+    @step
+    async def generate(self, ctx: Context, ev: StartEvent) -> StopEvent:
+        llm = ev.get("llm") or OpenAI(model="gpt-4o-mini", max_tokens=500)
+        generator = await llm.astream_complete(ev.get("question"))
+
+        if ev.get("mode", "coalesced") == "token":
+            events = 0
+            async for chunk in generator:
+                ctx.write_event_to_stream(ProgressEvent(message=chunk.delta))
+                events += 1
+            return StopEvent(result={"events": events, "deltas": events})
+
+        coalescer = DeltaCoalescer(ctx, max_chars=ev.get("max_chars", 64), max_delay=ev.get("max_delay", 0.02),
+                                   flow=ev.get("flow"))
+        async with coalescer:
+            async for chunk in generator:
+                await coalescer.add(chunk.delta)
+        return StopEvent(result={"events": coalescer.events, "deltas": coalescer.deltas})
+
+
+async def main():
+    flow = FlowControl(max_inflight=8)
+    handler = CoalescedStreamWorkflow(timeout=120).run(question="请介绍一下中国的赛龙舟起源、发展、现状", flow=flow)
+    async for text in stream_text(handler, flow):
+        print(text, end="", flush=True)
+
+    result = await handler
+    print("\nfinal result", result)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
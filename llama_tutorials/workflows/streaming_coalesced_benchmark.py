@@ -0,0 +1,110 @@
+"""逐 token 事件与合并事件的吞吐对比（模拟 LLM，不需要网络）
+
+每个工作流从模拟 LLM 流式读取 --deltas 个 delta（每个 1~3 个字符），同时运行 --runs 个工作流：
+    逐 token：每个 delta 一个 ProgressEvent（streaming_event.py 的写法）
+    合并：DeltaCoalescer，64 字符或 20 ms 一个 TokenBatchEvent，FlowControl 限制未确认事件数
+统计墙钟时间、CPU 时间、每秒送达字符数；慢消费者场景（每个事件处理 --slow-ms 毫秒）
+再统计"已生成但未被消费"的字符数峰值，看背压是否生效。
+
+用法：
+    python streaming_coalesced_benchmark.py
+    python streaming_coalesced_benchmark.py --runs 200 --deltas 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Any
+
+from llama_index.core.base.llms.types import CompletionResponse, CompletionResponseGen, LLMMetadata
+from llama_index.core.llms import CustomLLM
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+from streaming_coalesced import CoalescedStreamWorkflow, FlowControl, stream_text
+
+PIECES = ["龙舟", "起源", "于", "战国", "时期", "，", "端午", "节", "赛", "龙舟", "的", "习俗", "流传", "至今", "。"]
+
+
+class MockStreamLLM(CustomLLM):
+    deltas: int = 1000
+    produced_chars: int = 0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="mock-stream")
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(text="".join(PIECES))
+
+    def _chunks(self, prompt: str):
+        rng = random.Random(prompt)
+        text = ""
+        for _ in range(self.deltas):
+            delta = rng.choice(PIECES)
+            text += delta
+            self.produced_chars += len(delta)
+            yield CompletionResponse(text=text, delta=delta)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        return self._chunks(prompt)
+
+    @llm_completion_callback()
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        async def gen():
+            for chunk in self._chunks(prompt):
+                await asyncio.sleep(0)  # 真实 LLM 每个 delta 都要等网络，这里让出一次事件循环
+                yield chunk
+
+        return gen()
+
+
+async def run_mode(mode: str, runs: int, deltas: int, slow_ms: float = 0.0):
+    llm = MockStreamLLM(deltas=deltas)
+    state = {"consumed": 0, "peak_backlog": 0, "events": 0}
+
+    async def one(i):
+        flow = FlowControl(max_inflight=8) if mode == "coalesced" else None
+        handler = CoalescedStreamWorkflow(timeout=600).run(question=f"问题 {i}", llm=llm, mode=mode, flow=flow)
+        async for text in stream_text(handler, flow):
+            state["consumed"] += len(text)
+            state["events"] += 1
+            state["peak_backlog"] = max(state["peak_backlog"], llm.produced_chars - state["consumed"])
+            if slow_ms:
+                await asyncio.sleep(slow_ms / 1000)
+        await handler
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(one(i) for i in range(runs)))
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return {"wall": wall, "cpu": cpu, "chars": state["consumed"], "events": state["events"],
+            "peak_backlog": state["peak_backlog"]}
+
+
+def report(label: str, r) -> None:
+    print(f"{label:<10} 墙钟 {r['wall']:6.2f}s  CPU {r['cpu']:6.2f}s  事件 {r['events']:>8}  "
+          f"{r['chars'] / r['wall']:>10.0f} 字符/s  未消费字符峰值 {r['peak_backlog']:>8}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--deltas", type=int, default=1000)
+    parser.add_argument("--slow-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    # 1. 吞吐：消费者不做额外处理
+    print(f"{args.runs} 个工作流 × {args.deltas} 个 delta")
+    for mode in ("token", "coalesced"):
+        report(mode, await run_mode(mode, args.runs, args.deltas))
+
+    # 2. 慢消费者：每个事件处理 slow_ms 毫秒
+    runs = max(1, args.runs // 10)
+    print(f"\n慢消费者（每个事件 {args.slow_ms} ms），{runs} 个工作流")
+    for mode in ("token", "coalesced"):
+        report(mode, await run_mode(mode, runs, args.deltas, args.slow_ms))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
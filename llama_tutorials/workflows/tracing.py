@@ -0,0 +1,594 @@
+"""Workflow 的逐 step 追踪与计时：接入 llama_index 的 instrumentation，导出 Chrome trace 和进程内指标
+
+记录内容：
+    - step：墙钟时间、CPU 时间、事件在队列里的等待时间、每次运行发出的事件数（扇出）、
+      collect_events 等了几个事件才产出结果（扇入）
+    - LLM 调用：LLMChat/LLMCompletion 的 Start/End 事件之间的耗时，流式调用的首 token 延迟
+导出：
+    - MetricsRegistry：进程内的直方图（固定对数分桶，O(log 桶数) 记录），snapshot() / to_prometheus()
+    - export_chrome_trace()：chrome://tracing 或 https://ui.perfetto.dev 可以直接打开的 JSON，
+      每个 step worker 一条泳道，事件从发出到被消费画成箭头
+
+实现：
+    - step 本来就被 dispatcher.span 包着，这里只注册一个 span handler 和一个 event handler，
+      不新建 span 对象，只在字典里记几个数
+    - 队列等待：给 Context.send_event 套一层，记下每个事件的发出时间和发出它的 step
+    - CPU 时间：install() 在运行中的事件循环上装一个 task factory，只包 step worker 的 task，按 task 累计 CPU，
+      并发 step 交替执行时各算各的；其它 task 原样创建。task_cpu=False 或同步 step 在线程池里跑时用线程 CPU 时间
+      （并发时会把同一段时间里其他 task 的 CPU 也算进来）
+    - 用到了 llama_index 的几处私有实现（Context._step_worker、__step_config、span id 的格式），
+      升级后认不出来时退化为不分泳道、不记队列等待，不会记错
+    - Context.send_event 是全局替换的，同一时间只能 install() 一个 WorkflowTracer
+    - trace 缓冲区有上限（max_trace_events），可以按 trace_sample_rate 抽样；指标始终全量
+
+用法：
+    tracer = WorkflowTracer().install()   # 在 async 函数里调用
+    await MyWorkflow().run(...)
+    tracer.export_chrome_trace("./storage/workflow_trace.json")
+    print(tracer.registry.to_prometheus())
+"""
+import asyncio
+import bisect
+import collections.abc
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events import BaseEvent
+from llama_index.core.instrumentation.events.llm import (
+    LLMChatEndEvent,
+    LLMChatInProgressEvent,
+    LLMChatStartEvent,
+    LLMCompletionEndEvent,
+    LLMCompletionInProgressEvent,
+    LLMCompletionStartEvent,
+)
+from llama_index.core.instrumentation.span import active_span_id
+from llama_index.core.instrumentation.span_handlers import BaseSpanHandler
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.workflow import Context, Event, StartEvent, StopEvent, Workflow, step
+
+_LLM_EVENTS = {
+    LLMChatStartEvent: "chat", LLMCompletionStartEvent: "completion",
+    LLMChatInProgressEvent: "progress", LLMCompletionInProgressEvent: "progress",
+    LLMChatEndEvent: "end", LLMCompletionEndEvent: "end",
+}
+
+# 秒：10µs ~ 160s，每档 ×2；次数：1 ~ 1024
+SECONDS_BUCKETS = tuple(1e-5 * 2 ** i for i in range(25))
+COUNT_BUCKETS = tuple(float(2 ** i) for i in range(11))
+
+
+class Histogram:
+    """固定分桶直方图，分位数在桶内线性插值"""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "min", "max")
+
+    def __init__(self, buckets: Sequence[float] = SECONDS_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个桶是 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                # 桶的边界再用实际的最小 / 最大值收紧
+                lower = max(self.buckets[i - 1] if i > 0 else self.min, self.min)
+                upper = min(self.buckets[i] if i < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / c
+            seen += c
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count, "sum": self.sum, "mean": self.sum / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0, "max": self.max if self.count else 0.0,
+            "p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99),
+        }
+
+
+class MetricsRegistry:
+    """进程内指标：按 (名称, 标签) 区分的直方图和计数器"""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, buckets: Sequence[float] = SECONDS_BUCKETS, **labels: str) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            result.setdefault(name, []).append({"labels": dict(labels), **histogram.summary()})
+        for (name, labels), value in sorted(self._counters.items()):
+            result.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        return result
+
+    def to_prometheus(self) -> str:
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}" if items else ""
+
+        lines = []
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            cumulative = 0
+            for bound, c in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{name}_bucket{fmt(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{fmt(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{fmt(labels)} {histogram.count}")
+        for (name, labels), value in sorted(self._counters.items()):
+            lines.append(f"{name}{fmt(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class _CpuMeter:
+    __slots__ = ("total", "start")
+
+    def __init__(self):
+        self.total = 0.0
+        self.start = None
+
+    def now(self) -> float:
+        if self.start is None:
+            return self.total
+        return self.total + time.thread_time() - self.start
+
+
+class _MeteredCoroutine(collections.abc.Coroutine):
+    """包住 task 的协程，每次 send/throw 前后读线程 CPU 时间，累计到这个 task 的 _CpuMeter"""
+
+    __slots__ = ("_coro", "_meter")
+
+    def __init__(self, coro, meter: _CpuMeter):
+        self._coro = coro
+        self._meter = meter
+
+    def send(self, value):
+        meter = self._meter
+        meter.start = time.thread_time()
+        try:
+            return self._coro.send(value)
+        finally:
+            meter.total += time.thread_time() - meter.start
+            meter.start = None
+
+    def throw(self, *args):
+        meter = self._meter
+        meter.start = time.thread_time()
+        try:
+            return self._coro.throw(*args)
+        finally:
+            meter.total += time.thread_time() - meter.start
+            meter.start = None
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+
+class _Handler(BaseSpanHandler):
+    """注册到 root dispatcher 的 span handler，只转发给 WorkflowTracer"""
+
+    tracer: Any = Field(default=None, exclude=True)
+
+    def span_enter(self, id_, bound_args, instance=None, parent_id=None, tags=None, **kwargs):
+        if isinstance(instance, Workflow):
+            self.tracer._step_enter(id_, bound_args, instance)
+
+    def span_exit(self, id_, bound_args, instance=None, result=None, **kwargs):
+        if isinstance(instance, Workflow):
+            self.tracer._step_exit(id_, result, None)
+
+    def span_drop(self, id_, bound_args, instance=None, err=None, **kwargs):
+        if isinstance(instance, Workflow):
+            self.tracer._step_exit(id_, None, err)
+
+    def new_span(self, *args, **kwargs):
+        return None
+
+    def prepare_to_exit_span(self, *args, **kwargs):
+        return None
+
+    def prepare_to_drop_span(self, *args, **kwargs):
+        return None
+
+
+class _EventHandler(BaseEventHandler):
+    # 普通字段而不是 PrivateAttr：每个 token 事件都要读一次，PrivateAttr 要走 __getattr__
+    tracer: Any = Field(default=None, exclude=True)
+
+    def handle(self, event: BaseEvent, **kwargs: Any) -> Any:
+        self.tracer._on_event(event)
+
+
+class WorkflowTracer:
+    # Context.send_event 和 dispatcher 都是全局的：同时装两个时，先装的先卸载会把后装的那层也一起去掉
+    _active: Optional["WorkflowTracer"] = None
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, max_trace_events: int = 200_000,
+                 trace_sample_rate: float = 1.0, max_tracked_events: int = 4096, task_cpu: bool = True):
+        self.registry = registry or MetricsRegistry()
+        self.task_cpu = task_cpu
+        self.trace_sample_rate = trace_sample_rate
+        self.max_tracked_events = max_tracked_events
+        self._trace = deque(maxlen=max_trace_events)
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._open: Dict[str, list] = {}
+        self._emitted: "OrderedDict[int, tuple]" = OrderedDict()  # id(event) -> (event, 发出时间, 发出者泳道)
+        self._pending_inputs: Dict[Tuple[int, str], int] = {}  # 扇入计数：(run, step) -> 已收到的输入数
+        self._llm_calls: Dict[Any, list] = {}
+        self._event_params: Dict[Tuple[type, str], Optional[str]] = {}
+        self._meters: Dict[Any, _CpuMeter] = {}
+        self._lanes: Dict[Any, Tuple[int, Any, str]] = {}  # task -> (tid, ctx, 泳道名)
+        self._flow_ids = 0
+        self._next_tid = 0
+        self._handler = _Handler()
+        self._handler.tracer = self
+        self._event_handler = _EventHandler()
+        self._event_handler.tracer = self
+        self._original_send_event = None
+        self._loop = None
+        self._previous_factory = None
+
+    # ---- 安装 / 卸载 ----
+    def install(self) -> "WorkflowTracer":
+        if WorkflowTracer._active is not None:
+            raise RuntimeError("已经有一个 WorkflowTracer 在运行，先对它调用 uninstall()")
+        WorkflowTracer._active = self
+        dispatcher = get_dispatcher()
+        dispatcher.add_span_handler(self._handler)
+        dispatcher.add_event_handler(self._event_handler)
+
+        original = Context.send_event
+        tracer = self
+
+        def send_event(ctx, message, *args, **kwargs):
+            tracer._on_send(ctx, message)
+            return original(ctx, message, *args, **kwargs)
+
+        self._original_send_event = original
+        Context.send_event = send_event
+
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        if self._loop is not None and self.task_cpu:
+            self._previous_factory = self._loop.get_task_factory()
+            self._loop.set_task_factory(self._task_factory)
+        return self
+
+    def uninstall(self) -> None:
+        if WorkflowTracer._active is not self:
+            return
+        dispatcher = get_dispatcher()
+        if self._handler in dispatcher.span_handlers:
+            dispatcher.span_handlers.remove(self._handler)
+        if self._event_handler in dispatcher.event_handlers:
+            dispatcher.event_handlers.remove(self._event_handler)
+        if self._original_send_event is not None:
+            Context.send_event = self._original_send_event
+            self._original_send_event = None
+        if self._loop is not None and self.task_cpu and not self._loop.is_closed():
+            self._loop.set_task_factory(self._previous_factory)
+        self._loop = None
+        WorkflowTracer._active = None
+
+    def _task_factory(self, loop, coro, **kwargs):
+        lane = self._step_worker_lane(coro)
+        if lane is None:
+            # 其它 task 不包协程，task.get_coro() 等行为不变
+            return self._create_task(loop, coro, **kwargs)
+        meter = _CpuMeter()
+        task = self._create_task(loop, _MeteredCoroutine(coro, meter), **kwargs)
+        self._meters[task] = meter
+        self._next_tid += 1
+        self._lanes[task] = (self._next_tid, *lane)
+        self._trace.append(("M", self._next_tid, lane[1]))
+        task.add_done_callback(self._forget_task)
+        return task
+
+    def _create_task(self, loop, coro, **kwargs):
+        if self._previous_factory is not None:
+            return self._previous_factory(loop, coro, **kwargs)
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    @staticmethod
+    def _step_worker_lane(coro) -> Optional[Tuple[Any, str]]:
+        """step worker 协程是 Context._step_worker(name, ...)：返回所属的 Context 和 step 名作为泳道"""
+        if not getattr(coro, "__qualname__", "").endswith("_step_worker"):
+            return None
+        frame = getattr(coro, "cr_frame", None)
+        f_locals = frame.f_locals if frame is not None else {}
+        ctx, name = f_locals.get("self"), f_locals.get("name")
+        if not isinstance(ctx, Context) or not isinstance(name, str):
+            return None
+        return ctx, name
+
+    def _forget_task(self, task) -> None:
+        self._meters.pop(task, None)
+        self._lanes.pop(task, None)
+
+    # ---- 计时工具 ----
+    @staticmethod
+    def _current_task():
+        try:
+            return asyncio.current_task()
+        except RuntimeError:
+            return None
+
+    def _cpu_now(self, task) -> float:
+        meter = self._meters.get(task) if task is not None else None
+        return meter.now() if meter is not None else time.thread_time()
+
+    def _lane(self, task) -> Tuple[int, Any]:
+        lane = self._lanes.get(task) if task is not None else None
+        if lane is not None:
+            return lane[0], lane[1]
+        return (id(task) if task is not None else threading.get_ident()), None
+
+    def _us(self, t: float) -> float:
+        return (t - self._origin) * 1e6
+
+    def _sampled(self) -> bool:
+        return self.trace_sample_rate >= 1.0 or random.random() < self.trace_sample_rate
+
+    # ---- 事件发出 ----
+    def _on_send(self, ctx, message) -> None:
+        span_id = active_span_id.get()
+        producer = self._open.get(span_id) if span_id else None
+        if producer is not None:
+            producer[5] += 1  # 显式 ctx.send_event 计入扇出
+        entry = self._emitted.get(id(message))
+        if entry is not None and entry[0] is message:
+            # step 的返回值：在 span_exit 时已登记发出者，这里补上真正入队的时间
+            self._emitted[id(message)] = (message, time.perf_counter(), entry[2])
+            return
+        self._remember(message, producer[4] if producer is not None else None)
+
+    def _remember(self, event, producer_tid: Optional[int]) -> None:
+        self._emitted[id(event)] = (event, time.perf_counter(), producer_tid)
+        if len(self._emitted) > self.max_tracked_events:
+            self._emitted.popitem(last=False)
+
+    # ---- step span ----
+    def _step_enter(self, id_: str, bound_args: inspect.BoundArguments, instance: Workflow) -> None:
+        # span id 是 "<函数 qualname>-<uuid4>"
+        name = id_.rsplit("-", 5)[0].rsplit(".", 1)[-1]
+        if name in ("run", "run_from"):
+            return
+        task = self._current_task()
+        tid, ctx = self._lane(task)
+        run_key = id(ctx) if ctx is not None else id(instance)
+        if name == "_done":
+            # 运行结束：清掉这次运行遗留的扇入计数
+            self._pending_inputs = {k: v for k, v in self._pending_inputs.items() if k[0] != run_key}
+            return
+        param = self._event_param(instance, name)
+        if param is None:
+            # 解析出来的不是这个 workflow 上的 step（span id 格式变了）：不记，免得记错
+            return
+        now = time.perf_counter()
+        event = bound_args.arguments.get(param) if param else None
+        wait, producer_tid = None, None
+        if event is not None:
+            entry = self._emitted.get(id(event))
+            if entry is not None and entry[0] is event:
+                wait, producer_tid = now - entry[1], entry[2]
+        workflow = type(instance).__name__
+        # [step 名, 开始时间, 开始 CPU, task, tid, 扇出, 队列等待, 输入事件名, run 标识, workflow 名, 发出者泳道]
+        self._open[id_] = [name, now, self._cpu_now(task), task, tid, 0, wait,
+                           type(event).__name__ if event is not None else None, run_key, workflow, producer_tid]
+
+    def _event_param(self, instance: Workflow, name: str) -> Optional[str]:
+        """step 函数里接收事件的参数名（@step 记在 __step_config 上），按 (workflow 类, step) 缓存；
+        不是 step 时返回 None，认不出参数名时返回空字符串（照常计时，不记队列等待）"""
+        key = (type(instance), name)
+        if key not in self._event_params:
+            config = getattr(getattr(type(instance), name, None), "__step_config", None)
+            if config is None:
+                self._event_params[key] = None
+            else:
+                param = getattr(config, "event_name", None)
+                self._event_params[key] = param if isinstance(param, str) else ""
+        return self._event_params[key]
+
+    def _step_exit(self, id_: str, result: Any, err: Optional[BaseException]) -> None:
+        span = self._open.pop(id_, None)
+        if span is None:
+            return
+        now = time.perf_counter()
+        name, start, cpu_start, task, tid, fan_out, wait, input_name, run_key, workflow, producer_tid = span
+        wall = now - start
+        cpu = self._cpu_now(task) - cpu_start
+        registry = self.registry
+        labels = {"workflow": workflow, "step": name}
+        registry.histogram("workflow_step_wall_seconds", **labels).observe(wall)
+        registry.histogram("workflow_step_cpu_seconds", **labels).observe(max(cpu, 0.0))
+        if wait is not None:
+            registry.histogram("workflow_queue_wait_seconds", **labels).observe(wait)
+        if err is not None:
+            registry.inc("workflow_step_errors_total", **labels)
+
+        if isinstance(result, Event):
+            fan_out += 1
+            self._remember(result, tid)
+        # 扇入：这个 step 在本次运行里收到几个输入才产出一次结果（collect_events 之前返回 None）
+        fan_key = (run_key, name)
+        inputs = self._pending_inputs.get(fan_key, 0) + 1
+        if result is not None or fan_out:
+            registry.histogram("workflow_step_fan_in", COUNT_BUCKETS, **labels).observe(inputs)
+            self._pending_inputs.pop(fan_key, None)
+        else:
+            self._pending_inputs[fan_key] = inputs
+        registry.histogram("workflow_step_fan_out", COUNT_BUCKETS, **labels).observe(fan_out)
+
+        if self._sampled():
+            # 只存只含标量的元组（GC 不追踪），导出时再拼成 Chrome trace 的字典
+            args = (("input", input_name), ("cpu_ms", cpu * 1000), ("fan_out", fan_out),
+                    ("output", type(result).__name__ if result is not None else None),
+                    ("queue_wait_ms", wait * 1000 if wait is not None else None),
+                    ("error", repr(err) if err is not None else None))
+            self._trace.append(("X", name, "step", tid, start, now, args))
+            if producer_tid is not None:
+                self._flow_ids += 1
+                self._trace.append(("s", input_name, self._flow_ids, producer_tid, start - wait))
+                self._trace.append(("f", input_name, self._flow_ids, tid, start))
+
+    # ---- LLM 调用 ----
+    def _on_event(self, event: BaseEvent) -> None:
+        # 流式调用每个 token 都会发一个 InProgress 事件，先按类型查表，无关事件直接返回
+        phase = _LLM_EVENTS.get(type(event))
+        if phase is None:
+            return
+        key = self._current_task() or threading.get_ident()
+        calls = self._llm_calls.get(key)
+        if phase == "progress":
+            if calls and calls[-1][1] is None:
+                calls[-1][1] = time.perf_counter()
+        elif phase != "end":
+            model_dict = event.model_dict or {}
+            model = str(model_dict.get("model") or model_dict.get("model_name") or model_dict.get("class_name"))
+            self._llm_calls.setdefault(key, []).append([time.perf_counter(), None, model, phase])
+        elif calls:
+            start, first, model, kind = calls.pop()
+            if not calls:
+                del self._llm_calls[key]
+            now = time.perf_counter()
+            labels = {"model": model, "kind": kind}
+            self.registry.histogram("llm_call_seconds", **labels).observe(now - start)
+            if first is not None:
+                self.registry.histogram("llm_first_token_seconds", **labels).observe(first - start)
+            if self._sampled():
+                tid, _ = self._lane(key if not isinstance(key, int) else None)
+                args = (("model", model), ("first_token_ms", (first - start) * 1000 if first is not None else None))
+                self._trace.append(("X", f"llm.{kind}", "llm", tid, start, now, args))
+
+    # ---- 导出 ----
+    def _chrome_event(self, record: tuple) -> Dict[str, Any]:
+        ph = record[0]
+        if ph == "M":
+            return {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": record[1], "args": {"name": record[2]}}
+        if ph == "X":
+            _, name, cat, tid, start, end, args = record
+            return {"name": name, "cat": cat, "ph": "X", "pid": self._pid, "tid": tid, "ts": self._us(start),
+                    "dur": (end - start) * 1e6,
+                    "args": {k: round(v, 3) if isinstance(v, float) else v for k, v in args if v is not None}}
+        _, name, flow_id, tid, t = record
+        event = {"name": name, "cat": "event", "ph": ph, "id": flow_id, "pid": self._pid, "tid": tid, "ts": self._us(t)}
+        if ph == "f":
+            event["bp"] = "e"
+        return event
+
+    def export_chrome_trace(self, path: str) -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        payload = {"traceEvents": [self._chrome_event(record) for record in list(self._trace)],
+                   "displayTimeUnit": "ms",
+                   "otherData": {"metrics": self.registry.snapshot()}}
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+
+    def print_summary(self) -> None:
+        snapshot = self.registry.snapshot()
+        for name in ("workflow_step_wall_seconds", "workflow_step_cpu_seconds", "workflow_queue_wait_seconds",
+                     "llm_call_seconds", "llm_first_token_seconds"):
+            for row in snapshot.get(name, []):
+                labels = ",".join(f"{k}={v}" for k, v in row["labels"].items())
+                print(f"{name:<30} {labels:<40} n={row['count']:<5} p50 {row['p50'] * 1000:8.2f} ms  "
+                      f"p95 {row['p95'] * 1000:8.2f} ms  max {row['max'] * 1000:8.2f} ms")
+        for name in ("workflow_step_fan_out", "workflow_step_fan_in"):
+            for row in snapshot.get(name, []):
+                labels = ",".join(f"{k}={v}" for k, v in row["labels"].items())
+                print(f"{name:<30} {labels:<40} n={row['count']:<5} mean {row['mean']:.2f}  max {row['max']:.0f}")
+
+
+class _Step2Event(Event):
+    message: str
+
+
+class _Step3Event(Event):
+    message: str
+
+
+class _ParallelWorkflow(Workflow):
+    """与 concurrent_event.py 相同的扇出 / 扇入结构"""
+
+    @step
+    async def start(self, ctx: Context, event: StartEvent) -> _Step2Event:
+        for i in range(3):
+            ctx.send_event(_Step2Event(message=f"message {i}"))
+
+    @step(num_workers=3)
+    async def step2(self, ctx: Context, event: _Step2Event) -> _Step3Event:
+        await asyncio.sleep(random.uniform(0.05, 0.2))
+        sum(i * i for i in range(200_000))  # 一点 CPU 工作
+        return _Step3Event(message=event.message)
+
+    @step
+    async def step3(self, ctx: Context, event: _Step3Event) -> StopEvent:
+        if ctx.collect_events(event, [_Step3Event] * 3) is None:
+            return None
+        return StopEvent(result="all done")
+
+
+async def main():
+    tracer = WorkflowTracer().install()
+    results = await asyncio.gather(*(_ParallelWorkflow(timeout=60).run() for _ in range(4)))
+    print("results:", results)
+    tracer.uninstall()
+
+    tracer.print_summary()
+    print("trace:", tracer.export_chrome_trace("./storage/workflow_trace.json"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
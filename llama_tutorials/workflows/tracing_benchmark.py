@@ -0,0 +1,136 @@
+"""WorkflowTracer 的开销：同一个工作流在不追踪 / 追踪两种情况下各跑一遍（模拟 LLM，不需要网络）
+
+工作流：start 扇出 --fan-out 个事件 → work（模拟 LLM 流式调用 + 少量 CPU）→ join 用 collect_events 扇入。
+同时跑 --runs 个，交替测 --rounds 轮，取每种情况 CPU 时间的最好成绩，算出每个 step 多花的 CPU。
+每个 work step 里模拟 LLM 流式返回 16 个 token，每个 token 都会经过 event handler。
+最后打印追踪到的指标，并把 trace 写到 ./storage/tracing_benchmark_trace.json。
+
+用法：
+    python tracing_benchmark.py
+    python tracing_benchmark.py --runs 500 --fan-out 8
+"""
+import argparse
+import asyncio
+import gc
+import time
+from typing import Any
+
+from llama_index.core.base.llms.types import CompletionResponse, CompletionResponseGen, LLMMetadata
+from llama_index.core.llms import CustomLLM
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.workflow import (
+    step,
+    Event,
+    Context,
+    Workflow,
+    StartEvent,
+    StopEvent,
+)
+
+from tracing import WorkflowTracer
+
+
+class MockLLM(CustomLLM):
+    tokens: int = 16
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="mock-llm")
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(text="好" * self.tokens)
+
+    def _chunks(self):
+        text = ""
+        for _ in range(self.tokens):
+            text += "好"
+            yield CompletionResponse(text=text, delta="好")
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        return self._chunks()
+
+    @llm_completion_callback()
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        async def gen():
+            for chunk in self._chunks():
+                await asyncio.sleep(0)
+                yield chunk
+
+        return gen()
+
+
+class WorkEvent(Event):
+    index: int
+
+
+class DoneEvent(Event):
+    text: str
+
+
+class FanWorkflow(Workflow):
+    def __init__(self, llm: MockLLM, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.llm = llm
+
+    @step
+    async def start(self, ctx: Context, ev: StartEvent) -> WorkEvent:
+        await ctx.set("fan_out", ev.fan_out)
+        for i in range(ev.fan_out):
+            ctx.send_event(WorkEvent(index=i))
+
+    @step(num_workers=4)
+    async def work(self, ev: WorkEvent) -> DoneEvent:
+        text = ""
+        async for chunk in await self.llm.astream_complete(f"第 {ev.index} 个子任务"):
+            text += chunk.delta
+        return DoneEvent(text=text)
+
+    @step
+    async def join(self, ctx: Context, ev: DoneEvent) -> StopEvent:
+        results = ctx.collect_events(ev, [DoneEvent] * await ctx.get("fan_out"))
+        if results is None:
+            return None
+        return StopEvent(result=len(results))
+
+
+async def run_batch(runs: int, fan_out: int, llm: MockLLM) -> float:
+    """返回这一批消耗的进程 CPU 时间：单核机器上墙钟时间受 GC 和其他进程干扰更大"""
+    gc.collect()
+    start = time.process_time()
+    await asyncio.gather(*(FanWorkflow(llm, timeout=600).run(fan_out=fan_out) for _ in range(runs)))
+    return time.process_time() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--fan-out", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    llm = MockLLM()
+    steps_per_run = 1 + args.fan_out * 2  # start + work × n + join × n
+    await run_batch(10, args.fan_out, llm)  # 预热
+
+    plain, traced, tracer = [], [], None
+    for _ in range(args.rounds):
+        plain.append(await run_batch(args.runs, args.fan_out, llm))
+        tracer = WorkflowTracer().install()
+        traced.append(await run_batch(args.runs, args.fan_out, llm))
+        tracer.uninstall()
+
+    steps = args.runs * steps_per_run
+    base, with_tracer = min(plain), min(traced)
+    print(f"{args.runs} 个工作流 × {steps_per_run} 个 step，取 {args.rounds} 轮最好成绩")
+    print(f"不追踪: CPU {base:.3f}s ({base / steps * 1e6:.1f} µs/step)")
+    print(f"追踪:   CPU {with_tracer:.3f}s ({with_tracer / steps * 1e6:.1f} µs/step)")
+    print(f"开销:   {(with_tracer - base) / steps * 1e6:+.1f} µs/step ({(with_tracer / base - 1) * 100:+.1f}%)\n")
+
+    tracer.print_summary()
+    print("trace:", tracer.export_chrome_trace("./storage/tracing_benchmark_trace.json"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())